@@ -1,118 +1,365 @@
-import google.generativeai as genai
-import json
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from core import llm
+from core.json_stream import JsonArrayStreamParser
+from core.meal_optimizer import MealOptimizer
+from core.menu_index import protein_density
+from core.prompt_builder import PromptBuilder, macro_summary, menu_rows
+from core.response_cache import make_response_cache
+from core.single_flight import SingleFlight
+from core.structured_output import (RECOMMENDATION_SCHEMA, WEEK_PLAN_SCHEMA, RecommendationReply, WeekPlanReply,
+                                    json_output, parse_reply)
+
+# Remaining macros are rounded to these steps for guidance cache keys
+PROTEIN_BUCKET = 10
+CALORIE_BUCKET = 100
+RECOMMENDATION_OUTPUT = json_output(RECOMMENDATION_SCHEMA)
+WEEK_PLAN_OUTPUT = json_output(WEEK_PLAN_SCHEMA)
+
+# Share of the daily target each meal is planned against (renormalized
+# over the meals a day actually has; unknown meal types get OTHER_MEAL_SHARE)
+MEAL_SHARES = {"Breakfast": 0.25, "Lunch": 0.35, "Snacks": 0.1, "Dinner": 0.3}
+OTHER_MEAL_SHARE = 0.2
+# Week plans: (date, meal) slots per Gemini call, and the prompt budget per call
+WEEK_PLAN_CHUNK_SLOTS = 14
+WEEK_PLAN_TOKEN_BUDGET = 2500
 
 class MealPlanningAgent:
-    def __init__(self, api_key):
-        """Initialize Gemini agent"""
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, api_key, motivation_cache=None, guidance_cache=None, llm_client=None, prompt_token_budget=None):
+        """Initialize Gemini agent (the model is created on first use)"""
+        llm.configure(api_key)
+        # Calls go through the shared client (concurrency and rate limits, retries)
+        self.llm = llm_client or llm.get_client()
+        self.model_name = 'gemini-2.0-flash'
+        self._model = None
+        self.optimizer = MealOptimizer()
+        # Low-cardinality prompts are served from caches with a few variants each
+        self.motivation_cache = motivation_cache or make_response_cache("motivation", max_size=64, ttl=6 * 3600, variants=5)
+        self.guidance_cache = guidance_cache or make_response_cache("guidance", max_size=1024, ttl=3600, variants=2)
+        # Identical prompts in flight at the same time share one Gemini call
+        self.single_flight = SingleFlight()
+        # None falls back to PROMPT_TOKEN_BUDGET / the builder default
+        self.prompt_token_budget = prompt_token_budget
+    
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = llm.get_model(self.model_name)
+        return self._model
     
-    def analyze_menu_and_recommend(self, menu_items, user_profile, current_intake, target_macros):
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    def generate(self, prompt, operation="generate", generation_config=None):
         """
-        Use Gemini to analyze menu and create recommendations
+        Call Gemini, coalescing with any identical prompt already in flight
         """
+        normalized = " ".join(prompt.split())
+        key = hashlib.sha256(f"{self.model_name}:{normalized}".encode()).hexdigest()
         
-        # Create prompt for Gemini
-        prompt = f"""
-        You are a professional fitness coach and nutritionist. 
-        
-        USER PROFILE:
-        - Age: {user_profile['age']}
-        - Height: {user_profile['height']} cm
-        - Weight: {user_profile['weight']} kg
-        - Goal: {user_profile['goal']} (bulk/cut)
-        - Workout: {user_profile['workout_today']}
-        
-        DAILY TARGETS:
-        - Calories: {target_macros['calories']}
-        - Protein: {target_macros['protein']}g
-        - Carbs: {target_macros['carbs']}g
-        - Fats: {target_macros['fats']}g
-        
-        CURRENT INTAKE (eaten so far):
-        - Calories: {current_intake['calories']}
-        - Protein: {current_intake['protein']}g
-        - Carbs: {current_intake['carbs']}g
-        - Fats: {current_intake['fats']}g
-        
-        TODAY'S AVAILABLE MENU:
-        {json.dumps(menu_items, indent=2)}
-        
-        TASK:
-        1. Analyze the available menu items
-        2. Create 3 meal recommendations that:
-           - Fit within daily macro targets
-           - Consider the user's goal (bulk = high calories/protein, cut = high protein, low carbs)
-           - Account for what they've already eaten
-           - Are appropriate for their workout today
-        3. For each recommendation, specify:
-           - Which items to eat
-           - Portion sizes
-           - Total macros (calories, protein, carbs, fats)
-           - Why this combination is optimal
-        4. Provide 2-3 alternative food swaps if they don't like something
-        
-        Format response as JSON with this structure:
-        {{
-            "recommendations": [
-                {{
-                    "name": "Recommendation 1",
-                    "description": "Best for muscle gain",
-                    "items": ["item1 - quantity", "item2 - quantity"],
-                    "total_macros": {{"calories": 950, "protein": 52, "carbs": 98, "fats": 31}},
-                    "reasoning": "Why this is optimal"
-                }}
-            ],
-            "alternatives": ["Alternative 1", "Alternative 2"],
-            "motivation": "Motivational message about today's workout"
-        }}
+        return self.single_flight.do(key, lambda: self.llm.generate(self.model, prompt, operation, generation_config))
+    
+    def generate_stream(self, prompt, operation, generation_config=None):
+        """Stream Gemini's reply as text chunks"""
+        return self.llm.generate_stream(self.model, prompt, operation, generation_config)
+    
+    def analyze_menu_and_recommend(self, menu_items, user_profile, current_intake, target_macros, fast=False,
+                                   menu_index=None):
+        """
+        Pick meal combinations locally, then let Gemini explain them.
+
+        The combinations and their total_macros come from MealOptimizer, so
+        the numbers are always exact. Gemini only writes the reasoning,
+        alternatives and motivation; with fast=True it is skipped entirely.
+        menu_index is the meal's precomputed index (core.menu_index), when
+        the menu came from the store.
         """
+        result, combos, remaining = self._plan_recommendations(menu_items, user_profile, current_intake, target_macros)
+        
+        if fast or not combos:
+            return result
         
         # Call Gemini API
-        response = self.model.generate_content(prompt)
+        prompt = self._recommendation_prompt(menu_items, user_profile, remaining, result, combos, menu_index)
+        response = self.generate(prompt, "recommendations.generate", RECOMMENDATION_OUTPUT)
         
-        try:
-            # Parse JSON response
-            response_text = response.text
-            # Find JSON in response
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return {"error": "Could not parse recommendations", "raw": response_text}
-        except json.JSONDecodeError:
-            return {"error": "Invalid JSON response", "raw": response.text}
+        # Whatever part of the reply validates is used; the rest keeps the local text
+        reply, _ = parse_reply(response.text, RecommendationReply, "recommendations")
+        if reply is None:
+            return result
+        
+        for rec, text in zip(result['recommendations'], reply.recommendations):
+            merge_prose(rec, text.model_dump(exclude_none=True) if text else None)
+        result['alternatives'] = reply.alternatives or result['alternatives']
+        result['motivation'] = reply.motivation or result['motivation']
+        result['source'] = "optimizer+gemini"
+        return result
     
-    def get_nutrition_guidance(self, user_profile, daily_target, current_intake):
+    def stream_recommendations(self, menu_items, user_profile, current_intake, target_macros, menu_index=None):
         """
-        Get personalized nutrition guidance from Gemini
+        Streaming version of analyze_menu_and_recommend.
+        
+        Yields (event, data) pairs: one "recommendation" per combination as
+        soon as Gemini finishes describing it, then "alternatives" and
+        "motivation".
         """
+        result, combos, remaining = self._plan_recommendations(menu_items, user_profile, current_intake, target_macros)
+        recommendations = result['recommendations']
         
-        remaining_protein = daily_target['protein'] - current_intake['protein']
-        remaining_calories = daily_target['calories'] - current_intake['calories']
+        if not combos:
+            yield "motivation", result['motivation']
+            return
         
-        prompt = f"""
-        As a fitness coach, provide personalized nutrition guidance.
+        prompt = self._recommendation_prompt(menu_items, user_profile, remaining, result, combos, menu_index)
+        parser = JsonArrayStreamParser("recommendations")
+        emitted = 0
+        for chunk in self.generate_stream(prompt, "recommendations.stream", RECOMMENDATION_OUTPUT):
+            for text in parser.feed(chunk):
+                if emitted < len(recommendations):
+                    merge_prose(recommendations[emitted], text)
+                    yield "recommendation", recommendations[emitted]
+                    emitted += 1
         
-        User: {user_profile['goal'].upper()} phase
-        Workout today: {user_profile['workout_today']}
+        # Anything Gemini didn't describe still goes out with the local text
+        for rec in recommendations[emitted:]:
+            yield "recommendation", rec
         
-        Daily target: {daily_target['protein']}g protein, {daily_target['calories']} calories
-        Current intake: {current_intake['protein']}g protein, {current_intake['calories']} calories
-        Remaining: {remaining_protein}g protein, {remaining_calories} calories
+        reply, _ = parse_reply(parser.text, RecommendationReply, "recommendations_stream")
+        yield "alternatives", (reply and reply.alternatives) or result['alternatives']
+        yield "motivation", (reply and reply.motivation) or result['motivation']
+    
+    def plan_week(self, menus, user_profile, daily_target, meal_types=None, per_meal=2, fast=False, chunk_slots=None):
+        """
+        Recommendations for every day and meal of a scanned menu, keyed by date and meal.
         
-        Provide:
-        1. A motivational message about today's progress
-        2. Specific recommendations for the next meal
-        3. Tips to hit remaining targets
-        4. If targets already met: Congratulations message
+        The optimizer picks per_meal combinations for each (date, meal)
+        slot against that meal's share of the daily target; Gemini then
+        describes all of them in one call per chunk_slots slots (chunks
+        run in parallel, at most the LLM client's concurrency at a time)
+        instead of one call per meal. Slots Gemini leaves out, and every
+        slot of a chunk whose call failed, keep the local text.
+        
+        menus are /scan-menu entries whose meals map item names to nutrition;
+        an entry whose date was already planned is keyed "<date> (<position>)".
+        Returns {"plan": {date: {meal: result}}, "motivation", "llm_calls"}.
+        """
+        slots = []
+        dates = set()
+        for day_index, entry in enumerate(menus):
+            date = day_key(entry, day_index)
+            if date in dates:
+                # A repeated date or day name gets its own plan entry (and slot keys) instead of overwriting
+                date = f"{date} ({day_index + 1})"
+            dates.add(date)
+            meals = {
+                meal: items for meal, items in (entry.get('meals') or {}).items()
+                if isinstance(items, dict) and items and (not meal_types or meal in meal_types)
+            }
+            shares = {meal: MEAL_SHARES.get(meal, OTHER_MEAL_SHARE) for meal in meals}
+            total_share = sum(shares.values())
+            for meal, items in meals.items():
+                target = {field: round(value * shares[meal] / total_share) for field, value in daily_target.items()
+                          if isinstance(value, (int, float))}
+                combos = self.optimizer.optimize(items, target, user_profile['goal'], top_k=per_meal)
+                result = self._local_recommendations(combos, user_profile, target)
+                del result['motivation']
+                slots.append((date, meal, target, combos, result))
+        
+        plan = {}
+        for date, meal, _, _, result in slots:
+            plan.setdefault(date, {})[meal] = result
+        motivation = f"Your {user_profile['goal']} week is planned - one meal at a time!"
+        
+        described = [slot for slot in slots if slot[3]]
+        if fast or not described:
+            return {"plan": plan, "motivation": motivation, "llm_calls": 0}
+        
+        chunk_slots = chunk_slots or int(os.getenv("WEEK_PLAN_CHUNK_SLOTS", WEEK_PLAN_CHUNK_SLOTS))
+        chunks = [described[i:i + chunk_slots] for i in range(0, len(described), chunk_slots)]
+        with ThreadPoolExecutor(max_workers=min(len(chunks), self.llm.max_concurrency)) as pool:
+            replies = list(pool.map(lambda chunk: self._describe_week_chunk(chunk, user_profile, daily_target), chunks))
+        
+        for chunk, reply in zip(chunks, replies):
+            if reply is None:
+                continue
+            texts = {slot.key: slot.recommendations for slot in reply.slots}
+            for date, meal, _, _, result in chunk:
+                recommendations = texts.get(slot_key(date, meal))
+                if recommendations is None:
+                    continue
+                for rec, text in zip(result['recommendations'], recommendations):
+                    merge_prose(rec, text.model_dump(exclude_none=True) if text else None)
+                result['source'] = "optimizer+gemini"
+            motivation = reply.motivation or motivation
+        return {"plan": plan, "motivation": motivation, "llm_calls": len(chunks)}
+    
+    def _describe_week_chunk(self, chunk, user_profile, daily_target):
+        """
+        One Gemini call describing the combinations of several slots.
+        
+        Returns a WeekPlanReply, or None when the call or its parsing
+        failed, so one bad chunk doesn't fail the whole plan.
+        """
+        builder = PromptBuilder(WEEK_PLAN_TOKEN_BUDGET)
+        builder.line("You are a fitness coach and nutritionist writing a weekly meal plan.")
+        builder.line(f"User: goal {user_profile['goal']}. Daily target: {macro_summary(daily_target)}")
+        builder.line("Each slot lists meal combinations already calculated (macros are exact, do not change them):")
+        for date, meal, target, combos, _ in chunk:
+            builder.line(f"[{slot_key(date, meal)}] target {macro_summary(target)}")
+            for i, combo in enumerate(combos):
+                items = ", ".join(f"{name} x{portions}" for name, portions in combo['items'])
+                builder.line(f"{i + 1}. {items} | {macro_summary(combo['total_macros'])}")
+        builder.line(
+            "Tasks: for every slot, a short description and why it suits the goal for each combination, "
+            "in order; then one motivational message for the week."
+        )
+        builder.line("Reply in JSON with one slots entry per slot, its key being the label in brackets.")
+        prompt = self.finish_prompt(builder, f"week plan ({len(chunk)} slots)")
+        
+        try:
+            response = self.generate(prompt, "week_plan.generate", WEEK_PLAN_OUTPUT)
+            reply, _ = parse_reply(response.text, WeekPlanReply, "week_plan")
+        except Exception as e:
+            print(f"❌ Week plan chunk ({len(chunk)} slots) failed, keeping local text: {e}")
+            return None
+        return reply
+    
+    def _plan_recommendations(self, menu_items, user_profile, current_intake, target_macros):
+        """
+        Run the optimizer; returns (result, combos, remaining)
+        """
+        remaining = self.optimizer.remaining_budget(target_macros, current_intake)
+        combos = self.optimizer.optimize(menu_items, remaining, user_profile['goal'])
+        return self._local_recommendations(combos, user_profile, remaining), combos, remaining
+    
+    def _recommendation_prompt(self, menu_items, user_profile, remaining, result, combos, menu_index=None):
+        """
+        Prompt asking Gemini to explain the already-computed combinations.
         
-        Keep response concise and actionable.
+        The rest of the menu goes in as a compact macro table, most
+        protein-dense items first (the index's ranking when there is one),
+        trimmed to the prompt token budget.
         """
+        chosen = {name for combo in combos for name, _ in combo['items']}
+        if menu_index:
+            # Unresolved items aren't ranked; they go last
+            ranked = menu_index['by_protein_density']
+            ranked_names = set(ranked)
+            ordered = ranked + [name for name in menu_items if name not in ranked_names]
+            other_items = [name for name in ordered if name in menu_items and name not in chosen]
+        else:
+            other_items = sorted(
+                (name for name in menu_items if name not in chosen),
+                key=lambda name: -protein_density(menu_items[name])
+            )
         
-        response = self.model.generate_content(prompt)
-        return response.text
+        builder = self.prompt_builder()
+        builder.line("You are a fitness coach and nutritionist.")
+        builder.line(f"User: goal {user_profile['goal']}, workout {user_profile['workout_today']}.")
+        builder.line(f"Remaining today: {macro_summary(remaining)}")
+        builder.line("These meal combinations were already calculated (macros are exact, do not change them):")
+        for i, combo in enumerate(combos):
+            items = ", ".join(f"{name} x{portions}" for name, portions in combo['items'])
+            builder.line(f"{i + 1}. {items} | {macro_summary(combo['total_macros'])}")
+        builder.table("Other menu items (per serving):", menu_rows(menu_items, other_items))
+        builder.line(
+            "Tasks: 1) for each combination, a short description and why it suits the goal and workout; "
+            "2) 2-3 food swaps from the other menu items; 3) a motivational message about today's workout."
+        )
+        builder.line("Reply in JSON, one recommendations entry per combination, in order.")
+        return self.finish_prompt(builder, "recommendations")
+    
+    def prompt_builder(self):
+        return PromptBuilder(self.prompt_token_budget)
+    
+    def finish_prompt(self, builder, name):
+        """Build the prompt and log its size"""
+        prompt = builder.build()
+        notes = []
+        if prompt.dropped_rows:
+            notes.append(f"{prompt.dropped_rows} menu rows dropped")
+        if prompt.tokens > builder.token_budget:
+            notes.append(f"over the {builder.token_budget}-token budget")
+        print(f"🧾 {name} prompt: ~{prompt.tokens} tokens" + (f" ({', '.join(notes)})" if notes else ""))
+        return prompt.text
+    
+    def _local_recommendations(self, combos, user_profile, remaining):
+        """
+        Turn optimizer output into the recommendation format the frontend expects
+        """
+        goal = user_profile['goal']
+        recommendations = []
+        for i, combo in enumerate(combos):
+            macros = combo['total_macros']
+            recommendations.append({
+                "name": f"Recommendation {i + 1}",
+                "description": f"Closest fit for your {goal} targets" if i == 0 else f"Option {i + 1} for your {goal} targets",
+                "items": [f"{name} - {portions} serving{'s' if portions > 1 else ''}" for name, portions in combo['items']],
+                "total_macros": macros,
+                "reasoning": (
+                    f"Covers {macros['calories']:.0f} of your remaining {remaining['calories']} kcal "
+                    f"and {macros['protein']:.0f}g of your remaining {remaining['protein']}g protein."
+                )
+            })
+        
+        if recommendations:
+            motivation = f"You're on track - keep pushing through {user_profile['workout_today']} day!"
+        else:
+            motivation = "You've already hit today's calorie target - great work!"
+        
+        return {
+            "recommendations": recommendations,
+            "alternatives": [],
+            "motivation": motivation,
+            "source": "optimizer"
+        }
+    
+    def get_nutrition_guidance(self, user_profile, daily_target, current_intake):
+        """
+        Get personalized nutrition guidance from Gemini
+        """
+        key, prompt = self._guidance_prompt(user_profile, daily_target, current_intake)
+        return self.guidance_cache.get_or_compute(key, lambda: self.generate(prompt, "guidance.generate").text)
+    
+    def stream_nutrition_guidance(self, user_profile, daily_target, current_intake):
+        """
+        Streaming version of get_nutrition_guidance; yields text chunks
+        """
+        _, prompt = self._guidance_prompt(user_profile, daily_target, current_intake)
+        for chunk in self.generate_stream(prompt, "guidance.stream"):
+            if chunk:
+                yield chunk
+    
+    def _guidance_prompt(self, user_profile, daily_target, current_intake):
+        """
+        Returns (cache_key, prompt) for nutrition guidance
+        """
+        # Bucket the numbers so similar days share cached guidance
+        remaining_protein = bucket(daily_target['protein'] - current_intake['protein'], PROTEIN_BUCKET)
+        remaining_calories = bucket(daily_target['calories'] - current_intake['calories'], CALORIE_BUCKET)
+        target_protein = bucket(daily_target['protein'], PROTEIN_BUCKET)
+        target_calories = bucket(daily_target['calories'], CALORIE_BUCKET)
+        goal = user_profile['goal'].lower()
+        workout = user_profile['workout_today'].lower()
+        
+        builder = self.prompt_builder()
+        builder.line("As a fitness coach, give personalized nutrition guidance.")
+        builder.line(f"User: {goal.upper()} phase, workout today: {workout}.")
+        builder.line(
+            f"Daily target: about {target_protein}g protein, {target_calories} kcal. "
+            f"Remaining: about {remaining_protein}g protein, {remaining_calories} kcal."
+        )
+        builder.line(
+            "Give: 1) a motivational note on today's progress 2) specific picks for the next meal "
+            "3) tips to hit the remaining targets 4) if the targets are already met, congratulations."
+        )
+        builder.line("Keep it concise and actionable.")
+        prompt = self.finish_prompt(builder, "guidance")
+        
+        key = (goal, workout, target_protein, target_calories, remaining_protein, remaining_calories)
+        return key, prompt
     
     def get_workout_motivation(self, workout_day, user_goal):
         """
@@ -127,5 +374,44 @@ class MealPlanningAgent:
         Make it energetic and action-focused!
         """
         
-        response = self.model.generate_content(prompt)
-        return response.text
+        key = (workout_day.lower(), user_goal.lower())
+        return self.motivation_cache.get_or_compute(key, lambda: self.generate(prompt, "motivation.generate").text)
+    
+    def cache_stats(self):
+        """
+        Hit/miss counters for the response caches
+        """
+        return {
+            "workout_motivation": self.motivation_cache.stats(),
+            "nutrition_guidance": self.guidance_cache.stats()
+        }
+    
+    def coalescing_stats(self):
+        """
+        How many Gemini calls were saved by sharing in-flight requests
+        """
+        return self.single_flight.stats()
+
+
+def bucket(value, step):
+    """Round value to the nearest multiple of step"""
+    return int(round(value / step) * step)
+
+
+def day_key(entry, index):
+    """Plan key for a menu entry: its date, else its day name, else its position"""
+    date = entry.get('date')
+    if date and date != 'unknown':
+        return date
+    return entry.get('day') or f"day-{index + 1}"
+
+
+def slot_key(date, meal):
+    return f"{date} {meal}"
+
+
+def merge_prose(recommendation, text):
+    """Apply Gemini's description/reasoning to a locally computed recommendation"""
+    if isinstance(text, dict):
+        recommendation['description'] = text.get('description', recommendation['description'])
+        recommendation['reasoning'] = text.get('reasoning', recommendation['reasoning'])
@@ -0,0 +1,88 @@
+"""
+Benchmark: onboarding 10k profiles through /setup-profile one request at
+a time vs one /setup-profiles/batch call (and the bare calculators).
+
+Run from the backend folder:
+    python -m benchmarks.bench_batch_profiles
+"""
+import csv
+import io
+import os
+import random
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from fastapi.testclient import TestClient
+
+import main
+from core.macro_calculator import MacroCalculator
+
+PROFILES = 10_000
+
+
+def random_profiles(count, seed=3):
+    rng = random.Random(seed)
+    return [{
+        "id": f"STU{i:05d}",
+        "age": rng.randint(17, 30),
+        "height": round(rng.uniform(150, 195), 1),
+        "weight": round(rng.uniform(45, 110), 1),
+        "goal": rng.choice(["bulk", "cut", "maintain"]),
+        "activity_level": rng.choice(["sedentary", "light", "moderate", "active", "very_active"]),
+        "workout_today": rng.choice(["rest", "push", "pull", "legs"])
+    } for i in range(count)]
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>32} {elapsed:>9.3f}s {PROFILES / elapsed:>12,.0f} profiles/s")
+    return elapsed
+
+
+def main_bench():
+    profiles = random_profiles(PROFILES)
+    calc = MacroCalculator()
+    client = TestClient(main.app)
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(profiles[0]))
+    writer.writeheader()
+    writer.writerows(profiles)
+    csv_body = buffer.getvalue().encode()
+
+    def scalar_loop():
+        for p in profiles:
+            tdee = calc.calculate_tdee(p["age"], p["height"], p["weight"], "male", p["activity_level"])
+            calc.calculate_macros(tdee, p["goal"], p["weight"])
+
+    def vectorized():
+        calc.calculate_batch([p["age"] for p in profiles], [p["height"] for p in profiles],
+                             [p["weight"] for p in profiles], [p["goal"] for p in profiles],
+                             [p["activity_level"] for p in profiles])
+
+    def per_request():
+        for p in profiles:
+            client.post("/setup-profile", json=p).raise_for_status()
+
+    def batch_endpoint():
+        response = client.post("/setup-profiles/batch", content=csv_body, headers={"Content-Type": "text/csv"})
+        response.raise_for_status()
+        assert response.text.count("\n") == PROFILES
+
+    print("=" * 60)
+    print(f"{PROFILES:,} profiles")
+    print("-" * 60)
+    timed("scalar MacroCalculator loop", scalar_loop)
+    timed("vectorized calculate_batch", vectorized)
+    loop = timed("/setup-profile x N", per_request)
+    batch = timed("/setup-profiles/batch (CSV)", batch_endpoint)
+    print("-" * 60)
+    print(f"batch endpoint speedup over per-request loop: {loop / batch:.0f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,115 @@
+"""
+Concurrency check for /scan-menu with a fake Gemini backend.
+
+Fires N scans at once (cache disabled via distinct uploads; each
+request waits for its job with ?wait=) while pinging /health, and
+compares wall-clock time with a single scan. Jobs run on the scan
+worker pool, so up to SCAN_WORKERS scans overlap (more queue), and
+/health should stay fast throughout.
+
+Run from the backend folder:
+    python -m benchmarks.bench_concurrent_scans
+"""
+import asyncio
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("SCAN_CACHE_DIR", tempfile.mkdtemp(prefix="scan_cache_"))
+
+import httpx
+
+import main
+from core import llm
+
+UPLOAD_LATENCY = 0.2
+PROCESSING_POLLS = 2
+GENERATE_LATENCY = 0.5
+PARALLEL_SCANS = [1, 4, 8, 16]
+CANNED_MENU = '{"menus": [{"date": "2025-11-01", "day": "Saturday", "meals": {"Lunch": ["Rajma Rice", "Roti", "Curd"]}}]}'
+
+
+class FakeFile:
+    def __init__(self, name):
+        self.name = name
+        self.polls = 0
+        self.state = SimpleNamespace(name="PROCESSING")
+
+
+class FakeGenai:
+    """Stands in for the google.generativeai module functions the scanner uses"""
+    def __init__(self):
+        self.files = {}
+
+    def upload_file(self, path):
+        time.sleep(UPLOAD_LATENCY)
+        uploaded = FakeFile(os.path.basename(path))
+        self.files[uploaded.name] = uploaded
+        return uploaded
+
+    def get_file(self, name):
+        uploaded = self.files[name]
+        uploaded.polls += 1
+        if uploaded.polls >= PROCESSING_POLLS:
+            uploaded.state = SimpleNamespace(name="ACTIVE")
+        return uploaded
+
+    def delete_file(self, name):
+        self.files.pop(name, None)
+
+
+class FakeModel:
+    def generate_content(self, contents, generation_config=None):
+        time.sleep(GENERATE_LATENCY)
+        return SimpleNamespace(text=CANNED_MENU)
+
+
+async def run_scans(client, count, round_id):
+    health_latencies = []
+    done = asyncio.Event()
+
+    async def ping_health():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/health")
+            health_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.05)
+
+    async def scan(i):
+        # Unique bytes so every request misses the scan cache
+        content = f"%PDF-1.4 round {round_id} scan {i}".encode()
+        response = await client.post("/scan-menu", params={"wait": 60},
+                                     files={"file": ("menu.pdf", content, "application/pdf")})
+        response.raise_for_status()
+        assert response.json()["job"]["state"] == "done"
+
+    pinger = asyncio.create_task(ping_health())
+    start = time.perf_counter()
+    await asyncio.gather(*(scan(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await pinger
+    return elapsed, max(health_latencies) if health_latencies else 0.0
+
+
+async def main_async():
+    llm.set_genai(FakeGenai())
+    main.menu_scanner.model = FakeModel()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print("=" * 64)
+        print(f"{'parallel':>8} {'wall (s)':>10} {'vs single':>10} {'max /health (ms)':>18}")
+        print("-" * 64)
+        single = None
+        for round_id, count in enumerate(PARALLEL_SCANS):
+            elapsed, health_max = await run_scans(client, count, round_id)
+            single = single or elapsed
+            print(f"{count:>8} {elapsed:>10.2f} {elapsed / single:>9.2f}x {health_max * 1000:>18.1f}")
+        print("=" * 64)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
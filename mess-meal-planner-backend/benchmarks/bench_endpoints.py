@@ -0,0 +1,248 @@
+"""
+Benchmark: every API endpoint, in-process, against a fake Gemini backend.
+
+Drives /setup-profile, /scan-menu, /get-recommendations, /get-guidance
+and /search-food (GET and batch POST) through the ASGI app with httpx,
+at several concurrency levels, with Gemini replaced by
+core/llm_local.py (configurable latency and jitter). Reports
+throughput and p50/p95/p99 per endpoint and level, and compares them
+with a stored baseline.
+
+Run from the backend folder:
+    python -m benchmarks.bench_endpoints                   # compare with the baseline
+    python -m benchmarks.bench_endpoints --save-baseline   # record a new baseline
+    python -m benchmarks.bench_endpoints --check           # exit 1 on regressions
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+import pymupdf
+
+from core.llm_local import LocalGemini, install
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "endpoints.json")
+MENU_ITEMS = ["Rajma Rice", "Roti", "Curd", "Paneer Curry", "Jeera Rice", "Dal Tadka", "Salad",
+              "Boiled Egg", "Poha", "Aloo Gobhi", "Kheer", "Samosa", "Chole", "Raita", "Banana"]
+SEARCH_NAMES = ["Rajma Rice", "Dal Makhni", "Paneer", "Zeera Rice", "Gulabjamun", "Chiken Curry",
+                "Aloo Gobi", "Roti", "Mix Veg", "Idli Sambhar"]
+
+
+def profile(i):
+    return {"age": 18 + i % 15, "height": 160 + i % 30, "weight": 55 + i % 40,
+            "goal": "bulk" if i % 2 else "cut", "activity_level": "moderate", "workout_today": "push"}
+
+
+def meal_request(i):
+    # Every request lands in its own guidance cache bucket and prompt, so
+    # these measure the Gemini path rather than cache hits
+    return {
+        "user_profile": profile(i),
+        "menu_items": {name: {} for name in MENU_ITEMS},
+        "current_intake": {"calories": 300 + (i % 20) * 100, "protein": 10 + (i // 20 % 10) * 10, "carbs": 60, "fats": 20},
+        "daily_target": {"calories": 2600, "protein": 140 + (i // 200 % 10) * 10, "carbs": 320, "fats": 75}
+    }
+
+
+def menu_pdfs(count):
+    """Distinct one-page menu PDFs, so every scan misses the scan cache"""
+    pdfs = []
+    for i in range(count):
+        with pymupdf.open() as doc:
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Mess menu #{i}: Rajma Rice, Roti, Curd, Paneer Curry")
+            pdfs.append(doc.tobytes())
+    return pdfs
+
+
+def scan_wait():
+    """The longest ?wait= /scan-menu accepts (main is imported by the time requests are made)"""
+    import main
+    return main.SCAN_WAIT_MAX
+
+
+def scenarios(pdf_count):
+    pdfs = menu_pdfs(pdf_count)
+    return {
+        "setup-profile": lambda i: ("POST", "/setup-profile", {"json": profile(i)}),
+        "scan-menu": lambda i: ("POST", f"/scan-menu?wait={scan_wait()}", {"files": {"file": (f"menu_{i}.pdf", pdfs[i % len(pdfs)], "application/pdf")}}),
+        "get-recommendations": lambda i: ("POST", "/get-recommendations", {"json": meal_request(i)}),
+        "get-guidance": lambda i: ("POST", "/get-guidance", {"json": meal_request(i)}),
+        "search-food": lambda i: ("GET", f"/search-food/{SEARCH_NAMES[i % len(SEARCH_NAMES)]}", {}),
+        "search-food-batch": lambda i: ("POST", "/search-food", {"json": {"foods": SEARCH_NAMES * 5}}),
+    }
+
+
+def succeeded(response):
+    """Error statuses fail, and so does a scan job still unfinished when its ?wait= ran out"""
+    if response.status_code >= 400:
+        return False
+    if response.status_code == 202:
+        return response.json()["job"]["state"] == "done"
+    return True
+
+
+async def run_level(client, make_request, concurrency, total, first_index):
+    latencies = []
+    errors = 0
+    next_index = iter(range(first_index, first_index + total))
+
+    async def worker():
+        nonlocal errors
+        for i in next_index:
+            method, url, kwargs = make_request(i)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if not succeeded(response):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {"throughput": round(total / wall, 2), "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2), "errors": errors}
+
+
+async def run_all(app, selected, levels, total, verbose, first_index=0):
+    """Request indices are unique across levels (first_index onwards)"""
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for name, make_request in selected.items():
+            results[name] = {}
+            index = first_index
+            for concurrency in levels:
+                quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+                with quiet:
+                    results[name][str(concurrency)] = await run_level(client, make_request, concurrency, total, index)
+                index += total
+    return results
+
+
+def median_results(runs):
+    """Per-metric median over repeated runs"""
+    merged = {}
+    for name, levels in runs[0].items():
+        merged[name] = {
+            concurrency: {metric: float(np.median([run[name][concurrency][metric] for run in runs])) for metric in row}
+            for concurrency, row in levels.items()
+        }
+    return merged
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """
+    Print the results table (with baseline deltas); returns the regressions.
+
+    A latency or throughput change only counts when it exceeds the
+    relative tolerance and moves p95 (or p50, for throughput) by more
+    than min_delta_ms, so jitter on sub-millisecond endpoints isn't
+    reported. Any rise in errors is a regression: failed requests return
+    fast and would otherwise look like a speedup.
+    """
+    regressions = []
+    print("=" * 100)
+    print(f"{'endpoint':<22} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err':>4}   vs baseline")
+    print("-" * 100)
+    for name, levels in results.items():
+        for concurrency, row in levels.items():
+            note = ""
+            base = baseline.get(name, {}).get(concurrency) if baseline else None
+            if base:
+                p95_change = row["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+                rate_change = row["throughput"] / base["throughput"] - 1 if base["throughput"] else 0.0
+                note = f"p95 {p95_change:+.0%}, req/s {rate_change:+.0%}"
+                p95_slower = p95_change > tolerance and row["p95_ms"] - base["p95_ms"] > min_delta_ms
+                rate_lower = rate_change < -tolerance and row["p50_ms"] - base["p50_ms"] > min_delta_ms
+                more_errors = row["errors"] > base.get("errors", 0)
+                if more_errors:
+                    note += f", errors {base.get('errors', 0):.0f} -> {row['errors']:.0f}"
+                if p95_slower or rate_lower or more_errors:
+                    note += "  ❌ regression"
+                    regressions.append((name, concurrency))
+            print(f"{name:<22} {concurrency:>5} {row['throughput']:>9.1f} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+                  f"{row['p99_ms']:>9.1f} {row['errors']:>4.0f}   {note}")
+    print("=" * 100)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=48, help="requests per endpoint and level")
+    parser.add_argument("--latency", type=float, default=0.1, help="fake Gemini latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.03, help="uniform +/- jitter on the latency (s)")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="LLM client concurrency limit (LLM_MAX_CONCURRENCY)")
+    parser.add_argument("--endpoints", help="comma-separated subset of: " + ", ".join(scenarios(0)))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per level; the median of each metric is reported")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 / throughput change")
+    parser.add_argument("--min-delta-ms", type=float, default=10.0, help="ignore latency changes smaller than this")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any regression exceeds the tolerance")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own logging")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ["SCAN_CACHE_DIR"] = tempfile.mkdtemp(prefix="scan_cache_")
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+    import main as app_module
+
+    install(LocalGemini(latency=args.latency, jitter=args.jitter), app_module.menu_scanner, app_module.meal_agent)
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    per_run = args.requests * len(levels)
+    selected = scenarios(per_run * args.repeat + 1)
+    if args.endpoints:
+        selected = {name: selected[name] for name in args.endpoints.split(",")}
+
+    # Load lazy components, then one untimed request per endpoint
+    with contextlib.redirect_stdout(io.StringIO()):
+        app_module.warm_up()
+        asyncio.run(run_all(app_module.app, selected, [1], 1, False, first_index=per_run * args.repeat))
+    results = median_results([
+        asyncio.run(run_all(app_module.app, selected, levels, args.requests, args.verbose, first_index=per_run * run))
+        for run in range(args.repeat)
+    ])
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        config = stored["config"]
+        if (config["latency"], config["jitter"], config.get("llm_concurrency")) == (args.latency, args.jitter, args.llm_concurrency):
+            baseline = stored["results"]
+        else:
+            print("⚠️ Baseline was recorded with a different fake latency or LLM concurrency; not comparing")
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "config": {"latency": args.latency, "jitter": args.jitter, "llm_concurrency": args.llm_concurrency,
+                           "requests": args.requests, "repeat": args.repeat},
+                "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results
+            }, f, indent=2)
+        print(f"✓ Baseline saved to {args.baseline}")
+
+    if args.check and regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
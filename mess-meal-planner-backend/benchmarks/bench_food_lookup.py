@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: partial-match food lookup, linear scan vs FoodIndex.
+
+Run from the backend folder:
+    python -m benchmarks.bench_food_lookup
+"""
+import random
+import time
+
+from core.food_index import FoodIndex
+from core.nutrition_rag import NutritionRAG
+
+SIZES = [100, 1_000, 10_000, 100_000]
+SYLLABLES = ["ra", "jma", "pa", "neer", "cho", "le", "ma", "kha", "ni", "ba",
+             "gan", "bhar", "ta", "ko", "fta", "su", "ji", "hal", "wa", "dhi"]
+QUERIES = ["Dal Makhani Special", "Paneer Butter Masala", "Aloo Gobhi Dry",
+           "Jeera Rice (Full)", "Mix Veg", "Unknown Dish Xyz", "Chole Bhature",
+           "Masala Dosa", "Kadhi", "Zz"]
+# Equal-coverage ties go to the earliest match: the dish, not its gravy
+EXPECTED = {"paneer butter masala": "paneer", "dal makhani special": "dal makhani"}
+
+
+def synthetic_keys(base_keys, size, seed=42):
+    rng = random.Random(seed)
+    keys = list(base_keys)
+    seen = set(keys)
+    while len(keys) < size:
+        words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+                 for _ in range(rng.randint(1, 3))]
+        key = " ".join(words)
+        if key not in seen:
+            seen.add(key)
+            keys.append(key)
+    return keys
+
+
+def linear_lookup(keys, query):
+    """The original partial-match loop from NutritionRAG.search_food"""
+    for db_key in keys:
+        if query in db_key or db_key in query:
+            return db_key
+    return None
+
+
+def time_per_lookup(fn, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+
+def main():
+    base_keys = list(NutritionRAG("").food_database.keys())
+    queries = [q.lower().strip() for q in QUERIES]
+    base_index = FoodIndex(base_keys)
+    for query, expected in EXPECTED.items():
+        assert base_index.lookup(query) == expected, (query, base_index.lookup(query), expected)
+
+    print("=" * 72)
+    print(f"{'rows':>8} {'build (ms)':>12} {'linear (us)':>14} {'indexed (us)':>14} {'speedup':>9}")
+    print("-" * 72)
+    for size in SIZES:
+        keys = synthetic_keys(base_keys, size)
+
+        start = time.perf_counter()
+        index = FoodIndex(keys)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        repeat = max(1, 2000 // size)
+        linear_us = time_per_lookup(lambda q: linear_lookup(keys, q), queries, repeat) * 1e6
+        indexed_us = time_per_lookup(index.lookup, queries, 200) * 1e6
+
+        print(f"{size:>8} {build_ms:>12.1f} {linear_us:>14.1f} {indexed_us:>14.1f} "
+              f"{linear_us / indexed_us:>8.1f}x")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: typo-tolerant food matching throughput and recovery rate.
+
+Generates OCR-style variants of table names (dropped / doubled / swapped
+letters, merged words, j/z and ee/i swaps) and reports names per second
+for batched scoring (one sparse product per batch) against scoring one
+name at a time, plus how many variants resolve back to the source name.
+
+Run from the backend folder:
+    python -m benchmarks.bench_fuzzy_match
+"""
+import random
+import time
+
+from benchmarks.bench_food_lookup import synthetic_keys
+from core.fuzzy_match import FuzzyMatcher
+from core.nutrition_rag import FUZZY_THRESHOLD, INDIAN_FOODS, NutritionRAG
+
+SIZES = [92, 10_000, 50_000]
+QUERY_COUNT = 2_000
+SINGLE_COUNT = 200
+SWAPS = [("j", "z"), ("ee", "i"), ("oo", "u"), ("a", "aa"), ("dh", "d")]
+# match_foods must keep a food named inside the dish over a look-alike,
+# without breaking typo recovery of longer names
+EXPECTED = {"Jeera Aloo": "aloo", "Butter Naan": "naan", "Kala Cchana": "kala chana",
+            "Hari  Chatni": "hari chatni", "Eggcurry": "egg curry", "Kdahi Pakora": "kadhi pakora"}
+
+
+def ocr_variant(name, rng):
+    """One plausible misspelling of name"""
+    kind = rng.randrange(5)
+    if kind == 0 and " " in name:
+        return name.replace(" ", "", 1)
+    if kind == 1:
+        for old, new in rng.sample(SWAPS, len(SWAPS)):
+            if old in name:
+                return name.replace(old, new, 1)
+    i = rng.randrange(1, max(2, len(name) - 1))
+    if kind == 2:
+        return name[:i] + name[i + 1:]
+    if kind == 3:
+        return name[:i] + name[i] + name[i:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+
+def check_expected():
+    matches = NutritionRAG("benchmark").match_foods(list(EXPECTED))
+    for name, key in EXPECTED.items():
+        assert matches[name]["key"] == key, (name, matches[name]["key"], key)
+
+
+def main():
+    check_expected()
+    rng = random.Random(3)
+    base = [food["name"].lower() for food in INDIAN_FOODS]
+
+    print("=" * 84)
+    print(f"{'table rows':>10} {'build s':>8} {'batched names/s':>16} {'single names/s':>15} "
+          f"{'recovered':>10} {'flagged':>8}")
+    print("-" * 84)
+    for size in SIZES:
+        keys = synthetic_keys(base, size) if size > len(base) else base
+        start = time.perf_counter()
+        matcher = FuzzyMatcher(keys)
+        build_s = time.perf_counter() - start
+
+        # Variants of real menu items, so recovery reflects the built-in names
+        sources = [rng.choice(base) for _ in range(QUERY_COUNT)]
+        queries = [ocr_variant(name, rng) for name in sources]
+
+        start = time.perf_counter()
+        ranked = matcher.top_k(queries, k=3)
+        batched = QUERY_COUNT / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for query in queries[:SINGLE_COUNT]:
+            matcher.top_k([query], k=3)
+        single = SINGLE_COUNT / (time.perf_counter() - start)
+
+        accepted = [r[0] for r in ranked if r and r[0][1] >= FUZZY_THRESHOLD]
+        recovered = sum(
+            1 for source, r in zip(sources, ranked)
+            if r and r[0][1] >= FUZZY_THRESHOLD and r[0][0].replace(" ", "") == source.replace(" ", "")
+        )
+        print(f"{len(keys):>10} {build_s:>8.2f} {batched:>16,.0f} {single:>15,.0f} "
+              f"{recovered / QUERY_COUNT:>10.1%} {1 - len(accepted) / QUERY_COUNT:>8.1%}")
+    print("=" * 84)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: parsing model replies, old hand-rolled path vs structured_output.
+
+The corpus mixes clean JSON (what schema-constrained output returns)
+with the failure shapes seen from free-form replies: markdown fences,
+prose around the object, trailing commas, replies cut off mid-way and
+entries with bad items. For each parser it reports how many replies
+gave a usable result and the mean parse time of clean and damaged ones.
+
+- old: fence stripping + json.loads (scanner), greedy regex + json.loads (agent)
+- new: orjson, local repair, Pydantic validation with per-entry salvage
+
+Run from the backend folder:
+    python -m benchmarks.bench_json_parse
+"""
+import json
+import random
+import re
+import time
+
+from core.llm_local import MENU_REPLY, RECOMMENDATION_REPLY
+from core.structured_output import MenuScan, RecommendationReply, parse_reply
+
+REPEAT = 200
+
+
+def variants(reply, rng):
+    """The reply as is plus the damaged shapes free-form output produces"""
+    cut = rng.randrange(len(reply) // 2, len(reply) - 5)
+    return {
+        "clean": reply,
+        "fenced": f"```json\n{reply}\n```",
+        "prose": f"Sure! Here is the JSON you asked for:\n{reply}\nLet me know if you need anything else {{:)}}",
+        "trailing comma": reply.replace("]", ",]", 1),
+        "truncated": reply[:cut],
+        "bad item": reply.replace('"Roti"', "null", 1).replace('"reasoning": "', '"reasoning": 7, "x": "', 1),
+    }
+
+
+def old_menu_parse(text):
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    elif text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    try:
+        menus = json.loads(text.strip()).get("menus", [])
+    except json.JSONDecodeError:
+        return None
+    # The old path passed entries through unchecked; a null item broke the nutrition lookup later
+    if any(not isinstance(item, str) for entry in menus for items in entry["meals"].values() for item in items):
+        return None
+    return menus or None
+
+
+def old_recommendation_parse(text):
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+
+
+def new_menu_parse(text):
+    menu, _ = parse_reply(text, MenuScan, "bench")
+    return menu.menus if menu else None
+
+
+def new_recommendation_parse(text):
+    reply, _ = parse_reply(text, RecommendationReply, "bench")
+    return reply
+
+
+def mean_us(parse, texts):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for text in texts:
+            parse(text)
+    return (time.perf_counter() - start) / (REPEAT * len(texts)) * 1e6
+
+
+def run(name, parse, corpus):
+    failed = [shape for shape, text in corpus.items() if not parse(text)]
+    damaged = [text for shape, text in corpus.items() if shape != "clean"]
+    print(f"{name:<22} {len(corpus) - len(failed):>3}/{len(corpus)} {mean_us(parse, [corpus['clean']]):>10.1f} "
+          f"{mean_us(parse, damaged):>12.1f}   {', '.join(failed) or '-'}")
+
+
+def main():
+    rng = random.Random(0)
+    menus = variants(MENU_REPLY, rng)
+    recommendations = variants(RECOMMENDATION_REPLY, rng)
+
+    print("=" * 100)
+    print(f"{'parser':<22} {'usable':>6} {'clean µs':>9} {'damaged µs':>12}   failed")
+    print("-" * 100)
+    run("menu, old", old_menu_parse, menus)
+    run("menu, new", new_menu_parse, menus)
+    run("recommendations, old", old_recommendation_parse, recommendations)
+    run("recommendations, new", new_recommendation_parse, recommendations)
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
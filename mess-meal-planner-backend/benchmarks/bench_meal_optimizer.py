@@ -0,0 +1,55 @@
+"""
+Benchmark: MealOptimizer latency for menus of 10-200 items.
+
+Run from the backend folder:
+    python -m benchmarks.bench_meal_optimizer
+"""
+import random
+import statistics
+import time
+
+from core.meal_optimizer import MealOptimizer
+from core.nutrition_rag import NutritionRAG
+
+MENU_SIZES = [10, 25, 50, 100, 200]
+GOALS = ["bulk", "cut", "maintain"]
+DAILY_TARGET = {"calories": 2800, "protein": 150, "carbs": 350, "fats": 80}
+CURRENT_INTAKE = {"calories": 1500, "protein": 60, "carbs": 180, "fats": 35}
+RUNS = 20
+
+
+def synthetic_menu(foods, size, rng):
+    """Draw menu items from the food table, with jittered copies past its size"""
+    menu = {}
+    while len(menu) < size:
+        food = rng.choice(foods)
+        name = food["name"] if food["name"] not in menu else f"{food['name']} #{len(menu)}"
+        jitter = rng.uniform(0.8, 1.2)
+        menu[name] = {field: round(food[field] * jitter, 1) for field in ("calories", "protein", "carbs", "fats")}
+    return menu
+
+
+def main():
+    rng = random.Random(7)
+    foods = list(NutritionRAG("").food_database.values())
+    optimizer = MealOptimizer()
+    remaining = optimizer.remaining_budget(DAILY_TARGET, CURRENT_INTAKE)
+
+    print("=" * 64)
+    print(f"{'items':>6} {'goal':>10} {'p50 (ms)':>10} {'max (ms)':>10} {'best score':>12}")
+    print("-" * 64)
+    for size in MENU_SIZES:
+        menu = synthetic_menu(foods, size, rng)
+        for goal in GOALS:
+            timings = []
+            for _ in range(RUNS):
+                start = time.perf_counter()
+                combos = optimizer.optimize(menu, remaining, goal)
+                timings.append((time.perf_counter() - start) * 1000)
+            best = combos[0]["score"] if combos else float("nan")
+            print(f"{size:>6} {goal:>10} {statistics.median(timings):>10.2f} {max(timings):>10.2f} {best:>12.4f}")
+    print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: "top items" queries from the scan-time index vs re-sorting the menu.
+
+Builds a processed week (aggregate_menus over every meal), indexes it
+once as the scan job does, then answers highest-protein / lowest-calorie
+queries for every (day, meal) and for whole days: from the stored index
+(ranked_items), and by re-sorting the raw per-item dicts on each query
+the way callers did before. Reports the one-off index cost and the mean
+time per query.
+
+Run from the backend folder:
+    python -m benchmarks.bench_menu_index
+"""
+import contextlib
+import io
+import random
+import time
+
+from core.menu_index import index_menus, menu_entry_index, protein_density, ranked_items
+from core.nutrition_rag import INDIAN_FOODS, NutritionRAG
+
+MEALS = {"Breakfast": 6, "Lunch": 12, "Snacks": 4, "Dinner": 12}
+REPEAT = 200
+
+
+def week(rng, days=7):
+    names = [food["name"] for food in INDIAN_FOODS]
+    return [{"date": f"2025-11-{day + 3:02d}", "meals": {meal: rng.sample(names, count) for meal, count in MEALS.items()}}
+            for day in range(days)]
+
+
+def resorted(entry, by, meal, limit):
+    """What a query cost without the index: collect the items and sort them"""
+    if meal is None:
+        items = {}
+        for meal_items in entry["meals"].values():
+            items.update(meal_items)
+    else:
+        items = entry["meals"][meal]
+    resolved = [name for name, nutrition in items.items() if not nutrition.get("unresolved")]
+    if by == "protein_density":
+        ranked = sorted(resolved, key=lambda name: -protein_density(items[name]))
+    else:
+        ranked = sorted(resolved, key=lambda name: items[name]["calories"])
+    return [{"name": name, **items[name], "protein_density": round(protein_density(items[name]), 2)}
+            for name in ranked[:limit]]
+
+
+def mean_us(query, menus):
+    queries = [(entry, by, meal) for entry in menus for by in ("protein_density", "calories")
+               for meal in list(entry["meals"]) + [None]]
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for entry, by, meal in queries:
+            query(entry, by, meal, 3)
+    return (time.perf_counter() - start) / (REPEAT * len(queries)) * 1e6, len(queries)
+
+
+def main():
+    with contextlib.redirect_stdout(io.StringIO()):
+        menus = NutritionRAG("benchmark").aggregate_menus(week(random.Random(0)))
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for entry in menus:
+            menu_entry_index(entry)
+    index_ms = (time.perf_counter() - start) / REPEAT * 1000
+    index_menus(menus)
+
+    resort_us, count = mean_us(resorted, menus)
+    indexed_us, _ = mean_us(ranked_items, menus)
+    sample = menus[0]
+    for by in ("protein_density", "calories"):
+        for meal in list(sample["meals"]) + [None]:
+            assert resorted(sample, by, meal, 3) == ranked_items(sample, by, meal, 3)
+
+    print("=" * 64)
+    print(f"{len(menus)} days, {sum(MEALS.values())} items per day, {count} queries per pass")
+    print("-" * 64)
+    print(f"index the week (once, at scan time)  {index_ms:>10.2f} ms")
+    print(f"query by re-sorting the menu         {resort_us:>10.1f} µs")
+    print(f"query from the index                 {indexed_us:>10.1f} µs   ({resort_us / indexed_us:.1f}x)")
+    print("=" * 64)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: in-memory food table vs the compiled nutrition database.
+
+For growing synthetic tables, compares the time to get a NutritionRAG
+ready for its first exact and first fuzzy lookup: building dicts,
+FoodIndex and FuzzyMatcher in memory, opening the database file with its
+precompiled fuzzy index, and opening a file without one (the matcher
+is then built from every key, as files compiled before it did). Then
+the per-lookup cost of exact hits and of names that miss exactly (each
+one is scored against the whole table, so that cost grows with it).
+
+Run from the backend folder:
+    python -m benchmarks.bench_nutrition_db
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.bench_food_lookup import QUERIES, synthetic_keys
+from core.food_index import FoodIndex
+from core.fuzzy_match import FuzzyMatcher
+from core.nutrition_db import compile_database
+from core.nutrition_rag import NutritionRAG, INDIAN_FOODS
+
+SIZES = [1_000, 10_000, 50_000]
+REPEAT = 200
+
+
+def synthetic_foods(size):
+    rng = random.Random(7)
+    base = {food["name"].lower() for food in INDIAN_FOODS}
+    return [
+        {"name": key.title(), "calories": rng.randint(40, 600), "protein": rng.randint(0, 30),
+         "carbs": rng.randint(0, 80), "fats": rng.randint(0, 25), "portion": "1 bowl"}
+        for key in synthetic_keys(base, size) if key not in base
+    ]
+
+
+def in_memory_startup(foods):
+    """What NutritionRAG.initialize_database does, for a table of this size"""
+    start = time.perf_counter()
+    database = {food["name"].lower(): dict(food) for food in INDIAN_FOODS + foods}
+    FoodIndex(database.keys())
+    FuzzyMatcher(database.keys())
+    return time.perf_counter() - start
+
+
+def db_startup(db_path):
+    """Open the file and answer one exact and one fuzzy lookup"""
+    start = time.perf_counter()
+    rag = NutritionRAG("", db_path=db_path)
+    rag.search_food("dal")
+    rag.search_food("paner tika")
+    return time.perf_counter() - start, rag
+
+
+def time_lookups(rag, queries):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for query in queries:
+            rag.search_food(query)
+    return (time.perf_counter() - start) / (REPEAT * len(queries))
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    print("=" * 106)
+    print(f"{'rows':>7} {'file MB':>8} {'compile s':>10} {'dict ready ms':>14} {'db ready ms':>12} "
+          f"{'db, no fuzzy ms':>16} {'exact us':>9} {'miss us':>8} {'dict miss us':>13}")
+    print("-" * 106)
+    for size in SIZES:
+        foods = synthetic_foods(size)
+        source = os.path.join(directory, f"foods_{size}.json")
+        with open(source, "w") as f:
+            json.dump(foods, f)
+        db_path = os.path.join(directory, f"nutrition_{size}.db")
+
+        start = time.perf_counter()
+        compile_database(db_path, [source])
+        compile_s = time.perf_counter() - start
+
+        # The same file as compiled before the fuzzy index was stored
+        bare_path = os.path.join(directory, f"nutrition_{size}_bare.db")
+        shutil.copy(db_path, bare_path)
+        with sqlite3.connect(bare_path) as conn:
+            conn.execute("DROP TABLE fuzzy")
+
+        dict_startup = in_memory_startup(foods)
+        startup, db_rag = db_startup(db_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            bare_startup, _ = db_startup(bare_path)
+
+        # Lookup cost on the in-memory path at the same table size
+        memory_rag = NutritionRAG("")
+        memory_rag.food_database.update({food["name"].lower(): food for food in foods})
+        memory_rag._food_index = FoodIndex(memory_rag.food_database.keys())
+        memory_rag.fuzzy_matcher
+
+        exact = [food["name"].lower() for food in foods[:len(QUERIES)]]
+        misses = [q.lower() for q in QUERIES if q.lower() not in memory_rag.food_database]
+        print(f"{size:>7} {os.path.getsize(db_path) / 1e6:>8.1f} {compile_s:>10.2f} {dict_startup * 1000:>14.1f} "
+              f"{startup * 1000:>12.1f} {bare_startup * 1000:>16.1f} {time_lookups(db_rag, exact) * 1e6:>9.1f} "
+              f"{time_lookups(db_rag, misses) * 1e6:>8.1f} {time_lookups(memory_rag, misses) * 1e6:>13.1f}")
+    print("=" * 106)
+
+
+if __name__ == "__main__":
+    main()
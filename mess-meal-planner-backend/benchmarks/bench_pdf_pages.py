@@ -0,0 +1,113 @@
+"""
+Benchmark: whole-document vs page-parallel scanning of a 30-day menu PDF.
+
+Builds a 30-page PDF (one day per page) and scans it against a fake
+Gemini model whose latency grows with the number of pages it is sent.
+The fake answers with the dates it can read from the pages, so the
+merged output can be checked as well.
+
+Run from the backend folder:
+    python -m benchmarks.bench_pdf_pages
+"""
+import json
+import os
+import re
+import tempfile
+import time
+from types import SimpleNamespace
+
+import pymupdf
+
+from core import llm
+from core.menu_scanner import MenuScanner
+
+DAYS = 30
+BASE_LATENCY = 0.3
+PER_PAGE_LATENCY = 0.1
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def build_menu_pdf(path):
+    with pymupdf.open() as doc:
+        for day in range(1, DAYS + 1):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"2025-11-{day:02d}")
+            page.insert_text((72, 100), "Breakfast: Poha, Tea")
+            page.insert_text((72, 128), "Lunch: Rajma Rice, Roti, Curd")
+        doc.save(path)
+
+
+def fake_reply(pdf_bytes):
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        text = "".join(page.get_text() for page in doc)
+        pages = doc.page_count
+    menus = [
+        {"date": date, "day": "", "meals": {"Breakfast": ["Poha", "Tea"], "Lunch": ["Rajma Rice", "Roti", "Curd"]}}
+        for date in re.findall(r"\d{4}-\d{2}-\d{2}", text)
+    ]
+    return pages, SimpleNamespace(text=json.dumps({"menus": menus}))
+
+
+class FakeModel:
+    def _contents_bytes(self, contents):
+        part = contents[0]
+        if isinstance(part, dict):
+            return part["data"]
+        with open(part.path, "rb") as f:
+            return f.read()
+
+    def generate_content(self, contents, generation_config=None):
+        pages, reply = fake_reply(self._contents_bytes(contents))
+        time.sleep(BASE_LATENCY + PER_PAGE_LATENCY * pages)
+        return reply
+
+
+class FakeGenai:
+    def configure(self, api_key):
+        pass
+
+    def GenerativeModel(self, name):
+        return FakeModel()
+
+    def upload_file(self, path):
+        return SimpleNamespace(name=path, path=path, state=SimpleNamespace(name="ACTIVE"))
+
+    def delete_file(self, name):
+        pass
+
+
+def make_scanner(page_parallel, workers, pages_per_chunk=None):
+    scanner = MenuScanner("benchmark", cache_dir=tempfile.mkdtemp(prefix="scan_cache_"),
+                          page_parallel=page_parallel, pages_per_chunk=pages_per_chunk,
+                          max_page_workers=workers)
+    return scanner
+
+
+def main():
+    llm.set_genai(FakeGenai())
+    pdf_path = os.path.join(tempfile.mkdtemp(), "menu_30_days.pdf")
+    build_menu_pdf(pdf_path)
+
+    runs = [("whole document", make_scanner(False, 1))]
+    # Fixed 2-page chunks show scaling with workers; the default spreads
+    # pages evenly so each worker makes a single call
+    runs += [(f"2-page chunks x{w}", make_scanner(True, w, 2)) for w in WORKER_COUNTS]
+    runs += [(f"even split x{w}", make_scanner(True, w)) for w in WORKER_COUNTS[1:]]
+
+    results = []
+    for label, scanner in runs:
+        start = time.perf_counter()
+        menus = scanner.scan_pdf(pdf_path)["menus"]
+        results.append((label, time.perf_counter() - start, len(menus)))
+
+    baseline = results[0][1]
+    print("=" * 60)
+    print(f"{'mode':>20} {'wall (s)':>10} {'speedup':>9} {'days':>6}")
+    print("-" * 60)
+    for label, elapsed, days in results:
+        print(f"{label:>20} {elapsed:>10.2f} {baseline / elapsed:>8.1f}x {days:>6}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: planning a student's week, per-meal calls vs one /plan-week request.
+
+Today the frontend asks /get-recommendations once per meal per day. This
+drives both flows through the ASGI app for several students at once,
+with Gemini replaced by the local backend (fixed latency plus per-token
+prefill and decode time), and reports per student: upstream LLM calls,
+estimated input/output tokens and the time to get the whole week.
+
+Run from the backend folder:
+    python -m benchmarks.bench_plan_week
+    python -m benchmarks.bench_plan_week --students 16 --days 7
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from core.llm_local import LocalGemini, install
+from core.nutrition_rag import INDIAN_FOODS
+
+MEALS = {"Breakfast": 4, "Lunch": 6, "Snacks": 2, "Dinner": 6}
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def scanned_week(rng, days):
+    """A week of /scan-menu style entries: meals are lists of item names"""
+    names = [food["name"] for food in INDIAN_FOODS]
+    return [
+        {"date": f"2025-11-{day + 3:02d}", "day": DAY_NAMES[day % 7],
+         "meals": {meal: rng.sample(names, count) for meal, count in MEALS.items()}}
+        for day in range(days)
+    ]
+
+
+def student(i):
+    profile = {"age": 18 + i % 10, "height": 165 + i % 20, "weight": 60 + i % 25,
+               "goal": "bulk" if i % 2 else "cut", "activity_level": "moderate", "workout_today": "push"}
+    target = {"calories": 2200 + 50 * i, "protein": 120 + 5 * i, "carbs": 280, "fats": 70}
+    return profile, target
+
+
+async def per_meal(client, menus, i):
+    """One /get-recommendations per (day, meal), as the frontend does now"""
+    profile, target = student(i)
+    intake = {"calories": 0, "protein": 0, "carbs": 0, "fats": 0}
+    for entry in menus:
+        for items in entry["meals"].values():
+            response = await client.post("/get-recommendations", json={
+                "user_profile": profile, "menu_items": items, "current_intake": intake, "daily_target": target
+            })
+            response.raise_for_status()
+
+
+async def plan_week(client, menus, i):
+    profile, target = student(i)
+    response = await client.post("/plan-week", json={"user_profile": profile, "menus": menus, "daily_target": target})
+    response.raise_for_status()
+
+
+async def run(app, flow, menus, students):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        durations = []
+
+        async def timed(i):
+            start = time.perf_counter()
+            await flow(client, menus, i)
+            durations.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(timed(i) for i in range(students)))
+        return time.perf_counter() - start, durations
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=8)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.3, help="fixed fake Gemini latency per call (s)")
+    parser.add_argument("--input-token-latency", type=float, default=0.0001, help="fake prefill time per prompt token (s)")
+    parser.add_argument("--output-token-latency", type=float, default=0.004, help="fake decode time per reply token (s)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ["SCAN_CACHE_DIR"] = tempfile.mkdtemp(prefix="scan_cache_")
+    import main as app_module
+
+    # Menu items arrive with nutrition, as they come back from /scan-menu
+    menus = app_module.with_week_nutrition(scanned_week(random.Random(0), args.days))
+    slots = sum(len(entry["meals"]) for entry in menus)
+
+    print("=" * 88)
+    print(f"{args.students} students, {args.days} days, {slots} meals per student; fake Gemini "
+          f"{args.latency * 1000:.0f} ms + {args.input_token_latency * 1000:.2f} ms/input token "
+          f"+ {args.output_token_latency * 1000:.1f} ms/output token")
+    print("-" * 88)
+    print(f"{'flow':<14} {'calls/student':>14} {'in tok/student':>15} {'out tok/student':>16} "
+          f"{'week p50 s':>11} {'wall s':>8}")
+    for name, flow in (("per-meal", per_meal), ("plan-week", plan_week)):
+        backend = LocalGemini(latency=args.latency, jitter=0, input_token_latency=args.input_token_latency,
+                              output_token_latency=args.output_token_latency)
+        install(backend, app_module.menu_scanner, app_module.meal_agent)
+        with contextlib.redirect_stdout(io.StringIO()):
+            wall, durations = asyncio.run(run(app_module.app, flow, menus, args.students))
+        print(f"{name:<14} {backend.calls / args.students:>14.1f} {backend.input_tokens / args.students:>15.0f} "
+              f"{backend.output_tokens / args.students:>16.0f} {statistics.median(durations):>11.2f} {wall:>8.2f}")
+    print("=" * 88)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Benchmark: recommendation prompt size and latency, before and after compaction.
+
+Builds realistic weekly menus (7 days x 4 meals drawn from the nutrition
+table, macros resolved by NutritionRAG) and compares three prompts for
+the same request:
+
+- original: the first version, with the whole menu as indented JSON
+- previous: optimizer combinations plus a list of the other item names
+- compact:  the current PromptBuilder prompt (macro table, token budget)
+
+Token counts are the estimate the LLM client uses for rate limiting.
+Latency is one call to the local Gemini stand-in, whose delay grows with
+prompt tokens (--token-latency), plus building the prompt.
+
+Run from the backend folder:
+    python -m benchmarks.bench_prompts
+    python -m benchmarks.bench_prompts --days 1 --budget 400
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import time
+
+from agents.meal_agent import MealPlanningAgent
+from core import llm
+from core.llm_local import LocalGemini
+from core.nutrition_rag import INDIAN_FOODS, NutritionRAG
+
+MEALS = {"Breakfast": 4, "Lunch": 6, "Snacks": 2, "Dinner": 6}
+PROFILE = {"age": 21, "height": 175, "weight": 70, "goal": "bulk", "activity_level": "moderate", "workout_today": "push"}
+TARGET = {"calories": 2800, "protein": 150, "carbs": 350, "fats": 80}
+INTAKE = {"calories": 900, "protein": 40, "carbs": 120, "fats": 30}
+
+
+def weekly_menu(rng, days):
+    """Distinct item names served over `days` days"""
+    names = [food["name"] for food in INDIAN_FOODS]
+    served = []
+    for _ in range(days):
+        for count in MEALS.values():
+            served.extend(rng.sample(names, count))
+    return list(dict.fromkeys(served))
+
+
+def original_prompt(menu_items, user_profile, current_intake, target_macros):
+    """The prompt as first written: profile, targets and the menu as indented JSON"""
+    return f"""
+        You are a professional fitness coach and nutritionist.
+
+        USER PROFILE:
+        - Age: {user_profile['age']}
+        - Height: {user_profile['height']} cm
+        - Weight: {user_profile['weight']} kg
+        - Goal: {user_profile['goal']} (bulk/cut)
+        - Workout: {user_profile['workout_today']}
+
+        DAILY TARGETS:
+        - Calories: {target_macros['calories']}
+        - Protein: {target_macros['protein']}g
+        - Carbs: {target_macros['carbs']}g
+        - Fats: {target_macros['fats']}g
+
+        CURRENT INTAKE (eaten so far):
+        - Calories: {current_intake['calories']}
+        - Protein: {current_intake['protein']}g
+        - Carbs: {current_intake['carbs']}g
+        - Fats: {current_intake['fats']}g
+
+        TODAY'S AVAILABLE MENU:
+        {json.dumps(menu_items, indent=2)}
+
+        TASK:
+        1. Analyze the available menu items
+        2. Create 3 meal recommendations that:
+           - Fit within daily macro targets
+           - Consider the user's goal (bulk = high calories/protein, cut = high protein, low carbs)
+           - Account for what they've already eaten
+           - Are appropriate for their workout today
+        3. For each recommendation, specify:
+           - Which items to eat
+           - Portion sizes
+           - Total macros (calories, protein, carbs, fats)
+           - Why this combination is optimal
+        4. Provide 2-3 alternative food swaps if they don't like something
+
+        Format response as JSON with this structure:
+        {{
+            "recommendations": [
+                {{
+                    "name": "Recommendation 1",
+                    "description": "Best for muscle gain",
+                    "items": ["item1 - quantity", "item2 - quantity"],
+                    "total_macros": {{"calories": 950, "protein": 52, "carbs": 98, "fats": 31}},
+                    "reasoning": "Why this is optimal"
+                }}
+            ],
+            "alternatives": ["Alternative 1", "Alternative 2"],
+            "motivation": "Motivational message about today's workout"
+        }}
+        """
+
+
+def previous_prompt(menu_items, user_profile, remaining, result, combos):
+    """The optimizer-era prompt: combinations as dicts, other items by name only"""
+    combo_lines = "\n".join(
+        f"{i + 1}. {', '.join(rec['items'])} -> {rec['total_macros']}"
+        for i, rec in enumerate(result['recommendations'])
+    )
+    other_items = [name for name in menu_items if name not in {n for c in combos for n, _ in c['items']}]
+    return f"""
+        You are a professional fitness coach and nutritionist.
+
+        USER PROFILE:
+        - Goal: {user_profile['goal']} (bulk/cut)
+        - Workout: {user_profile['workout_today']}
+
+        REMAINING FOR TODAY:
+        - Calories: {remaining['calories']}
+        - Protein: {remaining['protein']}g
+        - Carbs: {remaining['carbs']}g
+        - Fats: {remaining['fats']}g
+
+        These meal combinations were already calculated (macros are exact, do not change them):
+        {combo_lines}
+
+        Other items on the menu: {", ".join(other_items) or "none"}
+
+        TASK:
+        1. For each combination, write a short description and explain why it suits the goal and workout
+        2. Provide 2-3 alternative food swaps from the other menu items
+        3. Write a motivational message about today's workout
+
+        Format response as JSON with this structure:
+        {{
+            "recommendations": [
+                {{"description": "Best for muscle gain", "reasoning": "Why this is optimal"}}
+            ],
+            "alternatives": ["Alternative 1", "Alternative 2"],
+            "motivation": "Motivational message about today's workout"
+        }}
+        """
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--menus", type=int, default=20, help="weekly menus to sample")
+    parser.add_argument("--days", type=int, default=7, help="days per menu")
+    parser.add_argument("--budget", type=int, default=None, help="prompt token budget (default: PROMPT_TOKEN_BUDGET or 800)")
+    parser.add_argument("--latency", type=float, default=0.05, help="fixed fake Gemini latency (s)")
+    parser.add_argument("--token-latency", type=float, default=0.0002, help="extra fake latency per prompt token (s)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rag = NutritionRAG(os.getenv("GOOGLE_API_KEY", "benchmark"))
+    agent = MealPlanningAgent("benchmark", llm_client=llm.LLMClient(max_concurrency=1),
+                              prompt_token_budget=args.budget)
+    agent.model = LocalGemini(latency=args.latency, jitter=0, input_token_latency=args.token_latency).GenerativeModel("bench")
+
+    rows = {"original": [], "previous": [], "compact": []}
+    item_counts = []
+    for _ in range(args.menus):
+        names = weekly_menu(rng, args.days)
+        _, nutrition, _ = rag.resolve_batch(names)
+        menu_items = {name: nutrition[name] for name in names}
+        item_counts.append(len(menu_items))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            result, combos, remaining = agent._plan_recommendations(menu_items, PROFILE, INTAKE, TARGET)
+            builders = {
+                "original": lambda: original_prompt(menu_items, PROFILE, INTAKE, TARGET),
+                "previous": lambda: previous_prompt(menu_items, PROFILE, remaining, result, combos),
+                "compact": lambda: agent._recommendation_prompt(menu_items, PROFILE, remaining, result, combos),
+            }
+            for name, build in builders.items():
+                start = time.perf_counter()
+                prompt = build()
+                agent.llm.generate(agent.model, prompt, "bench")
+                rows[name].append((llm.estimate_tokens(prompt), len(prompt), time.perf_counter() - start))
+
+    budget = args.budget or "default"
+    print("=" * 72)
+    print(f"{args.menus} menus x {args.days} days, {statistics.mean(item_counts):.0f} distinct items on average, "
+          f"budget {budget}")
+    print(f"fake latency {args.latency * 1000:.0f} ms + {args.token_latency * 1000:.2f} ms/token")
+    print("-" * 72)
+    print(f"{'prompt':<10} {'tokens':>8} {'max':>7} {'chars':>8} {'latency ms':>11} {'vs original':>12}")
+    base_tokens = statistics.mean(tokens for tokens, _, _ in rows["original"])
+    for name, samples in rows.items():
+        tokens = [s[0] for s in samples]
+        chars = [s[1] for s in samples]
+        latency = [s[2] for s in samples]
+        print(f"{name:<10} {statistics.mean(tokens):>8.0f} {max(tokens):>7} {statistics.mean(chars):>8.0f} "
+              f"{statistics.median(latency) * 1000:>11.1f} {statistics.mean(tokens) / base_tokens - 1:>+12.0%}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark: throughput of serve.py on CPU-bound endpoints as workers are added.
+
+For each worker count it starts `serve.py --workers N` (fake Gemini, a
+fresh working directory), drives it from several client processes for a
+fixed time, and reports requests/s, p95 latency and the speedup over
+one worker. The endpoints only use the CPU (the meal optimizer with
+fast=true, fuzzy batch food search), so with enough cores throughput
+should grow close to linearly with the worker count.
+
+The load generator runs on the same machine: give it spare cores
+(--clients), or the numbers flatten out once clients and workers share
+the CPUs. The default worker counts go up to the CPU count.
+
+Run from the backend folder:
+    python -m benchmarks.bench_serve_scaling
+    python -m benchmarks.bench_serve_scaling --workers 1,2,4,8 --clients 16 --duration 15
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from core.nutrition_rag import INDIAN_FOODS
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUZZY_NAMES = ["paner tikka", "dal makhni", "chiken curry", "alu paratha", "rajmah rice", "veg biriyani",
+               "masala dossa", "chole bhature", "jeera rise", "gulab jamon"]
+
+
+def recommendation_request(rng):
+    menu = {food["name"]: {key: food[key] for key in ("calories", "protein", "carbs", "fats")}
+            for food in rng.sample(INDIAN_FOODS, 30)}
+    return {
+        "user_profile": {"age": 21, "height": 175, "weight": 70, "goal": rng.choice(["bulk", "cut"])},
+        "menu_items": menu,
+        "current_intake": {"calories": rng.randrange(0, 1200, 100), "protein": 30, "carbs": 100, "fats": 30},
+        "daily_target": {"calories": 2600, "protein": 140, "carbs": 320, "fats": 75},
+        "fast": True
+    }
+
+
+SCENARIOS = {
+    "recommendations-fast": lambda rng: ("POST", "/get-recommendations", {"json": recommendation_request(rng)}),
+    "search-food-batch": lambda rng: ("POST", "/search-food", {"json": {"foods": rng.sample(FUZZY_NAMES, 6)}}),
+}
+
+
+def client(base_url, scenario, duration, seed, results):
+    """One load-generating process: requests back to back until the time is up"""
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    with httpx.Client(base_url=base_url, timeout=60) as http:
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            method, url, kwargs = SCENARIOS[scenario](rng)
+            start = time.perf_counter()
+            response = http.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+    results.put((latencies, errors))
+
+
+def start_server(workers, port, workdir):
+    env = {**os.environ, "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "benchmark"), "LLM_BACKEND": "local",
+           "PYTHONPATH": BACKEND_DIR}
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "serve.py"), "--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        if server.poll() is not None:
+            break
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"serve.py with {workers} workers did not come up on port {port}")
+
+
+def run_level(scenario, workers, clients, duration, port):
+    with tempfile.TemporaryDirectory(prefix="serve_bench_") as workdir:
+        server = start_server(workers, port, workdir)
+        try:
+            results = multiprocessing.Queue()
+            base_url = f"http://127.0.0.1:{port}"
+            # Short untimed round to warm the connection pool and code paths
+            client(base_url, scenario, 1.0, -1, results)
+            results.get()
+            processes = [multiprocessing.Process(target=client, args=(base_url, scenario, duration, seed, results))
+                         for seed in range(clients)]
+            for process in processes:
+                process.start()
+            collected = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    latencies = np.concatenate([np.array(latency) for latency, _ in collected])
+    return {
+        "throughput": len(latencies) / duration,
+        "p95_ms": float(np.percentile(latencies * 1000, 95)),
+        "errors": sum(errors for _, errors in collected)
+    }
+
+
+def main():
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, 8, 16, cpus} & set(range(1, cpus + 1)) | {1, 2})
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)), help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, help="load-generating processes (default: 2x the largest worker count)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per level")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.workers.split(",")]
+    clients = args.clients or 2 * max(levels)
+
+    print("=" * 80)
+    print(f"{cpus} CPUs available, {clients} client processes, {args.duration:.0f}s per level")
+    print("-" * 80)
+    print(f"{'endpoint':<22} {'workers':>7} {'req/s':>10} {'p95 ms':>9} {'speedup':>8} {'efficiency':>11} {'err':>4}")
+    for scenario in args.scenarios.split(","):
+        single = None
+        for workers in levels:
+            result = run_level(scenario, workers, clients, args.duration, args.port)
+            single = single or result["throughput"] / workers
+            speedup = result["throughput"] / single
+            print(f"{scenario:<22} {workers:>7} {result['throughput']:>10.1f} {result['p95_ms']:>9.1f} "
+                  f"{speedup:>7.2f}x {speedup / workers:>10.0%} {result['errors']:>4}")
+    print("=" * 80)
+    if max(levels) > cpus:
+        print(f"⚠️ More workers than CPUs ({cpus}); expect no gain past {cpus}")
+
+
+if __name__ == "__main__":
+    main()
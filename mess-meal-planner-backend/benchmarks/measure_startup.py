@@ -0,0 +1,97 @@
+"""
+Measure cold start: how long a fresh worker takes to import the app and
+serve its first request, and which imports dominate.
+
+Each measurement runs in a new interpreter so nothing is already cached.
+With --budget-ms the script exits non-zero when `import main` is slower,
+so it can guard the startup budget for autoscaled workers.
+
+Run from the backend folder:
+    python -m benchmarks.measure_startup [--runs 5] [--budget-ms 1000]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import main
+print((time.perf_counter() - start) * 1000)
+"""
+
+FIRST_REQUEST_SNIPPET = """
+import time
+start = time.perf_counter()
+import main
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+imported = time.perf_counter()
+client.get("/health")
+health = time.perf_counter()
+client.get("/search-food/dal")
+search = time.perf_counter()
+main.warm_up()
+warm = time.perf_counter()
+print((imported - start) * 1000, (health - imported) * 1000, (search - health) * 1000, (warm - search) * 1000)
+"""
+
+
+def run(snippet, *flags):
+    env = dict(os.environ, GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "startup-benchmark"))
+    result = subprocess.run([sys.executable, *flags, "-c", snippet], capture_output=True, text=True,
+                            env=env, cwd=os.getcwd(), check=True)
+    return result
+
+
+def top_imports(limit):
+    """Slowest modules imported directly by main, by cumulative import time (-X importtime)"""
+    stderr = run("import main", "-X", "importtime").stderr
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Nesting is two spaces per level; main itself is at depth 0
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            totals[name.strip()] = int(cumulative) / 1000
+    return sorted(totals.items(), key=lambda item: -item[1])[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, help="fail if the median `import main` exceeds this")
+    args = parser.parse_args()
+
+    import_ms = [float(run(IMPORT_SNIPPET).stdout.split()[-1]) for _ in range(args.runs)]
+    phases = [list(map(float, run(FIRST_REQUEST_SNIPPET).stdout.split()[-4:])) for _ in range(args.runs)]
+    median_import = statistics.median(import_ms)
+
+    print("=" * 60)
+    print(f"Cold start over {args.runs} fresh interpreters (median)")
+    print("-" * 60)
+    print(f"{'import main':<34} {median_import:>10.0f} ms")
+    for i, label in enumerate(["import main + TestClient", "first /health", "first /search-food", "warm_up()"]):
+        print(f"{label:<34} {statistics.median(p[i] for p in phases):>10.0f} ms")
+    print("-" * 60)
+    print("Slowest imports from main (cumulative)")
+    for name, ms in top_imports(args.top):
+        print(f"  {name:<32} {ms:>10.0f} ms")
+    print("=" * 60)
+
+    if args.budget_ms is not None:
+        if median_import > args.budget_ms:
+            print(f"❌ import main took {median_import:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+            sys.exit(1)
+        print(f"✓ import main within the {args.budget_ms:.0f}ms budget")
+
+
+if __name__ == "__main__":
+    main()
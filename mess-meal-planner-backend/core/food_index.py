@@ -0,0 +1,126 @@
+import bisect
+
+# Table foods that, inside a longer dish name, usually describe it
+# ("Butter Naan" is naan); other matching keys are preferred over them
+ACCOMPANIMENTS = frozenset({"butter", "ghee", "achar", "chatni", "chutney", "jam", "sauce"})
+
+
+class FoodIndex:
+    """
+    Substring index over food database keys.
+
+    Answers the same question as the old partial-match loop in
+    NutritionRAG.search_food ("is the query inside a key, or a key inside
+    the query?") without scanning every row:
+
+    - keys contained in the query are found by looking up every substring
+      of the query in a hash set (cost depends on query length only)
+    - keys containing the query are found by intersecting trigram
+      posting lists and verifying the few surviving candidates (two
+      character queries use a bigram posting list directly)
+    """
+
+    def __init__(self, keys, ngram_size=3):
+        self.ngram_size = ngram_size
+        self.keys = []
+        self.key_set = set()
+        self.key_lengths = []
+        self.keys_by_length = {}
+        self.postings = {}
+        for key in keys:
+            self.add(key)
+
+    def _ngrams(self, text, n=None):
+        n = n or self.ngram_size
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def add(self, key):
+        """Add a single (already normalized) key to the index"""
+        if not key or key in self.key_set:
+            return
+        key_id = len(self.keys)
+        self.keys.append(key)
+        self.key_set.add(key)
+        self.keys_by_length.setdefault(len(key), []).append(key)
+        for gram in self._ngrams(key) | self._ngrams(key, 2):
+            self.postings.setdefault(gram, []).append(key_id)
+        if len(key) not in self.key_lengths:
+            bisect.insort(self.key_lengths, len(key))
+
+    def contained_keys(self, query):
+        """Keys that appear as a substring of the query"""
+        found = set()
+        query_length = len(query)
+        for length in self.key_lengths:
+            if length > query_length:
+                break
+            for start in range(query_length - length + 1):
+                candidate = query[start:start + length]
+                if candidate in self.key_set:
+                    found.add(candidate)
+        return found
+
+    def containing_keys(self, query):
+        """Keys that contain the query as a substring"""
+        if len(query) == 2:
+            return {self.keys[i] for i in self.postings.get(query, [])}
+        if len(query) < self.ngram_size:
+            # Single characters: walk keys shortest-first and stop at the
+            # first length that matches, since lookup() prefers the
+            # shortest containing key anyway
+            for length in self.key_lengths:
+                if length < len(query):
+                    continue
+                found = {key for key in self.keys_by_length[length] if query in key}
+                if found:
+                    return found
+            return set()
+
+        postings = []
+        for gram in self._ngrams(query):
+            posting = self.postings.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return set()
+
+        return {self.keys[i] for i in candidates if query in self.keys[i]}
+
+    def lookup(self, query):
+        """
+        Return the best matching key for the query, or None.
+
+        Accompaniments (ACCOMPANIMENTS) lose to any other candidate; the
+        rest are ranked by how much of the longer string the shorter
+        one covers, then by key length (longest / most specific first),
+        then by where the match starts (earliest first), then
+        alphabetically, so results are deterministic,
+        "dal makhani special" resolves to "dal makhani" rather than "dal",
+        and "paneer butter masala" to "paneer" rather than "butter".
+        """
+        if not query:
+            return None
+        if query in self.key_set:
+            return query
+        return best_match(query, self.contained_keys(query) | self.containing_keys(query))
+
+
+def best_match(query, candidates):
+    """Pick the lookup() winner among candidate keys (see FoodIndex.lookup)"""
+    if not candidates:
+        return None
+
+    query_length = len(query)
+
+    def rank(key):
+        coverage = min(len(key), query_length) / max(len(key), query_length)
+        position = query.find(key) if key in query else key.find(query)
+        return (key in ACCOMPANIMENTS, -coverage, -len(key), position, key)
+
+    return min(candidates, key=rank)
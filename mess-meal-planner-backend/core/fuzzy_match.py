@@ -0,0 +1,172 @@
+import re
+
+import numpy as np
+from scipy import sparse
+
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def compact_name(name):
+    """Lowercase with spaces and punctuation removed ("Chana  Masala" -> "chanamasala")"""
+    return NON_ALNUM.sub("", str(name).lower())
+
+
+class FuzzyMatcher:
+    """
+    Typo-tolerant food name matching with character n-gram TF-IDF.
+
+    Names are compared in compact form (no spaces or punctuation) with
+    boundary markers, so spacing variants like "Gulabjamun" / "Gulab Jamun"
+    score 1.0 and spelling variants like "Zeera Rice" / "Jeera Rice" share
+    most of their n-grams. A batch of query names is scored against every
+    key with one sparse matrix product.
+
+    On large tables, n-grams found in more than max_df of the keys (and
+    at least min_common_df keys) are left out of that product: they touch
+    most rows but barely move the ranking. The best candidates it finds
+    are then rescored exactly with every n-gram.
+
+    Everything that depends only on the keys can be computed ahead of
+    time (compiled() / from_compiled()); compiled nutrition databases
+    carry it, so large tables aren't re-vectorized on every start.
+    """
+
+    def __init__(self, keys, ngram_range=(2, 3), batch_size=512, max_df=0.01, min_common_df=50, rescore=50,
+                 compiled=None):
+        self.ngram_range = ngram_range
+        self.batch_size = batch_size
+        self.rescore = rescore
+        if compiled is None:
+            compiled = self._compile(list(dict.fromkeys(keys)))
+        elif tuple(compiled["ngram_range"]) != tuple(ngram_range):
+            raise ValueError(f"compiled for n-grams {compiled['ngram_range']}, not {ngram_range}")
+        else:
+            self._set_vocabulary(compiled["grams"], compiled["document_frequency"], len(compiled["keys"]))
+        self.keys = compiled["keys"]
+        self.key_matrix = compiled["key_matrix"]
+
+        self.matrix = self.key_matrix.T.tocsr()
+        common = compiled["document_frequency"] > max(max_df * len(self.keys), min_common_df)
+        self.candidate_columns = sparse.diags((~common).astype(np.float64)) if common.any() else None
+
+    @classmethod
+    def from_compiled(cls, compiled, **options):
+        """Matcher over the output of compiled(), without re-reading the keys"""
+        return cls(None, ngram_range=tuple(compiled["ngram_range"]), compiled=compiled, **options)
+
+    def compiled(self):
+        """
+        Everything derived from the keys alone: the keys in column order,
+        the n-gram vocabulary, document frequencies and the TF-IDF key
+        matrix. compile_database stores it next to the food table.
+        """
+        return {
+            "ngram_range": list(self.ngram_range),
+            "keys": self.keys,
+            "grams": list(self.vocabulary),
+            "document_frequency": self.document_frequency,
+            "key_matrix": self.key_matrix,
+        }
+
+    def _compile(self, keys):
+        vocabulary = {}
+        rows = [self._grams(key) for key in keys]
+        for grams in rows:
+            for gram in grams:
+                vocabulary.setdefault(gram, len(vocabulary))
+
+        document_frequency = np.zeros(len(vocabulary))
+        for grams in rows:
+            document_frequency[[vocabulary[gram] for gram in grams]] += 1
+        self._set_vocabulary(vocabulary, document_frequency, len(keys))
+        return {"ngram_range": self.ngram_range, "keys": keys, "grams": list(vocabulary),
+                "document_frequency": document_frequency, "key_matrix": self._vectorize(rows)}
+
+    def _set_vocabulary(self, grams, document_frequency, key_count):
+        self.vocabulary = grams if isinstance(grams, dict) else {gram: column for column, gram in enumerate(grams)}
+        self.document_frequency = document_frequency
+        # Smoothed IDF; n-grams never seen in the table get the maximum weight
+        self.idf = np.log((1 + key_count) / (1 + document_frequency)) + 1
+        self.unknown_idf = np.log(1 + key_count) + 1
+
+    def _grams(self, name):
+        """n-gram -> count for one name"""
+        text = f"^{compact_name(name)}$"
+        grams = {}
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            for i in range(len(text) - n + 1):
+                gram = text[i:i + n]
+                grams[gram] = grams.get(gram, 0) + 1
+        return grams
+
+    def _vectorize(self, rows):
+        """L2-normalized TF-IDF rows; unknown n-grams only count towards the norm"""
+        indptr = [0]
+        indices = []
+        data = []
+        for grams in rows:
+            known = [(self.vocabulary[gram], count) for gram, count in grams.items() if gram in self.vocabulary]
+            weights = np.array([count * self.idf[column] for column, count in known])
+            unknown = np.array([count * self.unknown_idf for gram, count in grams.items() if gram not in self.vocabulary])
+            norm = np.sqrt((weights ** 2).sum() + (unknown ** 2).sum()) or 1.0
+            indices.extend(column for column, _ in known)
+            data.extend(weights / norm)
+            indptr.append(len(indices))
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(self.vocabulary)))
+
+    def top_k(self, names, k=3):
+        """
+        Score names against every key.
+
+        Returns one list per name of up to k (key, score) pairs, best
+        first (ties by key); scores are cosine similarities in [0, 1].
+        """
+        results = []
+        for start in range(0, len(names), self.batch_size):
+            batch = names[start:start + self.batch_size]
+            queries = self._vectorize([self._grams(name) for name in batch])
+            if self.candidate_columns is None:
+                scores = (queries @ self.matrix).tocsr()
+                for row in range(len(batch)):
+                    begin, end = scores.indptr[row], scores.indptr[row + 1]
+                    results.append(self._best(scores.data[begin:end], scores.indices[begin:end], k))
+                continue
+
+            scores = (queries @ self.candidate_columns @ self.matrix).tocsr()
+            ranked = [None] * len(batch)
+            pair_columns = []
+            for row in range(len(batch)):
+                begin, end = scores.indptr[row], scores.indptr[row + 1]
+                values = scores.data[begin:end]
+                columns = scores.indices[begin:end]
+                if len(values) == 0:
+                    # Only common n-grams in this name: score it against every key
+                    full = (queries[row] @ self.matrix).tocsr()
+                    ranked[row] = self._best(full.data, full.indices, k)
+                    columns = columns[:0]
+                elif len(values) > self.rescore:
+                    columns = columns[np.argpartition(-values, self.rescore - 1)[:self.rescore]]
+                pair_columns.append(columns)
+
+            # Exact cosine for every (name, candidate) pair in one product
+            pair_rows = np.repeat(np.arange(len(batch)), [len(columns) for columns in pair_columns])
+            exact = np.asarray(
+                self.key_matrix[np.concatenate(pair_columns)].multiply(queries[pair_rows]).sum(axis=1)
+            ).ravel()
+            offset = 0
+            for row, columns in enumerate(pair_columns):
+                if ranked[row] is None:
+                    ranked[row] = self._best(exact[offset:offset + len(columns)], columns, k)
+                offset += len(columns)
+            results.extend(ranked)
+        return results
+
+    def _best(self, values, columns, k):
+        if len(values) > k:
+            # Keep everything tied with the k-th score so ties break by
+            # key, independent of table order
+            kth = -np.partition(-values, k - 1)[k - 1]
+            keep = values >= kth
+            values, columns = values[keep], columns[keep]
+        ranked = sorted((-value, self.keys[column]) for value, column in zip(values, columns) if value > 0)
+        return [(key, float(-score)) for score, key in ranked[:k]]
@@ -0,0 +1,72 @@
+import io
+import os
+from PIL import Image, ImageOps
+
+
+class ImagePreprocessor:
+    def __init__(self, max_dimension=1600, grayscale=True, autocontrast=True, jpeg_quality=80):
+        """
+        Shrink menu photos before they go to Gemini Vision.
+
+        Applies EXIF rotation, downscales so the longest side is at most
+        max_dimension, optionally converts to grayscale with contrast
+        stretching, and re-encodes as JPEG. Menus are text, so this keeps
+        them readable while cutting upload size and image tokens.
+        """
+        self.max_dimension = max_dimension
+        self.grayscale = grayscale
+        self.autocontrast = autocontrast
+        self.jpeg_quality = jpeg_quality
+
+    def _original_size(self, source):
+        if isinstance(source, (bytes, bytearray)):
+            return len(source)
+        if isinstance(source, (str, os.PathLike)):
+            return os.path.getsize(source)
+        position = source.tell()
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(position)
+        return size
+
+    def process(self, source):
+        """
+        Preprocess an image given as a path, file-like object or bytes.
+
+        Returns (jpeg_bytes, stats).
+        """
+        original_bytes = self._original_size(source)
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+
+        with Image.open(source) as image:
+            original_dimensions = image.size
+            image = ImageOps.exif_transpose(image)
+
+            if self.grayscale:
+                image = image.convert("L")
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+
+            image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS)
+
+            if self.autocontrast:
+                image = ImageOps.autocontrast(image, cutoff=1)
+
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=self.jpeg_quality, optimize=True)
+            processed_dimensions = image.size
+
+        data = output.getvalue()
+        stats = {
+            "original_bytes": original_bytes,
+            "processed_bytes": len(data),
+            "original_dimensions": original_dimensions,
+            "processed_dimensions": processed_dimensions
+        }
+        print(
+            f"🖼️ Preprocessed image: {original_bytes / 1024:.0f} KB -> {len(data) / 1024:.0f} KB "
+            f"({original_dimensions[0]}x{original_dimensions[1]} -> "
+            f"{processed_dimensions[0]}x{processed_dimensions[1]})"
+        )
+        return data, stats
@@ -0,0 +1,73 @@
+import re
+
+import orjson
+
+
+class JsonArrayStreamParser:
+    def __init__(self, key):
+        """
+        Incrementally pull complete objects out of a JSON array in a text stream.
+
+        Feed it chunks of a streamed model response; it finds the array
+        under `key` (e.g. "recommendations") and returns each element
+        object as soon as its closing brace arrives, without waiting for
+        the rest of the document. Text around the JSON (markdown fences,
+        prose) is ignored.
+        """
+        self.key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self.buffer = ""
+        self.position = 0
+        self.state = "seek"  # seek -> array -> done
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+
+    def feed(self, text):
+        """Add a chunk; return the list of objects completed by it"""
+        self.buffer += text
+        completed = []
+
+        if self.state == "seek":
+            match = self.key_pattern.search(self.buffer)
+            if not match:
+                return completed
+            self.position = match.end()
+            self.state = "array"
+
+        buffer = self.buffer
+        while self.state == "array" and self.position < len(buffer):
+            char = buffer[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if self.depth == 0 and char == "{":
+                    self.object_start = self.position
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 0:
+                    # End of the array itself
+                    self.state = "done"
+                else:
+                    self.depth -= 1
+                    if self.depth == 0 and self.object_start is not None:
+                        try:
+                            completed.append(orjson.loads(buffer[self.object_start:self.position + 1]))
+                        except orjson.JSONDecodeError:
+                            pass
+                        self.object_start = None
+            self.position += 1
+
+        return completed
+
+    @property
+    def text(self):
+        """Everything fed so far"""
+        return self.buffer
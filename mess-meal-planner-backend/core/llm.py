@@ -0,0 +1,315 @@
+import functools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from core.metrics import LLM_IN_FLIGHT, LLM_PROMPT_TOKENS, LLM_QUEUE_WAIT, LLM_RETRIES, gemini_call
+
+_lock = threading.Lock()
+_api_key = None
+_genai = None
+_client = None
+
+# google.api_core exception names / HTTP codes worth retrying
+RETRYABLE_ERRORS = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+                    "InternalServerError", "DeadlineExceeded", "GatewayTimeout"}
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+# Gemini bills every image / PDF page part at a flat token count
+TOKENS_PER_MEDIA_PART = 258
+CHARS_PER_TOKEN = 4
+
+
+def configure(api_key):
+    """
+    Remember the Gemini API key.
+
+    Nothing is imported or configured here; google.generativeai is only
+    loaded (and configured once, for every component) on first use.
+    """
+    global _api_key
+    _api_key = api_key
+
+
+def genai():
+    """The google.generativeai module (or the backend set with set_genai), loaded on first use"""
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                if os.getenv("LLM_BACKEND", "gemini").lower() == "local":
+                    from core.llm_local import LocalGemini
+                    module = LocalGemini.from_env()
+                else:
+                    import google.generativeai as module
+                    module.configure(api_key=_api_key)
+                _genai = module
+    return _genai
+
+
+@functools.lru_cache(maxsize=None)
+def get_model(name):
+    """One shared GenerativeModel per model name"""
+    return genai().GenerativeModel(name)
+
+
+def set_genai(module):
+    """Swap in a stand-in for google.generativeai (benchmarks, offline runs)"""
+    global _genai
+    _genai = module
+    get_model.cache_clear()
+
+
+class LLMUnavailable(Exception):
+    """The LLM could not take the call (quota, overload, queue full); retry later"""
+
+    def __init__(self, message, retry_after=5.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(error):
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERRORS:
+        return True
+    code = getattr(error, "code", None)
+    try:
+        return int(code) in RETRYABLE_CODES
+    except (TypeError, ValueError):
+        return False
+
+
+def estimate_tokens(contents):
+    """Rough input token count for rate limiting (text length, flat cost per media part)"""
+    if isinstance(contents, str):
+        return max(1, len(contents) // CHARS_PER_TOKEN)
+    if isinstance(contents, (list, tuple)):
+        return sum(estimate_tokens(part) for part in contents)
+    return TOKENS_PER_MEDIA_PART
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at rate_per_minute.
+
+    reserve() never blocks: it takes the tokens (going into debt if
+    needed) and returns how long the caller must wait, so callers sleep
+    outside the lock and are served in arrival order.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, amount):
+        """Give back (positive) or take (negative) tokens after the fact"""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMClient:
+    """
+    The one gateway every component uses to reach the LLM.
+
+    - at most max_concurrency calls in flight across the process;
+      callers queue for a slot and give up with LLMUnavailable after
+      queue_timeout
+    - optional token buckets for requests and tokens per minute
+    - retries with full-jitter exponential backoff on quota / overload
+      errors; when they run out the caller gets LLMUnavailable
+    - queue wait, retries and every attempt are recorded in core.metrics
+
+    Models come from the components (so benchmarks can swap them); file
+    calls go to the genai() backend.
+    """
+
+    def __init__(self, max_concurrency=8, requests_per_minute=None, tokens_per_minute=None,
+                 max_retries=3, base_delay=0.5, max_delay=8.0, queue_timeout=30.0):
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queue_timeout = queue_timeout
+        self.random = random.Random()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Limits from LLM_* variables. They are for the whole deployment:
+        with LLM_PROCESSES worker processes (set by serve.py) each process
+        gets an even share, so N workers don't add up to N times the quota.
+        """
+        def number(name, default, cast=float):
+            value = os.getenv(name)
+            return cast(value) if value else default
+        processes = max(1, number("LLM_PROCESSES", 1, int))
+        requests_per_minute = number("LLM_REQUESTS_PER_MINUTE", None)
+        tokens_per_minute = number("LLM_TOKENS_PER_MINUTE", None)
+        return cls(
+            max_concurrency=max(1, number("LLM_MAX_CONCURRENCY", 8, int) // processes),
+            requests_per_minute=requests_per_minute and requests_per_minute / processes,
+            tokens_per_minute=tokens_per_minute and tokens_per_minute / processes,
+            max_retries=number("LLM_MAX_RETRIES", 3, int),
+            queue_timeout=number("LLM_QUEUE_TIMEOUT", 30.0)
+        )
+
+    # Admission: rate limits, then a concurrency slot
+
+    def _reserve(self, tokens):
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def _refund(self, tokens):
+        if self.requests:
+            self.requests.adjust(1)
+        if self.tokens and tokens:
+            self.tokens.adjust(tokens)
+
+    def _queue_full(self, tokens):
+        self._refund(tokens)
+        return LLMUnavailable(f"More than {self.max_concurrency} LLM calls busy for {self.queue_timeout:.0f}s",
+                              retry_after=self.queue_timeout / 2)
+
+    @contextmanager
+    def _slot(self, operation, tokens):
+        start = time.perf_counter()
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            raise self._queue_full(tokens)
+        LLM_QUEUE_WAIT.labels(operation).observe(time.perf_counter() - start)
+        LLM_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            LLM_IN_FLIGHT.dec()
+            self.slots.release()
+
+    # Retries
+
+    def _backoff(self, operation, attempt, error):
+        """Delay before the next attempt, or raise when error is final"""
+        if not is_retryable(error):
+            raise error
+        if attempt >= self.max_retries:
+            raise LLMUnavailable(f"LLM unavailable after {attempt + 1} attempts: {error}",
+                                 retry_after=self.max_delay) from error
+        LLM_RETRIES.labels(operation, type(error).__name__).inc()
+        return self.random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _settle(self, response, estimated):
+        """Correct the token bucket with the real usage, when the response reports it"""
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "total_token_count", None)
+        if self.tokens and isinstance(actual, int):
+            self.tokens.adjust(estimated - actual)
+
+    # Calls
+
+    def generate(self, model, contents, operation, generation_config=None):
+        """model.generate_content(contents) through the limits, with retries"""
+        options = {"generation_config": generation_config} if generation_config else {}
+        tokens = estimate_tokens(contents)
+        LLM_PROMPT_TOKENS.labels(operation).observe(tokens)
+        attempt = 0
+        while True:
+            try:
+                with self._slot(operation, tokens), gemini_call(operation, contents) as call:
+                    response = model.generate_content(contents, **options)
+                    call.response(response.text)
+                self._settle(response, tokens)
+                return response
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                time.sleep(self._backoff(operation, attempt, e))
+                attempt += 1
+
+    def generate_stream(self, model, contents, operation, generation_config=None):
+        """
+        Yield text chunks of a streamed reply.
+
+        The slot is held until the stream ends; a failure is only retried
+        if nothing has been yielded yet.
+        """
+        options = {"generation_config": generation_config} if generation_config else {}
+        tokens = estimate_tokens(contents)
+        LLM_PROMPT_TOKENS.labels(operation).observe(tokens)
+        attempt = 0
+        while True:
+            started = False
+            try:
+                with self._slot(operation, tokens), gemini_call(operation, contents) as call:
+                    chunks = []
+                    for chunk in model.generate_content(contents, stream=True, **options):
+                        started = True
+                        chunks.append(chunk.text)
+                        yield chunk.text
+                    call.response("".join(chunks))
+                return
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                if started:
+                    raise
+                time.sleep(self._backoff(operation, attempt, e))
+                attempt += 1
+
+    def _file_call(self, operation, fn, contents=None):
+        """File API calls: concurrency slot and retries, but no token budget"""
+        attempt = 0
+        while True:
+            try:
+                with self._slot(operation, 0), gemini_call(operation, contents):
+                    return fn()
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                time.sleep(self._backoff(operation, attempt, e))
+                attempt += 1
+
+    def upload_file(self, path, operation="upload_file"):
+        return self._file_call(operation, lambda: genai().upload_file(path), os.path.getsize(path))
+
+    def get_file(self, name, operation="get_file"):
+        return self._file_call(operation, lambda: genai().get_file(name))
+
+    def delete_file(self, name, operation="delete_file"):
+        return self._file_call(operation, lambda: genai().delete_file(name))
+
+
+def get_client():
+    """The process-wide LLMClient, configured from the LLM_* environment variables"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = LLMClient.from_env()
+    return _client
+
+
+def set_client(client):
+    """Replace the process-wide client (tests, benchmarks)"""
+    global _client
+    _client = client
@@ -0,0 +1,191 @@
+"""
+Local stand-in for google.generativeai, for offline runs and benchmarks.
+
+Replies are canned and picked from the prompt (menu scan, recommendation
+explanations, guidance, motivation); every call sleeps for a configurable
+latency plus uniform jitter. Streaming calls spread the same latency over
+their chunks, with the first chunk after a fraction of it. With
+input_token_latency / output_token_latency set, every estimated prompt
+or reply token adds to the delay, the way prefill and decode time grow
+on the real API.
+
+Selected with LLM_BACKEND=local (LOCAL_LLM_LATENCY / LOCAL_LLM_JITTER set
+the delay), or installed explicitly:
+
+    local = LocalGemini(latency=0.3, jitter=0.1)
+    install(local)         # before the app makes its first Gemini call
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from core import llm
+
+MENU_ITEMS = {
+    "Breakfast": ["Poha", "Boiled Egg", "Tea", "Banana"],
+    "Lunch": ["Rajma Rice", "Roti", "Curd", "Salad"],
+    "Snacks": ["Samosa", "Tea"],
+    "Dinner": ["Paneer Curry", "Jeera Rice", "Roti", "Dal Tadka", "Kheer"]
+}
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+MENU_REPLY = json.dumps({"menus": [
+    {"date": f"2025-11-{day + 3:02d}", "day": DAYS[day], "meals": MENU_ITEMS}
+    for day in range(7)
+]})
+RECOMMENDATION_REPLY = json.dumps({
+    "recommendations": [
+        {"description": "High-protein plate built around the best protein source on the menu.",
+         "reasoning": "Covers most of the remaining protein while staying inside the calorie budget."}
+        for _ in range(3)
+    ],
+    "alternatives": ["Swap rice for an extra roti to cut carbs", "Add curd for more protein"],
+    "motivation": "Consistency beats perfection. Hit your protein and the rest follows!"
+})
+GUIDANCE_REPLY = (
+    "Great progress so far! For your next meal, prioritise a protein-rich dish such as paneer "
+    "or dal with a moderate portion of rice. Add curd if protein is still short, and keep fried "
+    "snacks for another day. You're on track to hit today's targets."
+)
+MOTIVATION_REPLY = "Every rep counts. Show up, lift with intent and fuel the work - today is a build day!"
+WEEK_SLOT = re.compile(r"^\[(.+?)\]", re.MULTILINE)
+STREAM_CHUNK_CHARS = 48
+FIRST_CHUNK_SHARE = 0.4
+
+
+def prompt_text(contents):
+    """The text parts of a generate_content payload"""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return " ".join(part for part in contents if isinstance(part, str))
+    return ""
+
+
+def week_plan_reply(text):
+    """One slots entry per "[date meal]" label in the prompt, two texts each"""
+    return json.dumps({
+        "slots": [
+            {"key": key, "recommendations": [
+                {"description": f"Balanced {key.split()[-1].lower()} plate.",
+                 "reasoning": "Fits this meal's share of the daily target with a solid protein source."}
+                for _ in range(2)
+            ]}
+            for key in WEEK_SLOT.findall(text)
+        ],
+        "motivation": "Plan the week, then win it one meal at a time!"
+    })
+
+
+def canned_reply(contents):
+    text = prompt_text(contents)
+    if "menu parser" in text:
+        return MENU_REPLY
+    if "weekly meal plan" in text:
+        return week_plan_reply(text)
+    if "already calculated" in text:
+        return RECOMMENDATION_REPLY
+    if "nutrition guidance" in text:
+        return GUIDANCE_REPLY
+    return MOTIVATION_REPLY
+
+
+class LocalModel:
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.model_name = name
+
+    def generate_content(self, contents, stream=False, generation_config=None):
+        reply = canned_reply(contents)
+        if stream:
+            return self._stream(reply, contents)
+        time.sleep(self.backend.delay(contents, reply))
+        return SimpleNamespace(text=reply)
+
+    def _stream(self, reply, contents):
+        delay = self.backend.delay(contents, reply)
+        chunks = [reply[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(reply), STREAM_CHUNK_CHARS)]
+        time.sleep(delay * FIRST_CHUNK_SHARE)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(delay * (1 - FIRST_CHUNK_SHARE) / max(1, len(chunks) - 1))
+            yield SimpleNamespace(text=chunk)
+
+
+class LocalGemini:
+    """Implements the parts of the google.generativeai module the app uses"""
+
+    def __init__(self, latency=0.3, jitter=0.1, upload_latency=0.1, processing_polls=1, seed=0,
+                 input_token_latency=0.0, output_token_latency=0.0):
+        self.latency = latency
+        self.input_token_latency = input_token_latency
+        self.output_token_latency = output_token_latency
+        self.jitter = jitter
+        self.upload_latency = upload_latency
+        self.processing_polls = processing_polls
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.files = {}
+        self.uploads = 0
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(latency=float(os.getenv("LOCAL_LLM_LATENCY", "0.3")),
+                   jitter=float(os.getenv("LOCAL_LLM_JITTER", "0.1")))
+
+    def delay(self, contents=None, reply=None):
+        """Latency of one generate call; also counts the call and its (estimated) tokens"""
+        input_tokens = llm.estimate_tokens(contents) if contents is not None else 0
+        output_tokens = llm.estimate_tokens(reply) if reply is not None else 0
+        with self.lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        return delay + input_tokens * self.input_token_latency + output_tokens * self.output_token_latency
+
+    def configure(self, api_key=None):
+        pass
+
+    def GenerativeModel(self, name):
+        return LocalModel(self, name)
+
+    def upload_file(self, path):
+        time.sleep(self.upload_latency)
+        with self.lock:
+            # Numbered by upload, not len(files): deleted files would otherwise hand out live names again
+            self.uploads += 1
+            uploaded = SimpleNamespace(name=f"files/{self.uploads}", polls=0, state=SimpleNamespace(name="PROCESSING"))
+            self.files[uploaded.name] = uploaded
+        return uploaded
+
+    def get_file(self, name):
+        with self.lock:
+            uploaded = self.files[name]
+        uploaded.polls += 1
+        if uploaded.polls >= self.processing_polls:
+            uploaded.state = SimpleNamespace(name="ACTIVE")
+        return uploaded
+
+    def delete_file(self, name):
+        with self.lock:
+            self.files.pop(name, None)
+
+
+def install(local, *components):
+    """
+    Route every Gemini call to local.
+
+    Components (MenuScanner, MealPlanningAgent) that already created
+    their model get a fresh one from local.
+    """
+    llm.set_genai(local)
+    for component in components:
+        component.model = local.GenerativeModel(component.model_name)
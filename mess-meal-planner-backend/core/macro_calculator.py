@@ -1,3 +1,13 @@
+import numpy as np
+
+ACTIVITY_MULTIPLIERS = {
+    "sedentary": 1.2,
+    "light": 1.375,
+    "moderate": 1.55,
+    "active": 1.725,
+    "very_active": 1.9
+}
+
 class MacroCalculator:
     def calculate_tdee(self, age, height, weight, gender="male", activity_level="moderate"):
         """
@@ -8,15 +18,7 @@ class MacroCalculator:
         else:
             bmr = 10 * weight + 6.25 * height - 5 * age - 161
         
-        activity_multipliers = {
-            "sedentary": 1.2,
-            "light": 1.375,
-            "moderate": 1.55,
-            "active": 1.725,
-            "very_active": 1.9
-        }
-        
-        tdee = bmr * activity_multipliers.get(activity_level, 1.55)
+        tdee = bmr * ACTIVITY_MULTIPLIERS.get(activity_level, 1.55)
         return round(tdee)
     
     def calculate_macros(self, tdee, goal, weight):
@@ -42,3 +44,44 @@ class MacroCalculator:
             "carbs": round(carbs),
             "fats": round(fats)
         }
+    
+    def calculate_batch(self, ages, heights, weights, goals, activity_levels=None, genders=None):
+        """
+        Vectorized calculate_tdee + calculate_macros for many profiles at once.
+        
+        Takes equal-length sequences and returns a dict of NumPy arrays
+        (tdee, calories, protein, carbs, fats) matching the scalar methods,
+        rounding included.
+        """
+        ages = np.asarray(ages, dtype=np.float64)
+        heights = np.asarray(heights, dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        goals = np.asarray(goals, dtype=object)
+        count = len(ages)
+        
+        if activity_levels is None:
+            activity_levels = np.full(count, "moderate", dtype=object)
+        if genders is None:
+            genders = np.full(count, "male", dtype=object)
+        activity_levels = np.asarray(activity_levels, dtype=object)
+        genders = np.asarray(genders, dtype=object)
+        
+        bmr = 10 * weights + 6.25 * heights - 5 * ages + np.where(genders == "male", 5, -161)
+        multipliers = np.array([ACTIVITY_MULTIPLIERS.get(level, 1.55) for level in activity_levels], dtype=np.float64)
+        # np.rint rounds half to even, like the built-in round() used above
+        tdee = np.rint(bmr * multipliers)
+        
+        is_bulk = goals == "bulk"
+        is_cut = goals == "cut"
+        calories = tdee + np.where(is_bulk, 300, np.where(is_cut, -500, 0))
+        protein = weights * np.where(is_bulk, 2, np.where(is_cut, 2.2, 1.8))
+        fats = (calories * 0.25) / 9
+        carbs = (calories - (protein * 4) - (fats * 9)) / 4
+        
+        return {
+            "tdee": tdee.astype(np.int64),
+            "calories": np.rint(calories).astype(np.int64),
+            "protein": np.rint(protein).astype(np.int64),
+            "carbs": np.rint(carbs).astype(np.int64),
+            "fats": np.rint(fats).astype(np.int64)
+        }
@@ -0,0 +1,166 @@
+import functools
+import itertools
+import numpy as np
+from core.nutrition_rag import MACRO_FIELDS
+
+# Relative weight of each macro's miss (calories, protein, carbs, fats)
+GOAL_WEIGHTS = {
+    "bulk": (1.0, 1.5, 0.5, 0.5),
+    "cut": (1.0, 2.0, 0.75, 0.5),
+    "maintain": (1.0, 1.0, 1.0, 1.0),
+}
+
+# How much worse overshooting a macro is than falling short of it
+GOAL_OVERSHOOT_PENALTY = {
+    "bulk": 1.5,
+    "cut": 3.0,
+    "maintain": 2.0,
+}
+
+
+class MealOptimizer:
+    def __init__(self, max_items=4, max_portions=2, candidate_pool=12, calorie_tolerance=0.1):
+        """
+        Local meal-combination search.
+
+        Picks integer portions (0..max_portions) of up to max_items distinct
+        menu items so the combination's macros land as close as possible to
+        the remaining daily budget, weighted by goal. The menu is first cut
+        down to candidate_pool items, then every portion assignment over
+        that pool is scored with one matrix product and anything over the
+        calorie budget is pruned.
+        """
+        self.max_items = max_items
+        self.max_portions = max_portions
+        self.candidate_pool = candidate_pool
+        self.calorie_tolerance = calorie_tolerance
+
+    def remaining_budget(self, daily_target, current_intake):
+        """Daily target minus what has already been eaten, floored at zero"""
+        return {
+            field: max(0, daily_target.get(field, 0) - current_intake.get(field, 0))
+            for field in MACRO_FIELDS
+        }
+
+    def menu_vectors(self, menu_items):
+        """Split a {name: nutrition} menu into names and a (n, 4) macro array"""
+        names = []
+        rows = []
+        for name, nutrition in menu_items.items():
+            if not name or not isinstance(nutrition, dict):
+                continue
+            # Placeholder macros for unrecognised items; don't build meals on them
+            if nutrition.get("unresolved"):
+                continue
+            names.append(name)
+            rows.append([float(nutrition.get(field) or 0) for field in MACRO_FIELDS])
+        macros = np.array(rows, dtype=np.float64).reshape(len(names), len(MACRO_FIELDS))
+        return names, macros
+
+    def _candidates(self, macros, goal, target):
+        """
+        Keep the most promising items for the goal so the search stays small.
+
+        Half the pool goes to items whose macro mix best matches the
+        remaining budget, the rest to the best protein sources. Both are
+        discounted for items far from a sensible per-item calorie share.
+        """
+        usable = np.flatnonzero(macros[:, 0] <= target[0] * (1 + self.calorie_tolerance))
+        if len(usable) <= self.candidate_pool:
+            return usable
+
+        weights = np.array(GOAL_WEIGHTS[goal])
+        scaled = macros[usable] / np.maximum(target, 1.0) * weights
+        norms = np.maximum(np.linalg.norm(scaled, axis=1), 1e-9)
+        fit = scaled @ (weights / np.linalg.norm(weights)) / norms
+
+        calories = np.maximum(macros[usable, 0], 1.0)
+        share = max(target[0], 1.0) / self.max_items
+        size_factor = np.sqrt(np.minimum(calories / share, share / calories))
+
+        protein_value = macros[usable, 1] / calories
+        if goal == "cut":
+            protein_value = protein_value - 0.25 * macros[usable, 2] / calories
+
+        picked = []
+        for value, quota in ((fit * size_factor, self.candidate_pool // 2),
+                             (protein_value * size_factor, self.candidate_pool)):
+            for i in np.lexsort((usable, -value)):
+                if len(picked) >= quota:
+                    break
+                if usable[i] not in picked:
+                    picked.append(usable[i])
+        return np.array(picked)
+
+    def optimize(self, menu_items, remaining, goal, top_k=3):
+        """
+        Return up to top_k distinct item combinations, best first.
+
+        Each result has "items" as (name, portions) pairs, "total_macros"
+        and "score" (lower is better). Combinations with the same item set
+        only appear once, with their best portions.
+        """
+        names, macros = self.menu_vectors(menu_items)
+        target = np.array([float(remaining.get(field, 0)) for field in MACRO_FIELDS])
+        if not names or target[0] <= 0:
+            return []
+
+        goal = goal if goal in GOAL_WEIGHTS else "maintain"
+        candidates = self._candidates(macros, goal, target)
+        if len(candidates) == 0:
+            return []
+
+        # Every portion assignment over the candidate pool, scored at once
+        portions, supports = portion_matrix(len(candidates), self.max_items, self.max_portions)
+        totals = portions @ macros[candidates]
+
+        # Prune combinations that blow the calorie budget
+        feasible = np.flatnonzero(totals[:, 0] <= target[0] * (1 + self.calorie_tolerance))
+        totals = totals[feasible]
+
+        diff = (totals - target) / np.maximum(target, 1.0)
+        diff = np.where(diff > 0, diff * GOAL_OVERSHOOT_PENALTY[goal], -diff)
+        scores = diff @ np.array(GOAL_WEIGHTS[goal])
+
+        # Best first (ties: fewer servings, then enumeration order), one row per item set
+        order = np.lexsort((feasible, portions[feasible].sum(axis=1), scores))
+        _, first = np.unique(supports[feasible][order], return_index=True)
+        best_rows = order[np.sort(first)[:top_k]]
+
+        results = []
+        for row in best_rows:
+            combo = portions[feasible[row]]
+            results.append({
+                "items": [(names[candidates[i]], int(combo[i])) for i in np.flatnonzero(combo)],
+                "total_macros": {field: round(float(value), 1) for field, value in zip(MACRO_FIELDS, totals[row])},
+                "score": round(float(scores[row]), 4)
+            })
+        return results
+
+
+@functools.lru_cache(maxsize=32)
+def portion_matrix(pool_size, max_items, max_portions):
+    """
+    Enumerate every non-empty way to take 1..max_portions of up to
+    max_items distinct items out of pool_size.
+
+    Returns (portions, supports): a (combinations, pool_size) matrix of
+    portion counts and, per row, an integer id of the chosen item set.
+    Cached because it only depends on the search shape.
+    """
+    rows = []
+    supports = []
+    for count in range(1, min(max_items, pool_size) + 1):
+        for items in itertools.combinations(range(pool_size), count):
+            support = sum(1 << i for i in items)
+            for amounts in itertools.product(range(1, max_portions + 1), repeat=count):
+                row = [0] * pool_size
+                for item, amount in zip(items, amounts):
+                    row[item] = amount
+                rows.append(row)
+                supports.append(support)
+    portions = np.array(rows, dtype=np.float64).reshape(len(rows), pool_size)
+    supports = np.array(supports, dtype=np.int64)
+    portions.setflags(write=False)
+    supports.setflags(write=False)
+    return portions, supports
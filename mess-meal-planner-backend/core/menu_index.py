@@ -0,0 +1,108 @@
+import numpy as np
+
+from core.nutrition_rag import MACRO_FIELDS
+
+SUBSET_SIZE = 3
+RANKINGS = {"protein_density": "by_protein_density", "calories": "by_calories"}
+
+
+def protein_density(macros):
+    """Protein grams per 100 kcal (0 when unknown)"""
+    if not isinstance(macros, dict):
+        return 0.0
+    calories = macros.get('calories') or 0
+    protein = macros.get('protein') or 0
+    if not isinstance(calories, (int, float)) or not isinstance(protein, (int, float)) or calories <= 0:
+        return 0.0
+    return protein * 100 / calories
+
+
+def _subset(names, macros, rows):
+    return {
+        "items": [names[i] for i in rows],
+        "total_macros": {field: round(float(value), 1) for field, value in zip(MACRO_FIELDS, macros[rows].sum(axis=0))}
+    }
+
+
+def meal_index(items, subset_size=SUBSET_SIZE):
+    """
+    Rankings for one meal's {name: nutrition} items.
+
+    by_protein_density (g protein per 100 kcal, highest first) and
+    by_calories (lowest first) list item names, ties in menu order;
+    best_protein and lowest_calorie are the first subset_size of each
+    with their combined macros. Unresolved items (placeholder macros)
+    are left out, as the optimizer leaves them out.
+    """
+    names = [name for name, nutrition in items.items()
+             if name and isinstance(nutrition, dict) and not nutrition.get('unresolved')]
+    macros = np.array(
+        [[float(items[name].get(field) or 0) for field in MACRO_FIELDS] for name in names], dtype=np.float64
+    ).reshape(len(names), len(MACRO_FIELDS))
+    calories, protein = macros[:, 0], macros[:, 1]
+    density = np.divide(protein * 100, calories, out=np.zeros(len(names)), where=calories > 0)
+
+    position = np.arange(len(names))
+    by_density = np.lexsort((position, -density))
+    by_calories = np.lexsort((position, calories))
+    return {
+        "protein_density": {name: round(float(value), 2) for name, value in zip(names, density)},
+        "by_protein_density": [names[i] for i in by_density],
+        "by_calories": [names[i] for i in by_calories],
+        "best_protein": _subset(names, macros, by_density[:subset_size]),
+        "lowest_calorie": _subset(names, macros, by_calories[:subset_size])
+    }
+
+
+def menu_entry_index(entry, subset_size=SUBSET_SIZE):
+    """{"meals": {meal: meal_index}, "day": meal_index over every item of the day} for a processed entry"""
+    meals = {meal: items for meal, items in (entry.get('meals') or {}).items() if isinstance(items, dict)}
+    day_items = {}
+    for items in meals.values():
+        day_items.update(items)
+    return {
+        "meals": {meal: meal_index(items, subset_size) for meal, items in meals.items()},
+        "day": meal_index(day_items, subset_size)
+    }
+
+
+def index_menus(menus, subset_size=SUBSET_SIZE):
+    """
+    Add an "index" to every processed menu entry (in place; returns menus).
+
+    Per-meal and per-day totals are already on the entry (meal_totals,
+    day_totals); the index adds the rankings and picks, so later
+    recommendation and "highest protein option" queries read them instead
+    of re-sorting the menu.
+    """
+    for entry in menus:
+        entry["index"] = menu_entry_index(entry, subset_size)
+    return menus
+
+
+def entry_index(entry):
+    """The entry's stored index, built on the fly for entries saved without one"""
+    return entry.get("index") or menu_entry_index(entry)
+
+
+def ranked_items(entry, by, meal=None, limit=SUBSET_SIZE):
+    """
+    The top `limit` items of a meal (or the whole day) by a ranking, with their nutrition.
+
+    by is "protein_density" or "calories"; returns None when the meal
+    isn't on the menu.
+    """
+    index = entry_index(entry)
+    if meal is None:
+        index, items = index["day"], {}
+        for meal_items in (entry.get('meals') or {}).values():
+            items.update(meal_items if isinstance(meal_items, dict) else {})
+    else:
+        index = index["meals"].get(meal)
+        items = (entry.get('meals') or {}).get(meal)
+        if index is None or not isinstance(items, dict):
+            return None
+    return [
+        {"name": name, **items[name], "protein_density": index["protein_density"][name]}
+        for name in index[RANKINGS[by]][:limit]
+    ]
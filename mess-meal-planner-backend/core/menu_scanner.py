@@ -1,58 +1,21 @@
-import google.generativeai as genai
 import os
-from PIL import Image
-import json
-import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core import llm
+from core.scan_cache import ScanCache
+from core.structured_output import MENU_SCHEMA, MenuScan, json_output, parse_reply
 
-class MenuScanner:
-    def __init__(self, api_key):
-        """Initialize Gemini Vision for text extraction"""
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-    
-    def clean_json_response(self, text):
-        """
-        Clean JSON response from Gemini by removing markdown code blocks
-        """
-        text = text.strip()
-        
-        # Remove ```
-        if text.startswith('```json'):
-            text = text[7:]  # Remove first 7 characters
-        elif text.startswith('```'):
-            text = text[3:]  # Remove first 3 characters
-        
-        # Remove ``` at the end
-        if text.endswith('```'):
-            text = text[:-3]  # Remove last 3 characters
-        
-        # Strip whitespace again
-        text = text.strip()
-        
-        print(f"✓ Cleaned JSON (first 100 chars): {text[:100]}")
-        
-        return text
-    
-    def scan_menu(self, file_path):
-        """
-        Extract menu items from image or PDF using Gemini Vision
-        """
-        # Get extension correctly (fixed the tuple error)
-        file_extension = os.path.splitext(file_path)[1].lower()
-        
-        if file_extension == '.pdf':
-            return self.scan_pdf(file_path)
-        else:
-            return self.scan_image(file_path)
-    
-    def scan_image(self, image_path):
-        """
-        Extract structured menu from image using Gemini Vision
-        """
-        try:
-            image = Image.open(image_path)
-            
-            prompt = """
+# Bump whenever the scan prompts change so cached results are not reused
+PROMPT_VERSION = "2"
+MENU_OUTPUT = json_output(MENU_SCHEMA)
+
+# Gemini file processing poll: first delay, growth factor, cap and overall limit (seconds)
+POLL_INITIAL_DELAY = 0.5
+POLL_BACKOFF = 1.5
+POLL_MAX_DELAY = 4.0
+POLL_TIMEOUT = 120.0
+
+IMAGE_PROMPT = """
             You are a menu parser. Extract the complete menu structure from this image.
             
             IMPORTANT: Extract dates, meal types (Breakfast/Lunch/Dinner/Snacks), and food items.
@@ -82,48 +45,8 @@ class MenuScanner:
             
             Extract from this image:
             """
-            
-            response = self.model.generate_content([prompt, image])
-            text = response.text.strip()
-            
-            print(f"Raw response (first 200 chars): {text[:200]}")
-            
-            cleaned_text = self.clean_json_response(text)
-            menu_structure = json.loads(cleaned_text)
-            
-            print(f"✓ Gemini Vision extracted {len(menu_structure.get('menus', []))} menu entries from image")
-            return menu_structure
-        
-        except json.JSONDecodeError as e:
-            print(f"❌ Error parsing JSON: {e}")
-            print(f"Raw response: {text}")
-            return {"menus": []}
-        except Exception as e:
-            print(f"❌ Error scanning image: {e}")
-            import traceback
-            traceback.print_exc()
-            return {"menus": []}
-    
-    def scan_pdf(self, pdf_path):
-        """
-        Extract structured menu from PDF using Gemini
-        """
-        try:
-            print(f"📄 Uploading PDF to Gemini...")
-            uploaded_file = genai.upload_file(pdf_path)
-            
-            import time
-            while uploaded_file.state.name == "PROCESSING":
-                print("   Waiting for processing...")
-                time.sleep(1)
-                uploaded_file = genai.get_file(uploaded_file.name)
-            
-            if uploaded_file.state.name == "FAILED":
-                raise Exception("PDF processing failed")
-            
-            print(f"✓ PDF uploaded successfully")
-            
-            prompt = """
+
+PDF_PROMPT = """
             You are a menu parser. Extract the complete menu structure from this PDF.
             
             IMPORTANT: Extract dates, meal types (Breakfast/Lunch/Dinner/Snacks), and food items.
@@ -154,25 +77,272 @@ class MenuScanner:
             
             Extract from this PDF:
             """
+
+class MenuScanner:
+    def __init__(self, api_key, cache_dir=None, cache_max_bytes=50 * 1024 * 1024,
+                 page_parallel=True, pages_per_chunk=None, max_page_workers=4, image_preprocessor=None,
+                 llm_client=None, parse_retries=1):
+        """Initialize Gemini Vision for text extraction (the model is created on first use)"""
+        llm.configure(api_key)
+        # Calls go through the shared client (concurrency and rate limits, retries)
+        self.llm = llm_client or llm.get_client()
+        self.model_name = 'gemini-2.0-flash-exp'
+        self._model = None
+        cache_dir = cache_dir or os.getenv("SCAN_CACHE_DIR", ".scan_cache")
+        self.scan_cache = ScanCache(cache_dir, cache_max_bytes)
+        # Multi-page PDFs are split into page groups scanned concurrently;
+        # pages_per_chunk=None spreads the pages evenly over the workers
+        self.page_parallel = page_parallel
+        self.pages_per_chunk = pages_per_chunk
+        self.max_page_workers = max_page_workers
+        # Photos are rotated, downscaled and recompressed before upload;
+        # pass image_preprocessor=False to send them untouched
+        self.image_preprocessor = image_preprocessor
+        # A reply that can't be parsed is requested again, for that image,
+        # page group or uploaded document only
+        self.parse_retries = parse_retries
+    
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = llm.get_model(self.model_name)
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    def scan_menu_cached(self, file_path, content_digest=None):
+        """
+        Scan a menu, reusing the stored result for identical uploads.
+        
+        Returns (menu_structure, cache_hit). Pass content_digest (SHA-256
+        hex of the file) when it is already known to skip re-reading.
+        """
+        if content_digest:
+            key = ScanCache.make_key(content_digest, PROMPT_VERSION)
+        else:
+            key = ScanCache.content_key(file_path, PROMPT_VERSION)
+        cached = self.scan_cache.get(key)
+        if cached is not None:
+            print(f"✓ Scan cache hit ({key[:12]})")
+            return cached, True
+        
+        menu_structure = self.scan_menu(file_path)
+        # Failed scans come back empty and partial ones miss pages; don't
+        # pin either in the cache, so a re-upload scans again
+        if menu_structure.get('menus') and not menu_structure.get('partial'):
+            self.scan_cache.put(key, menu_structure)
+        return menu_structure, False
+    
+    def scan_menu(self, file_path):
+        """
+        Extract menu items from image or PDF using Gemini Vision
+        """
+        # Get extension correctly (fixed the tuple error)
+        file_extension = os.path.splitext(file_path)[1].lower()
+        
+        if file_extension == '.pdf':
+            return self.scan_pdf(file_path)
+        else:
+            return self.scan_image(file_path)
+    
+    def parse_menu_response(self, text, source):
+        """
+        Turn Gemini's reply into a menu structure, or None if nothing usable came back
+        """
+        menu, outcome = parse_reply(text, MenuScan, "menu_scan")
+        if menu is None:
+            print(f"❌ Could not parse menu JSON from {source}: {(text or '')[:200]}")
+            return None
+        if outcome != "ok":
+            print(f"⚠️ Menu JSON from {source} was {outcome}")
+        print(f"✓ Gemini extracted {len(menu.menus)} menu entries from {source}")
+        return menu.model_dump(exclude_none=True)
+    
+    def generate_menu(self, contents, operation, source):
+        """
+        Ask Gemini for schema-constrained menu JSON, repeating only this request on a bad reply
+        """
+        for attempt in range(self.parse_retries + 1):
+            text = self.llm.generate(self.model, contents, operation, generation_config=MENU_OUTPUT).text
+            menu = self.parse_menu_response(text, source)
+            if menu is not None:
+                return menu
+            if attempt < self.parse_retries:
+                print(f"🔁 Asking Gemini again for {source}")
+        return {"menus": [], "failed": True}
+    
+    def prepare_image(self, image_path):
+        """
+        Image content part for Gemini: preprocessed JPEG bytes, or the raw image
+        """
+        if self.image_preprocessor is False:
+            from PIL import Image
+            return Image.open(image_path)
+        if self.image_preprocessor is None:
+            from core.image_preprocess import ImagePreprocessor
+            self.image_preprocessor = ImagePreprocessor()
+        data, _ = self.image_preprocessor.process(image_path)
+        return {"mime_type": "image/jpeg", "data": data}
+    
+    def scan_image(self, image_path):
+        """
+        Extract structured menu from image using Gemini Vision
+        """
+        try:
+            image = self.prepare_image(image_path)
+            contents = [IMAGE_PROMPT, image]
+            return self.generate_menu(contents, "scan_image.generate", "image")
+        
+        except llm.LLMUnavailable:
+            raise
+        except Exception as e:
+            print(f"❌ Error scanning image: {e}")
+            import traceback
+            traceback.print_exc()
+            return {"menus": []}
+    
+    def wait_for_file(self, uploaded_file):
+        """
+        Poll an uploaded file until Gemini finishes processing it, with backoff and a timeout
+        """
+        delay = POLL_INITIAL_DELAY
+        deadline = time.monotonic() + POLL_TIMEOUT
+        while uploaded_file.state.name == "PROCESSING":
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"PDF processing took longer than {POLL_TIMEOUT}s")
+            print("   Waiting for processing...")
+            time.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+            uploaded_file = self.llm.get_file(uploaded_file.name, "scan_pdf.poll")
+        
+        if uploaded_file.state.name == "FAILED":
+            raise Exception("PDF processing failed")
+        return uploaded_file
+    
+    def split_pdf(self, pdf_path):
+        """
+        Split a PDF into standalone PDFs of pages_per_chunk pages each.
+        
+        Returns a list of PDF bytes, or None when the document is small
+        enough to scan in one go.
+        """
+        import pymupdf
+        
+        with pymupdf.open(pdf_path) as doc:
+            page_count = doc.page_count
+            pages_per_chunk = self.pages_per_chunk or -(-page_count // self.max_page_workers)
+            if page_count <= pages_per_chunk:
+                return None
             
-            print(f"🤖 Asking Gemini to extract menu...")
-            response = self.model.generate_content([uploaded_file, prompt])
-            
-            text = response.text.strip()
-            print(f"Raw response (first 200 chars): {text[:200]}")
-            
-            cleaned_text = self.clean_json_response(text)
-            menu_structure = json.loads(cleaned_text)
-            
-            genai.delete_file(uploaded_file.name)
+            chunks = []
+            for start in range(0, page_count, pages_per_chunk):
+                with pymupdf.open() as chunk:
+                    chunk.insert_pdf(doc, from_page=start, to_page=min(start + pages_per_chunk, page_count) - 1)
+                    chunks.append(chunk.tobytes())
+        
+        print(f"📄 Split {page_count}-page PDF into {len(chunks)} chunks")
+        return chunks
+    
+    def merge_menus(self, results):
+        """
+        Merge per-chunk scan results, combining entries that share a date.
+        
+        Meal item lists for the same date and meal are unioned in order;
+        entries without a usable date are kept as they are. If any chunk
+        failed the result is marked "partial" (its pages are missing).
+        """
+        merged = []
+        by_date = {}
+        for result in results:
+            for entry in result.get('menus', []):
+                if not isinstance(entry, dict):
+                    continue
+                date = entry.get('date') or 'unknown'
+                meals = {
+                    meal_type: list(items)
+                    for meal_type, items in (entry.get('meals') or {}).items()
+                    if isinstance(items, list)
+                }
+                
+                existing = by_date.get(date)
+                if existing is None:
+                    entry = {**entry, "meals": meals}
+                    merged.append(entry)
+                    if date != 'unknown':
+                        by_date[date] = entry
+                    continue
+                
+                if not existing.get('day') and entry.get('day'):
+                    existing['day'] = entry['day']
+                for meal_type, items in meals.items():
+                    current = existing['meals'].setdefault(meal_type, [])
+                    current.extend(item for item in items if item not in current)
+        failed = sum(1 for result in results if result.get('failed'))
+        if failed:
+            print(f"⚠️ {failed} of {len(results)} PDF chunks failed; the scan is partial")
+            return {"menus": merged, "partial": True}
+        return {"menus": merged}
+    
+    def scan_pdf_chunk(self, chunk_bytes, index):
+        """
+        Scan one page group, sent inline (no upload/processing round trip)
+        """
+        try:
+            contents = [{"mime_type": "application/pdf", "data": chunk_bytes}, PDF_PROMPT]
+            return self.generate_menu(contents, "scan_pdf_chunk.generate", f"PDF chunk {index + 1}")
+        except llm.LLMUnavailable:
+            raise
+        except Exception as e:
+            # A failed chunk only loses its own pages (merge_menus flags the result)
+            print(f"❌ Error scanning PDF chunk {index + 1}: {e}")
+            return {"menus": [], "failed": True}
+    
+    def scan_pdf(self, pdf_path):
+        """
+        Extract structured menu from PDF, page groups in parallel when enabled
+        """
+        chunks = self.split_pdf_safely(pdf_path)
+        if not chunks:
+            return self.scan_pdf_document(pdf_path)
+        
+        with ThreadPoolExecutor(max_workers=self.max_page_workers) as pool:
+            results = list(pool.map(self.scan_pdf_chunk, chunks, range(len(chunks))))
+        return self.merge_menus(results)
+    
+    def split_pdf_safely(self, pdf_path):
+        """
+        split_pdf, or None if page-parallel mode is off or PyMuPDF can't read the file
+        """
+        if not self.page_parallel:
+            return None
+        try:
+            return self.split_pdf(pdf_path)
+        except Exception as e:
+            print(f"⚠️ Could not split PDF, scanning it whole: {e}")
+            return None
+    
+    def scan_pdf_document(self, pdf_path):
+        """
+        Extract structured menu from a whole PDF using Gemini
+        """
+        try:
+            print(f"📄 Uploading PDF to Gemini...")
+            uploaded_file = self.llm.upload_file(pdf_path, "scan_pdf.upload")
             
-            print(f"✓ Gemini extracted {len(menu_structure.get('menus', []))} menu entries from PDF")
-            return menu_structure
+            try:
+                uploaded_file = self.wait_for_file(uploaded_file)
+                print(f"✓ PDF uploaded successfully")
+                
+                print(f"🤖 Asking Gemini to extract menu...")
+                # A retry reuses the uploaded file
+                return self.generate_menu([uploaded_file, PDF_PROMPT], "scan_pdf.generate", "PDF")
+            finally:
+                self.llm.delete_file(uploaded_file.name, "scan_pdf.delete")
         
-        except json.JSONDecodeError as e:
-            print(f"❌ Error parsing JSON: {e}")
-            print(f"Raw response: {text}")
-            return {"menus": []}
+        except llm.LLMUnavailable:
+            raise
         except Exception as e:
             print(f"❌ Error scanning PDF: {e}")
             import traceback
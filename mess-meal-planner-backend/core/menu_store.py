@@ -0,0 +1,122 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+import orjson
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS menus (
+    mess_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    day TEXT,
+    menu BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (mess_id, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS menus_date ON menus (date);
+"""
+BUSY_TIMEOUT_MS = 5000
+
+
+def iso_date(value):
+    """"2025-11-03" (or a date) -> "2025-11-03"; anything else -> None"""
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    try:
+        return datetime.date.fromisoformat(str(value).strip()).isoformat()
+    except ValueError:
+        return None
+
+
+class MenuStore:
+    """
+    Processed menus (the /scan-menu "menus" entries) kept per mess and date.
+
+    Rows are keyed by (mess_id, date), so one mess's date range is a
+    primary-key range scan; the date index serves pruning across messes.
+    Entries are stored as orjson blobs and returned exactly as they were
+    saved. The database runs in WAL mode with a connection per thread, so
+    reads don't wait for a scan being saved, and every worker process
+    sees the same menus.
+    """
+
+    def __init__(self, path=None):
+        self.path = os.path.abspath(path or os.getenv("MENU_STORE_PATH", "menus.db"))
+        self.local = threading.local()
+
+    def _conn(self):
+        # Per thread, and never carried across a fork (serve.py's workers open their own).
+        # The file is created on first use, not when the store is constructed.
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def save(self, mess_id, menus):
+        """
+        Upsert menu entries for mess_id; a re-scan replaces the same dates.
+
+        Returns (saved_dates, skipped) where skipped counts entries without
+        a usable YYYY-MM-DD date ("unknown" from a menu that shows none).
+        """
+        rows = []
+        skipped = 0
+        now = time.time()
+        for entry in menus:
+            date = iso_date(entry.get("date"))
+            if date is None:
+                skipped += 1
+                continue
+            rows.append((mess_id, date, entry.get("day"), orjson.dumps({**entry, "date": date}), now))
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT INTO menus VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (mess_id, date) DO UPDATE SET day = excluded.day, menu = excluded.menu, "
+                "updated_at = excluded.updated_at",
+                rows
+            )
+        return [row[1] for row in rows], skipped
+
+    def get(self, mess_id, date):
+        """The entry for one date, or None"""
+        date = iso_date(date)
+        if date is None:
+            return None
+        row = self._conn().execute(
+            "SELECT menu FROM menus WHERE mess_id = ? AND date = ?", (mess_id, date)
+        ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def range(self, mess_id, start=None, end=None):
+        """Entries from start to end inclusive (either may be None for open-ended), by date"""
+        query = "SELECT menu FROM menus WHERE mess_id = ?"
+        params = [mess_id]
+        if start is not None:
+            query += " AND date >= ?"
+            params.append(iso_date(start))
+        if end is not None:
+            query += " AND date <= ?"
+            params.append(iso_date(end))
+        return [orjson.loads(menu) for (menu,) in self._conn().execute(query + " ORDER BY date", params)]
+
+    def prune(self, before):
+        """Delete every mess's entries dated before `before`; returns the count"""
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM menus WHERE date < ?", (iso_date(before),)).rowcount
+
+    def stats(self):
+        messes, entries = self._conn().execute("SELECT COUNT(DISTINCT mess_id), COUNT(*) FROM menus").fetchone()
+        return {"messes": messes, "entries": entries, "path": self.path}
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
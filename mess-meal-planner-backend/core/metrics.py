@@ -0,0 +1,170 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte",
+    ["method", "endpoint", "status"], buckets=LATENCY_BUCKETS
+)
+# Gauges are summed over live worker processes when serving with several (serve.py)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled", ["endpoint"],
+                           multiprocess_mode="livesum")
+
+GEMINI_LATENCY = Histogram(
+    "gemini_call_duration_seconds", "Latency of individual Gemini API calls",
+    ["operation"], buckets=LATENCY_BUCKETS
+)
+GEMINI_CALLS = Counter("gemini_calls_total", "Gemini API calls by outcome", ["operation", "outcome"])
+GEMINI_PROMPT_BYTES = Histogram("gemini_prompt_bytes", "Size of the content sent to Gemini", ["operation"], buckets=SIZE_BUCKETS)
+GEMINI_RESPONSE_BYTES = Histogram("gemini_response_bytes", "Size of the text Gemini returned", ["operation"], buckets=SIZE_BUCKETS)
+
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds", "Time an LLM call waited for rate limits and a concurrency slot",
+    ["operation"], buckets=LATENCY_BUCKETS
+)
+LLM_IN_FLIGHT = Gauge("llm_calls_in_flight", "LLM calls currently holding a concurrency slot", multiprocess_mode="livesum")
+LLM_PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens", "Estimated input tokens per LLM call (text length, flat cost per media part)",
+    ["operation"], buckets=TOKEN_BUCKETS
+)
+LLM_RETRIES = Counter("llm_retries_total", "LLM calls retried after a transient error", ["operation", "error"])
+
+JSON_PARSE_FAILURES = Counter("json_parse_failures_total", "Model responses that were not valid JSON", ["source"])
+JSON_PARSE_RESULTS = Counter(
+    "json_parse_results_total", "Structured model replies by parse outcome (ok, repaired, partial, failed)",
+    ["source", "outcome"]
+)
+JSON_PARSE_DURATION = Histogram(
+    "json_parse_duration_seconds", "Time to parse and validate a structured model reply",
+    ["source"], buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05)
+)
+SCAN_QUEUE_DEPTH = Gauge("scan_jobs_queued", "Menu scan jobs waiting for a worker", multiprocess_mode="livesum")
+SCAN_JOBS_RUNNING = Gauge("scan_jobs_running", "Menu scan jobs being processed", multiprocess_mode="livesum")
+SCAN_JOBS = Counter(
+    "scan_jobs_total", "Menu scan submissions by outcome (queued, deduplicated, rejected, done, failed)", ["outcome"]
+)
+SCAN_JOB_WAIT = Histogram("scan_job_wait_seconds", "Time a scan job waited in the queue", buckets=LATENCY_BUCKETS)
+SCAN_JOB_DURATION = Histogram(
+    "scan_job_duration_seconds", "Time a worker spent on a scan job (scan plus nutrition)", buckets=LATENCY_BUCKETS
+)
+NUTRITION_LOOKUPS = Counter(
+    "nutrition_lookups_total", "NutritionRAG name lookups by how they resolved (exact, fuzzy, partial, unresolved)",
+    ["result"]
+)
+
+
+def payload_size(contents):
+    """Approximate bytes in a generate_content payload (text and inline data, or a byte count)"""
+    if isinstance(contents, int):
+        return contents
+    if isinstance(contents, str):
+        return len(contents.encode())
+    if isinstance(contents, (bytes, bytearray)):
+        return len(contents)
+    if isinstance(contents, dict):
+        return payload_size(contents.get("data", b""))
+    if isinstance(contents, (list, tuple)):
+        return sum(payload_size(part) for part in contents)
+    return 0
+
+
+class GeminiCall:
+    def __init__(self, operation):
+        self.operation = operation
+
+    def response(self, text):
+        """Record the size of the returned text; returns it unchanged"""
+        GEMINI_RESPONSE_BYTES.labels(self.operation).observe(len((text or "").encode()))
+        return text
+
+
+@contextmanager
+def gemini_call(operation, contents=None):
+    """
+    Time one Gemini API call and count its outcome.
+
+    Wraps sync and awaited calls alike. Yields a GeminiCall whose
+    response(text) records the reply size.
+    """
+    if contents is not None:
+        GEMINI_PROMPT_BYTES.labels(operation).observe(payload_size(contents))
+    start = time.perf_counter()
+    try:
+        yield GeminiCall(operation)
+    except GeneratorExit:
+        # A streamed reply abandoned by its consumer (client went away)
+        GEMINI_CALLS.labels(operation, "cancelled").inc()
+        raise
+    except BaseException:
+        GEMINI_CALLS.labels(operation, "error").inc()
+        raise
+    else:
+        GEMINI_CALLS.labels(operation, "ok").inc()
+    finally:
+        GEMINI_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+
+def route_template(scope):
+    """The matched route path (e.g. /search-food/{food_name}), to keep label values bounded"""
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-endpoint latency and in-flight requests.
+
+    Latency runs until the last body chunk is sent, so streamed responses
+    (server-sent events, NDJSON) are measured end to end.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = route_template(scope)
+        status = {"code": 500}
+        start = time.perf_counter()
+        in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+        in_flight.inc()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            REQUEST_LATENCY.labels(scope["method"], endpoint, str(status["code"])).observe(time.perf_counter() - start)
+
+
+def render_metrics():
+    """
+    (body, content_type) for the /metrics endpoint.
+
+    Under serve.py (PROMETHEUS_MULTIPROC_DIR set) every worker writes its
+    samples to that directory and this merges all of them, so any worker
+    can answer a scrape.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
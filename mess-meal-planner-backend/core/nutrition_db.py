@@ -0,0 +1,303 @@
+import csv
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+from core.food_index import best_match
+
+FOOD_FIELDS = ("name", "calories", "protein", "carbs", "fats", "portion")
+DEFAULT_PORTION = "1 serving"
+MMAP_SIZE = 256 * 1024 * 1024
+# SQLite caps host parameters per statement
+MAX_PARAMETERS = 500
+
+# Header spellings seen in IFCT / USDA exports
+COLUMN_ALIASES = {
+    "food": "name", "food_name": "name", "description": "name",
+    "energy": "calories", "energy_kcal": "calories", "kcal": "calories",
+    "carbohydrate": "carbs", "carbohydrates": "carbs", "carbohydrate_g": "carbs",
+    "protein_g": "protein",
+    "fat": "fats", "total_fat": "fats", "fat_g": "fats",
+    "serving": "portion", "serving_size": "portion",
+}
+
+SCHEMA = """
+CREATE TABLE foods (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    calories NUMERIC NOT NULL,
+    protein NUMERIC NOT NULL,
+    carbs NUMERIC NOT NULL,
+    fats NUMERIC NOT NULL,
+    portion TEXT NOT NULL,
+    source TEXT NOT NULL,
+    length INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX foods_length ON foods (length, key);
+CREATE TABLE grams (gram TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (gram, key)) WITHOUT ROWID;
+CREATE TABLE gram_counts (gram TEXT PRIMARY KEY, count INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE fuzzy (name TEXT PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID;
+"""
+# FuzzyMatcher.compiled() arrays, stored as raw bytes of these types
+FUZZY_ARRAYS = {"document_frequency": "float64", "data": "float64", "indices": "int32", "indptr": "int32"}
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _number(value):
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def _normalize_record(record):
+    """Map a raw CSV/JSON row onto FOOD_FIELDS, or raise ValueError"""
+    row = {}
+    for column, value in record.items():
+        column = str(column).strip().lower().replace(" ", "_")
+        row[COLUMN_ALIASES.get(column, column)] = value
+    name = str(row.get("name") or "").strip()
+    if not name:
+        raise ValueError("missing name")
+    try:
+        macros = {field: _number(row[field]) for field in FOOD_FIELDS[1:5]}
+    except KeyError as e:
+        raise ValueError(f"{name}: missing field {e}")
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}: non-numeric macro value")
+    return {"name": name, **macros, "portion": str(row.get("portion") or DEFAULT_PORTION).strip()}
+
+
+def read_food_file(path):
+    """Rows from a CSV (with header) or JSON file (a list, or {"foods": [...]})"""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return list(csv.DictReader(f))
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("foods", []) if isinstance(data, dict) else data
+
+
+def compile_database(output_path, sources=(), include_builtin=True):
+    """
+    Build a nutrition database file from CSV/JSON sources.
+
+    Later sources override earlier ones by (case-insensitive) name, so
+    per-mess custom items can be listed after the reference tables. The
+    built-in table is included first unless include_builtin is False.
+    The file is written next to output_path and moved into place, so
+    workers that already have the old one open are unaffected.
+
+    Returns (row_count, skipped) where skipped lists (source, message).
+    """
+    foods = {}
+    skipped = []
+    inputs = []
+    if include_builtin:
+        from core.nutrition_rag import INDIAN_FOODS
+        inputs.append(("builtin", INDIAN_FOODS))
+    inputs += [(os.path.basename(path), read_food_file(path)) for path in sources]
+
+    for source, records in inputs:
+        for record in records:
+            try:
+                food = _normalize_record(record)
+            except ValueError as e:
+                skipped.append((source, str(e)))
+                continue
+            foods[food["name"].lower()] = (food, source)
+
+    tmp_path = f"{output_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO foods VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (key, food["name"], food["calories"], food["protein"], food["carbs"],
+                 food["fats"], food["portion"], source, len(key))
+                for key, (food, source) in foods.items()
+            )
+        )
+        conn.executemany(
+            "INSERT INTO grams VALUES (?, ?)",
+            ((gram, key) for key in foods for gram in _ngrams(key, 3) | _ngrams(key, 2))
+        )
+        conn.execute("INSERT INTO gram_counts SELECT gram, COUNT(*) FROM grams GROUP BY gram")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("row_count", str(len(foods))),
+            ("key_lengths", json.dumps(sorted({len(key) for key in foods}))),
+        ])
+        _store_fuzzy(conn, list(foods))
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp_path, output_path)
+    return len(foods), skipped
+
+
+def _store_fuzzy(conn, keys):
+    """Precompute the fuzzy matcher's key side so readers only load arrays"""
+    from core.fuzzy_match import FuzzyMatcher
+    compiled = FuzzyMatcher(keys).compiled()
+    key_matrix = compiled["key_matrix"]
+    arrays = {"document_frequency": compiled["document_frequency"], "data": key_matrix.data,
+              "indices": key_matrix.indices, "indptr": key_matrix.indptr}
+    rows = [(name, json.dumps(compiled[name]).encode()) for name in ("ngram_range", "keys", "grams")]
+    rows += [(name, array.astype(FUZZY_ARRAYS[name]).tobytes()) for name, array in arrays.items()]
+    conn.executemany("INSERT INTO fuzzy VALUES (?, ?)", rows)
+
+
+class NutritionDB:
+    """
+    Read-only view of a compiled nutrition database.
+
+    Behaves like the in-memory food dict (`key in db`, `db[key]`, `keys`, `len`)
+    and like FoodIndex (`lookup`), so NutritionRAG can use it for both.
+    The file is opened immutable and memory-mapped: nothing is loaded up
+    front, and worker processes share the OS page cache for it.
+    """
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Nutrition database not found: {path}")
+        self.path = os.path.abspath(path)
+        self.local = threading.local()
+        meta = dict(self._conn().execute("SELECT name, value FROM meta"))
+        self.row_count = int(meta["row_count"])
+        self.key_lengths = json.loads(meta["key_lengths"])
+
+    def _conn(self):
+        # One connection per thread; the file is immutable so they never lock.
+        # A forked worker opens its own instead of reusing the parent's.
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def __len__(self):
+        return self.row_count
+
+    def __contains__(self, key):
+        return self._conn().execute("SELECT 1 FROM foods WHERE key = ?", (key,)).fetchone() is not None
+
+    def __getitem__(self, key):
+        row = self._conn().execute(
+            "SELECT name, calories, protein, carbs, fats, portion FROM foods WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return dict(zip(FOOD_FIELDS, row))
+
+    def keys(self):
+        return [key for (key,) in self._conn().execute("SELECT key FROM foods")]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def _existing(self, candidates):
+        found = set()
+        candidates = list(candidates)
+        for i in range(0, len(candidates), MAX_PARAMETERS):
+            chunk = candidates[i:i + MAX_PARAMETERS]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(key for (key,) in self._conn().execute(
+                f"SELECT key FROM foods WHERE key IN ({placeholders})", chunk))
+        return found
+
+    def contained_keys(self, query):
+        """Keys that appear as a substring of the query"""
+        substrings = {
+            query[start:start + length]
+            for length in self.key_lengths if length <= len(query)
+            for start in range(len(query) - length + 1)
+        }
+        return self._existing(substrings)
+
+    def containing_keys(self, query):
+        """Keys that contain the query as a substring"""
+        conn = self._conn()
+        if len(query) == 2:
+            return {key for (key,) in conn.execute("SELECT key FROM grams WHERE gram = ?", (query,))}
+        if len(query) < 2:
+            # Shortest length with any match, as in FoodIndex
+            for length in self.key_lengths:
+                found = {key for (key,) in conn.execute(
+                    "SELECT key FROM foods WHERE length = ? AND instr(key, ?) > 0", (length, query))}
+                if found:
+                    return found
+            return set()
+
+        # Every trigram of the query must occur in a matching key, so scan
+        # only the rarest one's posting list and verify each candidate
+        grams = list(_ngrams(query, 3))[:MAX_PARAMETERS]
+        placeholders = ",".join("?" * len(grams))
+        counts = dict(conn.execute(f"SELECT gram, count FROM gram_counts WHERE gram IN ({placeholders})", grams))
+        if len(counts) < len(grams):
+            return set()
+        rarest = min(counts, key=counts.get)
+        return {key for (key,) in conn.execute(
+            "SELECT key FROM grams WHERE gram = ? AND instr(key, ?) > 0", (rarest, query))}
+
+    def lookup(self, query):
+        """Same ranking as FoodIndex.lookup"""
+        if not query:
+            return None
+        if query in self:
+            return query
+        return best_match(query, self.contained_keys(query) | self.containing_keys(query))
+
+    def fuzzy_compiled(self):
+        """
+        The FuzzyMatcher.compiled() state stored at build time, or None for
+        files compiled before it was added
+        """
+        try:
+            values = dict(self._conn().execute("SELECT name, value FROM fuzzy"))
+        except sqlite3.OperationalError:
+            return None
+        if not values:
+            return None
+        from scipy import sparse
+        arrays = {name: np.frombuffer(values[name], dtype=dtype) for name, dtype in FUZZY_ARRAYS.items()}
+        compiled = {name: json.loads(values[name]) for name in ("ngram_range", "keys", "grams")}
+        compiled["document_frequency"] = arrays["document_frequency"]
+        compiled["key_matrix"] = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]), shape=(len(compiled["keys"]), len(compiled["grams"]))
+        )
+        return compiled
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile CSV/JSON food tables into a nutrition database")
+    parser.add_argument("output", help="database file to write, e.g. nutrition.db")
+    parser.add_argument("sources", nargs="*", help="CSV/JSON files, later files override earlier ones")
+    parser.add_argument("--no-builtin", action="store_true", help="leave out the built-in food table")
+    args = parser.parse_args()
+
+    count, skipped = compile_database(args.output, args.sources, include_builtin=not args.no_builtin)
+    for source, message in skipped:
+        print(f"❌ Skipped row in {source}: {message}")
+    print(f"✓ Wrote {count} foods to {args.output}")
@@ -1,134 +1,205 @@
+import collections
 import os
 import json
+import threading
+import numpy as np
+from core.food_index import FoodIndex
+from core.metrics import NUTRITION_LOOKUPS
+from core.nutrition_db import NutritionDB
+
+MACRO_FIELDS = ("calories", "protein", "carbs", "fats")
+# Minimum TF-IDF cosine similarity for a fuzzy match to be accepted
+FUZZY_THRESHOLD = 0.5
+
+# Built-in table, used when no compiled database is configured and as the
+# seed for core/nutrition_db.py
+INDIAN_FOODS = [
+    # Common mess items
+    {"name": "Rajma Rice", "protein": 15, "carbs": 70, "fats": 8, "calories": 450, "portion": "1 plate"},
+    {"name": "Rajma", "protein": 15, "carbs": 40, "fats": 1, "calories": 230, "portion": "1 bowl"},
+    {"name": "Dal Rice", "protein": 12, "carbs": 65, "fats": 5, "calories": 350, "portion": "1 plate"},
+    {"name": "Paneer Curry", "protein": 18, "carbs": 12, "fats": 18, "calories": 280, "portion": "1 bowl"},
+    {"name": "Paneer", "protein": 18, "carbs": 3, "fats": 20, "calories": 265, "portion": "100g"},
+    {"name": "Dal Fry", "protein": 8, "carbs": 22, "fats": 4, "calories": 150, "portion": "1 bowl"},
+    {"name": "Dal Tadka", "protein": 8, "carbs": 22, "fats": 5, "calories": 160, "portion": "1 bowl"},
+    {"name": "Dal Mix Tadka", "protein": 8, "carbs": 22, "fats": 5, "calories": 160, "portion": "1 bowl"},
+    {"name": "Dal", "protein": 8, "carbs": 22, "fats": 4, "calories": 150, "portion": "1 bowl"},
+    {"name": "Arhar Dal", "protein": 9, "carbs": 20, "fats": 4, "calories": 155, "portion": "1 bowl"},
+    {"name": "Arhar", "protein": 9, "carbs": 20, "fats": 4, "calories": 155, "portion": "1 bowl"},
+    {"name": "Chana Masala", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
+    {"name": "Chana", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
+    {"name": "Chole", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
+    {"name": "Cholla", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
+    {"name": "Chanamasala", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
+    {"name": "Kala Chana", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
+    {"name": "Masoor Sabut", "protein": 9, "carbs": 20, "fats": 0.5, "calories": 120, "portion": "1 bowl"},
+    
+    # Breads
+    {"name": "Roti", "protein": 2, "carbs": 14, "fats": 1, "calories": 70, "portion": "1 piece"},
+    {"name": "Chapati", "protein": 2, "carbs": 14, "fats": 1, "calories": 70, "portion": "1 piece"},
+    {"name": "Paratha", "protein": 4, "carbs": 25, "fats": 8, "calories": 180, "portion": "1 piece"},
+    {"name": "Poori", "protein": 3, "carbs": 18, "fats": 10, "calories": 160, "portion": "1 piece"},
+    {"name": "Naan", "protein": 5, "carbs": 30, "fats": 5, "calories": 180, "portion": "1 piece"},
+    
+    # Rice dishes
+    {"name": "Rice", "protein": 2, "carbs": 30, "fats": 0.5, "calories": 130, "portion": "1/2 cup"},
+    {"name": "Jeera Rice", "protein": 2, "carbs": 32, "fats": 3, "calories": 160, "portion": "1 cup"},
+    {"name": "Zeera Rice", "protein": 2, "carbs": 32, "fats": 3, "calories": 160, "portion": "1 cup"},
+    {"name": "Onion Rice", "protein": 3, "carbs": 35, "fats": 4, "calories": 180, "portion": "1 cup"},
+    {"name": "Biryani", "protein": 12, "carbs": 50, "fats": 15, "calories": 380, "portion": "1 plate"},
+    {"name": "Veg Biryani", "protein": 8, "carbs": 50, "fats": 12, "calories": 340, "portion": "1 plate"},
+    {"name": "Pulao", "protein": 8, "carbs": 45, "fats": 10, "calories": 300, "portion": "1 plate"},
+    {"name": "Matar Pulao", "protein": 8, "carbs": 45, "fats": 10, "calories": 300, "portion": "1 plate"},
+    {"name": "Tahari", "protein": 10, "carbs": 48, "fats": 8, "calories": 300, "portion": "1 plate"},
+    
+    # Dairy
+    {"name": "Curd", "protein": 6, "carbs": 8, "fats": 3, "calories": 80, "portion": "1 bowl"},
+    {"name": "Dahi", "protein": 6, "carbs": 8, "fats": 3, "calories": 80, "portion": "1 bowl"},
+    {"name": "Raita", "protein": 4, "carbs": 6, "fats": 3, "calories": 60, "portion": "1 bowl"},
+    {"name": "Boondi Raita", "protein": 4, "carbs": 8, "fats": 3, "calories": 70, "portion": "1 bowl"},
+    {"name": "Milk", "protein": 8, "carbs": 12, "fats": 5, "calories": 120, "portion": "1 cup"},
+    
+    # Proteins
+    {"name": "Egg", "protein": 6, "carbs": 0.5, "fats": 5, "calories": 78, "portion": "1 egg"},
+    {"name": "Egg Curry", "protein": 12, "carbs": 8, "fats": 15, "calories": 220, "portion": "2 eggs"},
+    {"name": "Butter", "protein": 0, "carbs": 0, "fats": 11, "calories": 100, "portion": "1 tbsp"},
+    {"name": "Matar Paneer", "protein": 15, "carbs": 12, "fats": 18, "calories": 280, "portion": "1 bowl"},
+    
+    # Vegetables
+    {"name": "Aloo", "protein": 2, "carbs": 20, "fats": 0.2, "calories": 90, "portion": "1 medium"},
+    {"name": "Aloo Gobhi", "protein": 3, "carbs": 18, "fats": 4, "calories": 120, "portion": "1 bowl"},
+    {"name": "Aloo Gajar", "protein": 2, "carbs": 15, "fats": 3, "calories": 100, "portion": "1 bowl"},
+    {"name": "Alu Curry", "protein": 3, "carbs": 22, "fats": 6, "calories": 150, "portion": "1 bowl"},
+    {"name": "Dum Aloo", "protein": 3, "carbs": 25, "fats": 8, "calories": 180, "portion": "1 bowl"},
+    {"name": "Gobhi", "protein": 2, "carbs": 5, "fats": 0.3, "calories": 25, "portion": "1 cup"},
+    {"name": "Kaddu", "protein": 1, "carbs": 7, "fats": 0.1, "calories": 30, "portion": "1 cup"},
+    {"name": "Cabbage Matar", "protein": 3, "carbs": 10, "fats": 2, "calories": 70, "portion": "1 bowl"},
+    {"name": "Baigan Bharta", "protein": 2, "carbs": 10, "fats": 5, "calories": 90, "portion": "1 bowl"},
+    {"name": "Louki Kofta", "protein": 5, "carbs": 15, "fats": 10, "calories": 160, "portion": "1 bowl"},
+    {"name": "Moong Kofta", "protein": 8, "carbs": 12, "fats": 8, "calories": 150, "portion": "1 bowl"},
+    {"name": "Mixed Veg", "protein": 4, "carbs": 12, "fats": 4, "calories": 100, "portion": "1 bowl"},
+    {"name": "Tawa Veg", "protein": 4, "carbs": 12, "fats": 6, "calories": 120, "portion": "1 bowl"},
+    {"name": "Salad", "protein": 2, "carbs": 8, "fats": 0.5, "calories": 40, "portion": "1 bowl"},
+    
+    # South Indian
+    {"name": "Idli", "protein": 3, "carbs": 20, "fats": 1, "calories": 100, "portion": "2 pieces"},
+    {"name": "Dosa", "protein": 5, "carbs": 25, "fats": 4, "calories": 160, "portion": "1 dosa"},
+    {"name": "Uttapam", "protein": 4, "carbs": 22, "fats": 3, "calories": 140, "portion": "1 piece"},
+    {"name": "Sambhar", "protein": 8, "carbs": 15, "fats": 4, "calories": 130, "portion": "1 bowl"},
+    {"name": "Rasam", "protein": 2, "carbs": 8, "fats": 2, "calories": 50, "portion": "1 bowl"},
+    
+    # Breakfast items
+    {"name": "Poha", "protein": 4, "carbs": 30, "fats": 3, "calories": 160, "portion": "1 bowl"},
+    {"name": "Upma", "protein": 6, "carbs": 35, "fats": 5, "calories": 200, "portion": "1 cup"},
+    {"name": "Halwa", "protein": 3, "carbs": 45, "fats": 12, "calories": 280, "portion": "1 bowl"},
+    {"name": "Suji Halwa", "protein": 3, "carbs": 45, "fats": 12, "calories": 280, "portion": "1 bowl"},
+    {"name": "Moong Dal Halwa", "protein": 8, "carbs": 50, "fats": 15, "calories": 350, "portion": "1 bowl"},
+    {"name": "Maggi", "protein": 8, "carbs": 55, "fats": 15, "calories": 380, "portion": "1 packet"},
+    {"name": "Cornflakes", "protein": 2, "carbs": 25, "fats": 0.5, "calories": 110, "portion": "1 cup"},
+    {"name": "Dalia", "protein": 5, "carbs": 30, "fats": 2, "calories": 160, "portion": "1 bowl"},
+    {"name": "Samosa", "protein": 4, "carbs": 25, "fats": 12, "calories": 220, "portion": "1 piece"},
+    {"name": "Cholla Samose", "protein": 16, "carbs": 53, "fats": 18, "calories": 440, "portion": "combo"},
+    
+    # Sweets
+    {"name": "Jalebi", "protein": 2, "carbs": 50, "fats": 8, "calories": 250, "portion": "100g"},
+    {"name": "Gulab Jamun", "protein": 3, "carbs": 40, "fats": 15, "calories": 300, "portion": "2 pieces"},
+    {"name": "Gulabjamun", "protein": 3, "carbs": 40, "fats": 15, "calories": 300, "portion": "2 pieces"},
+    {"name": "Kala Jam", "protein": 3, "carbs": 42, "fats": 15, "calories": 310, "portion": "2 pieces"},
+    {"name": "Kheer", "protein": 6, "carbs": 40, "fats": 8, "calories": 250, "portion": "1 bowl"},
+    {"name": "Sewai", "protein": 4, "carbs": 35, "fats": 6, "calories": 210, "portion": "1 bowl"},
+    {"name": "Ladoo", "protein": 4, "carbs": 35, "fats": 12, "calories": 260, "portion": "2 pieces"},
+    {"name": "Nariyal Laddo", "protein": 3, "carbs": 38, "fats": 14, "calories": 280, "portion": "2 pieces"},
+    
+    # Condiments & Misc
+    {"name": "Chutney", "protein": 1, "carbs": 5, "fats": 0.5, "calories": 25, "portion": "2 tbsp"},
+    {"name": "Chatni", "protein": 1, "carbs": 5, "fats": 0.5, "calories": 25, "portion": "2 tbsp"},
+    {"name": "Hari Chatni", "protein": 1, "carbs": 3, "fats": 0.5, "calories": 20, "portion": "2 tbsp"},
+    {"name": "Lashun Chatni", "protein": 1, "carbs": 4, "fats": 1, "calories": 25, "portion": "2 tbsp"},
+    {"name": "Achar", "protein": 0.5, "carbs": 3, "fats": 1, "calories": 20, "portion": "1 tbsp"},
+    {"name": "Jam", "protein": 0, "carbs": 15, "fats": 0, "calories": 60, "portion": "1 tbsp"},
+    {"name": "Sauce", "protein": 0.5, "carbs": 5, "fats": 0, "calories": 20, "portion": "1 tbsp"},
+    {"name": "Kadhi Pakora", "protein": 8, "carbs": 15, "fats": 12, "calories": 200, "portion": "1 bowl"},
+    {"name": "Kadhi", "protein": 8, "carbs": 12, "fats": 10, "calories": 180, "portion": "1 bowl"},
+    {"name": "Sprout", "protein": 4, "carbs": 8, "fats": 0.5, "calories": 50, "portion": "1 cup"},
+    {"name": "Dal Makhani", "protein": 10, "carbs": 25, "fats": 15, "calories": 280, "portion": "1 bowl"},
+    
+    # Fruits
+    {"name": "Banana", "protein": 1, "carbs": 27, "fats": 0.3, "calories": 105, "portion": "1 medium"},
+    {"name": "Papaya", "protein": 0.5, "carbs": 11, "fats": 0.2, "calories": 43, "portion": "1 cup"},
+    
+    # Special dishes
+    {"name": "Special Dinner", "protein": 25, "carbs": 60, "fats": 20, "calories": 520, "portion": "1 thali"},
+]
+
+def names_word_for_word(key, name):
+    """Whether key appears in name as whole words ("aloo" in "Jeera Aloo", not "dahi" in "Kdahi")"""
+    return f" {key} " in f" {' '.join(name.lower().split())} "
+
+
 class NutritionRAG:
-    def __init__(self, api_key):
-        """Initialize nutrition database"""
+    def __init__(self, api_key, db_path=None, fuzzy_threshold=FUZZY_THRESHOLD):
+        """
+        Nutrition database; the food table and its index are loaded on first lookup.
+
+        With db_path (or NUTRITION_DB) set, foods come from a compiled
+        database file (see core/nutrition_db.py) opened read-only;
+        otherwise the built-in table is used.
+        """
         self.api_key = api_key
-        self.food_database = {}
-        self.initialize_database()
+        self.db_path = db_path or os.getenv("NUTRITION_DB")
+        self.fuzzy_threshold = fuzzy_threshold
+        self._food_database = None
+        self._food_index = None
+        self._fuzzy_matcher = None
+        self._load_lock = threading.Lock()
+    
+    def _load(self):
+        with self._load_lock:
+            if self._food_index is None:
+                if self.db_path:
+                    database = NutritionDB(self.db_path)
+                    print(f"✓ Nutrition database opened with {len(database)} food items ({self.db_path})")
+                    self._food_database = database
+                    self._food_index = database
+                    return
+                self.initialize_database()
+                self._food_index = FoodIndex(self._food_database.keys())
+    
+    @property
+    def food_database(self):
+        if self._food_index is None:
+            self._load()
+        return self._food_database
+    
+    @property
+    def food_index(self):
+        if self._food_index is None:
+            self._load()
+        return self._food_index
+    
+    @property
+    def fuzzy_matcher(self):
+        if self._fuzzy_matcher is None:
+            # Deferred: scipy is only needed once a name misses exactly
+            from core.fuzzy_match import FuzzyMatcher
+            database = self.food_database
+            compiled = database.fuzzy_compiled() if isinstance(database, NutritionDB) else None
+            if compiled is None and isinstance(database, NutritionDB):
+                print(f"⚠️ {self.db_path} has no precompiled fuzzy index; building it (recompile the database to skip this)")
+            with self._load_lock:
+                if self._fuzzy_matcher is None:
+                    if compiled is not None:
+                        self._fuzzy_matcher = FuzzyMatcher.from_compiled(compiled)
+                    else:
+                        self._fuzzy_matcher = FuzzyMatcher(database.keys())
+        return self._fuzzy_matcher
     
     def initialize_database(self):
         """Create simple dictionary with Indian food nutrition data"""
-        indian_foods = [
-            # Common mess items
-            {"name": "Rajma Rice", "protein": 15, "carbs": 70, "fats": 8, "calories": 450, "portion": "1 plate"},
-            {"name": "Rajma", "protein": 15, "carbs": 40, "fats": 1, "calories": 230, "portion": "1 bowl"},
-            {"name": "Dal Rice", "protein": 12, "carbs": 65, "fats": 5, "calories": 350, "portion": "1 plate"},
-            {"name": "Paneer Curry", "protein": 18, "carbs": 12, "fats": 18, "calories": 280, "portion": "1 bowl"},
-            {"name": "Paneer", "protein": 18, "carbs": 3, "fats": 20, "calories": 265, "portion": "100g"},
-            {"name": "Dal Fry", "protein": 8, "carbs": 22, "fats": 4, "calories": 150, "portion": "1 bowl"},
-            {"name": "Dal Tadka", "protein": 8, "carbs": 22, "fats": 5, "calories": 160, "portion": "1 bowl"},
-            {"name": "Dal Mix Tadka", "protein": 8, "carbs": 22, "fats": 5, "calories": 160, "portion": "1 bowl"},
-            {"name": "Dal", "protein": 8, "carbs": 22, "fats": 4, "calories": 150, "portion": "1 bowl"},
-            {"name": "Arhar Dal", "protein": 9, "carbs": 20, "fats": 4, "calories": 155, "portion": "1 bowl"},
-            {"name": "Arhar", "protein": 9, "carbs": 20, "fats": 4, "calories": 155, "portion": "1 bowl"},
-            {"name": "Chana Masala", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
-            {"name": "Chana", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
-            {"name": "Chole", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
-            {"name": "Cholla", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
-            {"name": "Chanamasala", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
-            {"name": "Kala Chana", "protein": 12, "carbs": 28, "fats": 6, "calories": 220, "portion": "1 bowl"},
-            {"name": "Masoor Sabut", "protein": 9, "carbs": 20, "fats": 0.5, "calories": 120, "portion": "1 bowl"},
-            
-            # Breads
-            {"name": "Roti", "protein": 2, "carbs": 14, "fats": 1, "calories": 70, "portion": "1 piece"},
-            {"name": "Chapati", "protein": 2, "carbs": 14, "fats": 1, "calories": 70, "portion": "1 piece"},
-            {"name": "Paratha", "protein": 4, "carbs": 25, "fats": 8, "calories": 180, "portion": "1 piece"},
-            {"name": "Poori", "protein": 3, "carbs": 18, "fats": 10, "calories": 160, "portion": "1 piece"},
-            {"name": "Naan", "protein": 5, "carbs": 30, "fats": 5, "calories": 180, "portion": "1 piece"},
-            
-            # Rice dishes
-            {"name": "Rice", "protein": 2, "carbs": 30, "fats": 0.5, "calories": 130, "portion": "1/2 cup"},
-            {"name": "Jeera Rice", "protein": 2, "carbs": 32, "fats": 3, "calories": 160, "portion": "1 cup"},
-            {"name": "Zeera Rice", "protein": 2, "carbs": 32, "fats": 3, "calories": 160, "portion": "1 cup"},
-            {"name": "Onion Rice", "protein": 3, "carbs": 35, "fats": 4, "calories": 180, "portion": "1 cup"},
-            {"name": "Biryani", "protein": 12, "carbs": 50, "fats": 15, "calories": 380, "portion": "1 plate"},
-            {"name": "Veg Biryani", "protein": 8, "carbs": 50, "fats": 12, "calories": 340, "portion": "1 plate"},
-            {"name": "Pulao", "protein": 8, "carbs": 45, "fats": 10, "calories": 300, "portion": "1 plate"},
-            {"name": "Matar Pulao", "protein": 8, "carbs": 45, "fats": 10, "calories": 300, "portion": "1 plate"},
-            {"name": "Tahari", "protein": 10, "carbs": 48, "fats": 8, "calories": 300, "portion": "1 plate"},
-            
-            # Dairy
-            {"name": "Curd", "protein": 6, "carbs": 8, "fats": 3, "calories": 80, "portion": "1 bowl"},
-            {"name": "Dahi", "protein": 6, "carbs": 8, "fats": 3, "calories": 80, "portion": "1 bowl"},
-            {"name": "Raita", "protein": 4, "carbs": 6, "fats": 3, "calories": 60, "portion": "1 bowl"},
-            {"name": "Boondi Raita", "protein": 4, "carbs": 8, "fats": 3, "calories": 70, "portion": "1 bowl"},
-            {"name": "Milk", "protein": 8, "carbs": 12, "fats": 5, "calories": 120, "portion": "1 cup"},
-            
-            # Proteins
-            {"name": "Egg", "protein": 6, "carbs": 0.5, "fats": 5, "calories": 78, "portion": "1 egg"},
-            {"name": "Egg Curry", "protein": 12, "carbs": 8, "fats": 15, "calories": 220, "portion": "2 eggs"},
-            {"name": "Butter", "protein": 0, "carbs": 0, "fats": 11, "calories": 100, "portion": "1 tbsp"},
-            {"name": "Matar Paneer", "protein": 15, "carbs": 12, "fats": 18, "calories": 280, "portion": "1 bowl"},
-            
-            # Vegetables
-            {"name": "Aloo", "protein": 2, "carbs": 20, "fats": 0.2, "calories": 90, "portion": "1 medium"},
-            {"name": "Aloo Gobhi", "protein": 3, "carbs": 18, "fats": 4, "calories": 120, "portion": "1 bowl"},
-            {"name": "Aloo Gajar", "protein": 2, "carbs": 15, "fats": 3, "calories": 100, "portion": "1 bowl"},
-            {"name": "Alu Curry", "protein": 3, "carbs": 22, "fats": 6, "calories": 150, "portion": "1 bowl"},
-            {"name": "Dum Aloo", "protein": 3, "carbs": 25, "fats": 8, "calories": 180, "portion": "1 bowl"},
-            {"name": "Gobhi", "protein": 2, "carbs": 5, "fats": 0.3, "calories": 25, "portion": "1 cup"},
-            {"name": "Kaddu", "protein": 1, "carbs": 7, "fats": 0.1, "calories": 30, "portion": "1 cup"},
-            {"name": "Cabbage Matar", "protein": 3, "carbs": 10, "fats": 2, "calories": 70, "portion": "1 bowl"},
-            {"name": "Baigan Bharta", "protein": 2, "carbs": 10, "fats": 5, "calories": 90, "portion": "1 bowl"},
-            {"name": "Louki Kofta", "protein": 5, "carbs": 15, "fats": 10, "calories": 160, "portion": "1 bowl"},
-            {"name": "Moong Kofta", "protein": 8, "carbs": 12, "fats": 8, "calories": 150, "portion": "1 bowl"},
-            {"name": "Mixed Veg", "protein": 4, "carbs": 12, "fats": 4, "calories": 100, "portion": "1 bowl"},
-            {"name": "Tawa Veg", "protein": 4, "carbs": 12, "fats": 6, "calories": 120, "portion": "1 bowl"},
-            {"name": "Salad", "protein": 2, "carbs": 8, "fats": 0.5, "calories": 40, "portion": "1 bowl"},
-            
-            # South Indian
-            {"name": "Idli", "protein": 3, "carbs": 20, "fats": 1, "calories": 100, "portion": "2 pieces"},
-            {"name": "Dosa", "protein": 5, "carbs": 25, "fats": 4, "calories": 160, "portion": "1 dosa"},
-            {"name": "Uttapam", "protein": 4, "carbs": 22, "fats": 3, "calories": 140, "portion": "1 piece"},
-            {"name": "Sambhar", "protein": 8, "carbs": 15, "fats": 4, "calories": 130, "portion": "1 bowl"},
-            {"name": "Rasam", "protein": 2, "carbs": 8, "fats": 2, "calories": 50, "portion": "1 bowl"},
-            
-            # Breakfast items
-            {"name": "Poha", "protein": 4, "carbs": 30, "fats": 3, "calories": 160, "portion": "1 bowl"},
-            {"name": "Upma", "protein": 6, "carbs": 35, "fats": 5, "calories": 200, "portion": "1 cup"},
-            {"name": "Halwa", "protein": 3, "carbs": 45, "fats": 12, "calories": 280, "portion": "1 bowl"},
-            {"name": "Suji Halwa", "protein": 3, "carbs": 45, "fats": 12, "calories": 280, "portion": "1 bowl"},
-            {"name": "Moong Dal Halwa", "protein": 8, "carbs": 50, "fats": 15, "calories": 350, "portion": "1 bowl"},
-            {"name": "Maggi", "protein": 8, "carbs": 55, "fats": 15, "calories": 380, "portion": "1 packet"},
-            {"name": "Cornflakes", "protein": 2, "carbs": 25, "fats": 0.5, "calories": 110, "portion": "1 cup"},
-            {"name": "Dalia", "protein": 5, "carbs": 30, "fats": 2, "calories": 160, "portion": "1 bowl"},
-            {"name": "Samosa", "protein": 4, "carbs": 25, "fats": 12, "calories": 220, "portion": "1 piece"},
-            {"name": "Cholla Samose", "protein": 16, "carbs": 53, "fats": 18, "calories": 440, "portion": "combo"},
-            
-            # Sweets
-            {"name": "Jalebi", "protein": 2, "carbs": 50, "fats": 8, "calories": 250, "portion": "100g"},
-            {"name": "Gulab Jamun", "protein": 3, "carbs": 40, "fats": 15, "calories": 300, "portion": "2 pieces"},
-            {"name": "Gulabjamun", "protein": 3, "carbs": 40, "fats": 15, "calories": 300, "portion": "2 pieces"},
-            {"name": "Kala Jam", "protein": 3, "carbs": 42, "fats": 15, "calories": 310, "portion": "2 pieces"},
-            {"name": "Kheer", "protein": 6, "carbs": 40, "fats": 8, "calories": 250, "portion": "1 bowl"},
-            {"name": "Sewai", "protein": 4, "carbs": 35, "fats": 6, "calories": 210, "portion": "1 bowl"},
-            {"name": "Ladoo", "protein": 4, "carbs": 35, "fats": 12, "calories": 260, "portion": "2 pieces"},
-            {"name": "Nariyal Laddo", "protein": 3, "carbs": 38, "fats": 14, "calories": 280, "portion": "2 pieces"},
-            
-            # Condiments & Misc
-            {"name": "Chutney", "protein": 1, "carbs": 5, "fats": 0.5, "calories": 25, "portion": "2 tbsp"},
-            {"name": "Chatni", "protein": 1, "carbs": 5, "fats": 0.5, "calories": 25, "portion": "2 tbsp"},
-            {"name": "Hari Chatni", "protein": 1, "carbs": 3, "fats": 0.5, "calories": 20, "portion": "2 tbsp"},
-            {"name": "Lashun Chatni", "protein": 1, "carbs": 4, "fats": 1, "calories": 25, "portion": "2 tbsp"},
-            {"name": "Achar", "protein": 0.5, "carbs": 3, "fats": 1, "calories": 20, "portion": "1 tbsp"},
-            {"name": "Jam", "protein": 0, "carbs": 15, "fats": 0, "calories": 60, "portion": "1 tbsp"},
-            {"name": "Sauce", "protein": 0.5, "carbs": 5, "fats": 0, "calories": 20, "portion": "1 tbsp"},
-            {"name": "Kadhi Pakora", "protein": 8, "carbs": 15, "fats": 12, "calories": 200, "portion": "1 bowl"},
-            {"name": "Kadhi", "protein": 8, "carbs": 12, "fats": 10, "calories": 180, "portion": "1 bowl"},
-            {"name": "Sprout", "protein": 4, "carbs": 8, "fats": 0.5, "calories": 50, "portion": "1 cup"},
-            {"name": "Dal Makhani", "protein": 10, "carbs": 25, "fats": 15, "calories": 280, "portion": "1 bowl"},
-            
-            # Fruits
-            {"name": "Banana", "protein": 1, "carbs": 27, "fats": 0.3, "calories": 105, "portion": "1 medium"},
-            {"name": "Papaya", "protein": 0.5, "carbs": 11, "fats": 0.2, "calories": 43, "portion": "1 cup"},
-            
-            # Special dishes
-            {"name": "Special Dinner", "protein": 25, "carbs": 60, "fats": 20, "calories": 520, "portion": "1 thali"},
-        ]
-        for food in indian_foods:
+        self._food_database = {}
+        for food in INDIAN_FOODS:
             key = food['name'].lower()
-            self.food_database[key] = {
+            self._food_database[key] = {
                 "name": food['name'],
                 "calories": food['calories'],
                 "protein": food['protein'],
@@ -137,40 +208,82 @@ class NutritionRAG:
                 "portion": food['portion']
             }
         
-        print(f"✓ Nutrition database initialized with {len(self.food_database)} food items")
+        print(f"✓ Nutrition database initialized with {len(self._food_database)} food items")
     
-    def search_food(self, food_name):
-        """Search for food item"""
-        if not food_name or not isinstance(food_name, str):
-            return {
-                "name": str(food_name),
-                "calories": 100,
-                "protein": 3,
-                "carbs": 15,
-                "fats": 3,
-                "portion": "1 serving"
-            }
+    def match_foods(self, food_names, k=3):
+        """
+        Match food names to database keys.
+
+        Exact keys win; the remaining names are scored together against
+        the whole table (FuzzyMatcher) and take the best candidate at or
+        above fuzzy_threshold, then fall back to substring matching. A
+        food named word for word inside the name (FoodIndex) overrides a
+        look-alike fuzzy winner that doesn't contain it, as long as it is
+        among the candidates: "Jeera Aloo" is aloo, not jeera rice.
+        Returns {name: {"status": exact|fuzzy|partial|unresolved, "key",
+        "confidence", "candidates": [{"name", "confidence"}]}}.
+        """
+        matches = {}
+        pending = []
+        for name in dict.fromkeys(food_names):
+            key = name.lower().strip() if isinstance(name, str) else ""
+            if key and key in self.food_database:
+                matches[name] = {"status": "exact", "key": key, "confidence": 1.0, "candidates": []}
+            else:
+                pending.append(name)
         
-        key = food_name.lower().strip()
-        
-        if key in self.food_database:
-            return self.food_database[key]
+        valid = [name for name in pending if isinstance(name, str) and name.strip()]
+        ranked_by_name = dict(zip(valid, self.fuzzy_matcher.top_k(valid, k))) if valid else {}
+        for name in pending:
+            ranked = ranked_by_name.get(name, [])
+            candidates = [
+                {"name": self.food_database[key]["name"], "confidence": round(score, 3)}
+                for key, score in ranked
+            ]
+            # Substring match (indexed, most specific match wins): the fallback
+            # below the threshold, and the override described above
+            key = self.food_index.lookup(name.lower().strip()) if name in ranked_by_name else None
+            if ranked and ranked[0][1] >= self.fuzzy_threshold:
+                best, score = ranked[0]
+                if not (key and key in dict(ranked) and key not in best and names_word_for_word(key, name)):
+                    matches[name] = {"status": "fuzzy", "key": best, "confidence": round(score, 3), "candidates": candidates}
+                    continue
+            
+            if key:
+                confidence = dict(ranked).get(key)
+                matches[name] = {
+                    "status": "partial", "key": key,
+                    "confidence": round(confidence, 3) if confidence is not None else None,
+                    "candidates": candidates
+                }
+            else:
+                matches[name] = {"status": "unresolved", "key": None, "confidence": None, "candidates": candidates}
         
-        # Partial match
-        for db_key, db_value in self.food_database.items():
-            if key in db_key or db_key in key:
-                return db_value
+        for status, count in collections.Counter(match["status"] for match in matches.values()).items():
+            NUTRITION_LOOKUPS.labels(status).inc(count)
+        return matches
+    
+    def nutrition_for(self, food_name, match):
+        """Database entry for a match_foods() result"""
+        if match["key"] is not None:
+            return self.food_database[match["key"]]
         
-        # Default
+        # Unresolved: a generic estimate, flagged so callers can ask the user
         return {
-            "name": food_name,
+            "name": str(food_name),
             "calories": 100,
             "protein": 3,
             "carbs": 15,
             "fats": 3,
-            "portion": "1 serving"
+            "portion": "1 serving",
+            "unresolved": True,
+            "suggestions": [candidate["name"] for candidate in match["candidates"]]
         }
     
+    def search_food(self, food_name):
+        """Search for food item"""
+        return self.nutrition_for(food_name, self.match_foods([food_name])[food_name])
+    
     def search_multiple_foods(self, food_names):
         """Search multiple foods"""
         result = {}
@@ -185,3 +298,79 @@ class NutritionRAG:
                     result[food] = self.search_food(food)
         
         return result
+
+    def resolve_batch(self, food_names):
+        """
+        Resolve a batch of food names, looking up each distinct name once.
+
+        Returns (names, nutrition, macros) where names are the unique names
+        in first-seen order, nutrition maps each name to its database entry
+        (flagged "unresolved" when nothing matched) and macros is a
+        (len(names), 4) float array with columns in MACRO_FIELDS order.
+        """
+        names = list(dict.fromkeys(name for name in food_names if name))
+        matches = self.match_foods(names)
+        nutrition = {name: self.nutrition_for(name, matches[name]) for name in names}
+        macros = np.array(
+            [[nutrition[name][field] for field in MACRO_FIELDS] for name in names],
+            dtype=np.float64
+        ).reshape(len(names), len(MACRO_FIELDS))
+        return names, nutrition, macros
+
+    def aggregate_menus(self, menus):
+        """
+        Enrich scanned menu entries with nutrition plus per-meal and per-day totals.
+
+        Every distinct item across the whole scan is resolved once; totals
+        are computed with vectorized reductions over the item macro array.
+        """
+        # Flatten every (day, meal, item) into one list of segments
+        segments = []
+        segment_items = []
+        for day_index, menu_entry in enumerate(menus):
+            for meal_type, items in menu_entry.get('meals', {}).items():
+                if isinstance(items, dict):
+                    items = list(items.keys())
+                elif not isinstance(items, list):
+                    items = []
+                unique_items = list(dict.fromkeys(item for item in items if item))
+                segments.append((day_index, meal_type))
+                segment_items.append(unique_items)
+
+        all_items = [item for items in segment_items for item in items]
+        names, nutrition, macros = self.resolve_batch(all_items)
+        name_ids = {name: i for i, name in enumerate(names)}
+
+        item_ids = np.fromiter((name_ids[item] for item in all_items), dtype=np.intp, count=len(all_items))
+        segment_ids = np.repeat(np.arange(len(segments)), [len(items) for items in segment_items])
+        day_ids = np.array([day_index for day_index, _ in segments], dtype=np.intp)
+
+        meal_totals = np.zeros((len(segments), len(MACRO_FIELDS)))
+        np.add.at(meal_totals, segment_ids, macros[item_ids])
+        day_totals = np.zeros((len(menus), len(MACRO_FIELDS)))
+        np.add.at(day_totals, day_ids, meal_totals)
+
+        def as_dict(row):
+            return {field: round(float(value), 1) for field, value in zip(MACRO_FIELDS, row)}
+
+        processed_menus = []
+        for day_index, menu_entry in enumerate(menus):
+            processed_menus.append({
+                "date": menu_entry.get('date', 'unknown'),
+                "day": menu_entry.get('day', 'Unknown'),
+                "meals": {},
+                "raw_items": menu_entry.get('meals', {}),
+                "meal_totals": {},
+                "day_totals": as_dict(day_totals[day_index]),
+                "unresolved_items": []
+            })
+
+        for segment_index, (day_index, meal_type) in enumerate(segments):
+            processed = processed_menus[day_index]
+            processed["meals"][meal_type] = {item: nutrition[item] for item in segment_items[segment_index]}
+            processed["meal_totals"][meal_type] = as_dict(meal_totals[segment_index])
+            processed["unresolved_items"] += [
+                item for item in segment_items[segment_index] if nutrition[item].get("unresolved")
+            ]
+
+        return processed_menus
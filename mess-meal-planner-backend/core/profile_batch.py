@@ -0,0 +1,103 @@
+import csv
+import io
+import math
+
+import orjson
+
+from core.responses import dumps
+
+PROFILE_DEFAULTS = {"activity_level": "moderate", "workout_today": "rest", "gender": "male"}
+NUMERIC_FIELDS = {"age": int, "height": float, "weight": float}
+
+
+def read_profile_records(body, content_type):
+    """
+    Split an uploaded batch into raw records.
+
+    CSV (text/csv, with a header row) and JSON lines (one object per line)
+    are supported; anything that isn't CSV is treated as JSON lines.
+    """
+    text = body.decode("utf-8-sig")
+    if "csv" in (content_type or ""):
+        return list(csv.DictReader(io.StringIO(text)))
+
+    records = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(orjson.loads(line))
+        except orjson.JSONDecodeError as e:
+            records.append(e)
+    return records
+
+
+def profile_columns(records):
+    """
+    Validate records into columns for MacroCalculator.calculate_batch.
+
+    Returns (columns, rows, errors): columns is a dict of lists, rows the
+    original row index of each valid entry and errors a list of
+    (row, message) for entries that were skipped.
+    """
+    columns = {field: [] for field in ("age", "height", "weight", "goal", "activity_level", "workout_today", "gender", "id")}
+    rows = []
+    errors = []
+    for row, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors.append((row, f"Invalid record: {record}"))
+            continue
+        try:
+            values = {field: cast(record[field]) for field, cast in NUMERIC_FIELDS.items()}
+            goal = str(record["goal"]).strip().lower()
+        except KeyError as e:
+            errors.append((row, f"Missing field {e}"))
+            continue
+        except (TypeError, ValueError, OverflowError) as e:
+            errors.append((row, f"Invalid value: {e}"))
+            continue
+        # float() accepts "nan" and "inf", which would come out as garbage targets
+        invalid = [field for field, value in values.items() if not math.isfinite(value) or value <= 0]
+        if invalid:
+            errors.append((row, f"Invalid value: {', '.join(invalid)} must be a positive number"))
+            continue
+
+        for field, value in values.items():
+            columns[field].append(value)
+        columns["goal"].append(goal)
+        for field, default in PROFILE_DEFAULTS.items():
+            columns[field].append(str(record.get(field) or default).strip().lower())
+        columns["id"].append(record.get("id"))
+        rows.append(row)
+    return columns, rows, errors
+
+
+def ndjson_results(columns, rows, errors, results, chunk_size=1000):
+    """
+    Yield setup-profile style results as JSON lines, chunk_size rows per yield
+    """
+    lines = []
+    for i, row in enumerate(rows):
+        lines.append(dumps({
+            "row": row,
+            "id": columns["id"][i],
+            "status": "success",
+            "tdee": int(results["tdee"][i]),
+            "daily_targets": {
+                "calories": int(results["calories"][i]),
+                "protein": int(results["protein"][i]),
+                "carbs": int(results["carbs"][i]),
+                "fats": int(results["fats"][i])
+            },
+            "goal": columns["goal"][i].upper(),
+            "workout_today": columns["workout_today"][i].upper()
+        }))
+        if len(lines) >= chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    for row, message in errors:
+        lines.append(dumps({"row": row, "status": "error", "detail": message}))
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,89 @@
+import os
+from collections import namedtuple
+
+from core.llm import CHARS_PER_TOKEN, estimate_tokens
+
+DEFAULT_TOKEN_BUDGET = 800
+MACRO_KEYS = ("calories", "protein", "carbs", "fats")
+TABLE_HEADER = "item|kcal|P|C|F"
+
+Prompt = namedtuple("Prompt", ["text", "tokens", "dropped_rows"])
+
+
+def number(value):
+    """12.0 -> "12", 12.46 -> "12.5", missing -> "-" """
+    if not isinstance(value, (int, float)):
+        return "-"
+    value = round(float(value), 1)
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def macro_summary(macros):
+    """{"calories": 520, "protein": 32, ...} -> "520kcal P32 C60 F14" """
+    return (f"{number(macros.get('calories'))}kcal P{number(macros.get('protein'))} "
+            f"C{number(macros.get('carbs'))} F{number(macros.get('fats'))}")
+
+
+def menu_rows(menu_items, names):
+    """One "name|kcal|P|C|F" row per item, macros per serving"""
+    rows = []
+    for name in names:
+        macros = menu_items.get(name)
+        macros = macros if isinstance(macros, dict) else {}
+        rows.append("|".join([name] + [number(macros.get(key)) for key in MACRO_KEYS]))
+    return rows
+
+
+class PromptBuilder:
+    """
+    Assemble a prompt from lines and tables within a token budget.
+
+    Lines are always kept. Table rows are optional: they are added in
+    the order given until the budget runs out, so callers put the most
+    useful rows first. A table whose rows are all dropped disappears
+    with its title.
+    """
+
+    def __init__(self, token_budget=None):
+        self.token_budget = token_budget or int(os.getenv("PROMPT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+        self.sections = []
+
+    def line(self, text):
+        self.sections.append(("line", text))
+        return self
+
+    def table(self, title, rows, header=TABLE_HEADER):
+        self.sections.append(("table", (title, header, list(rows))))
+        return self
+
+    def build(self):
+        """Prompt(text, tokens, dropped_rows); tokens is the estimate used for the budget"""
+        # Budget in characters, the unit estimate_tokens counts in (+1 per line for the newline)
+        required = 0
+        for kind, content in self.sections:
+            if kind == "line":
+                required += len(content) + 1
+            elif content[2]:
+                title, header, _ = content
+                required += len(title) + len(header) + 2
+        available = self.token_budget * CHARS_PER_TOKEN - required
+
+        lines = []
+        dropped = 0
+        for kind, content in self.sections:
+            if kind == "line":
+                lines.append(content)
+                continue
+            title, header, rows = content
+            kept = []
+            for row in rows:
+                if len(row) + 1 > available:
+                    break
+                kept.append(row)
+                available -= len(row) + 1
+            dropped += len(rows) - len(kept)
+            if kept:
+                lines.extend([title, header] + kept)
+
+        text = "\n".join(lines)
+        return Prompt(text, estimate_tokens(text), dropped)
@@ -0,0 +1,205 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+
+class ResponseCache:
+    def __init__(self, max_size=256, ttl=3600, variants=1):
+        """
+        In-memory LRU cache with TTL for LLM responses.
+
+        Each key holds a small pool of up to `variants` responses so cached
+        answers don't read identically every time: until the pool is full a
+        lookup still calls the model and adds the result, after that a
+        random variant is served.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self.entries = OrderedDict()  # key -> (created_at, [responses])
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _pool(self, key):
+        """Return the live variant pool for key, dropping it if expired"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        created_at, pool = entry
+        if self.ttl is not None and time.monotonic() - created_at > self.ttl:
+            del self.entries[key]
+            self.expirations += 1
+            return None
+        self.entries.move_to_end(key)
+        return pool
+
+    def get_or_compute(self, key, compute):
+        """Serve a cached variant for key, or call compute() and store it"""
+        with self.lock:
+            pool = self._pool(key)
+            if pool is not None and len(pool) >= self.variants:
+                self.hits += 1
+                return random.choice(pool)
+            self.misses += 1
+
+        value = compute()
+
+        with self.lock:
+            pool = self._pool(key)
+            if pool is None:
+                self.entries[key] = (time.monotonic(), [value])
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+            elif len(pool) < self.variants:
+                pool.append(value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "variants": self.variants,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+class SharedResponseCache:
+    def __init__(self, path, max_size=256, ttl=3600, variants=1):
+        """
+        ResponseCache with the same interface, kept in a SQLite file.
+
+        Every worker process that opens the same path shares the entries,
+        so a guidance or motivation text generated by one worker is served
+        by all of them. LRU order is tracked by last use; eviction and TTL
+        work as in ResponseCache. Hit/miss counters are per process.
+        """
+        self.path = os.path.abspath(path)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, created_at REAL NOT NULL, "
+                "used_at REAL NOT NULL, responses BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at)")
+
+    def _conn(self):
+        # Per thread, and never carried across a fork
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _pool(self, conn, key):
+        """The live variant pool for key (marking it used), dropping it if expired"""
+        row = conn.execute("SELECT created_at, responses FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        created_at, responses = row
+        if self.ttl is not None and time.time() - created_at > self.ttl:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count("expirations")
+            return None
+        conn.execute("UPDATE entries SET used_at = ? WHERE key = ?", (time.time(), key))
+        return orjson.loads(responses)
+
+    def get_or_compute(self, key, compute):
+        """Serve a cached variant for key, or call compute() and store it"""
+        # Keys are tuples of plain values in memory; stored as their JSON text
+        key = orjson.dumps(key).decode()
+        with self._conn() as conn:
+            pool = self._pool(conn, key)
+        if pool is not None and len(pool) >= self.variants:
+            self._count("hits")
+            return random.choice(pool)
+        self._count("misses")
+
+        value = compute()
+
+        conn = self._conn()
+        with conn:
+            # One write transaction, so concurrent workers don't lose variants
+            conn.execute("BEGIN IMMEDIATE")
+            pool = self._pool(conn, key)
+            now = time.time()
+            if pool is None:
+                conn.execute("INSERT INTO entries VALUES (?, ?, ?, ?)", (key, now, now, orjson.dumps([value])))
+                evicted = conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,)
+                ).rowcount
+                with self.lock:
+                    self.evictions += evicted
+            elif len(pool) < self.variants:
+                conn.execute("UPDATE entries SET responses = ? WHERE key = ?", (orjson.dumps(pool + [value]), key))
+        return value
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        """Counters for sizing the cache (size is shared, the rest per process)"""
+        size = self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "variants": self.variants,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "backend": "sqlite"
+            }
+
+
+def make_response_cache(name, max_size=256, ttl=3600, variants=1):
+    """
+    A ResponseCache, or with CACHE_BACKEND=sqlite a SharedResponseCache at
+    CACHE_DIR/<name>.db (serve.py turns this on for its worker processes)
+    """
+    if os.getenv("CACHE_BACKEND", "memory").lower() == "sqlite":
+        path = os.path.join(os.getenv("CACHE_DIR", ".response_cache"), f"{name}.db")
+        return SharedResponseCache(path, max_size=max_size, ttl=ttl, variants=variants)
+    return ResponseCache(max_size=max_size, ttl=ttl, variants=variants)
@@ -0,0 +1,16 @@
+import orjson
+from starlette.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(content):
+    """JSON text via orjson (numpy values and non-string keys allowed)"""
+    return orjson.dumps(content, option=ORJSON_OPTIONS).decode()
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content):
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
@@ -0,0 +1,359 @@
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+import orjson
+
+from core.metrics import SCAN_JOB_DURATION, SCAN_JOB_WAIT, SCAN_JOBS, SCAN_JOBS_RUNNING, SCAN_QUEUE_DEPTH
+
+WAIT_POLL_INTERVAL = 0.05
+JOB_FIELDS = ("id", "key", "state", "created_at", "started_at", "finished_at", "result", "error", "heartbeat_at")
+UNFINISHED = ("queued", "running")
+ABANDONED_ERROR = "Abandoned: the worker process running this scan stopped"
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result BLOB,
+    error TEXT,
+    heartbeat_at REAL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS job_keys (key TEXT PRIMARY KEY, job_id TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+
+def public_job(job):
+    """The client-facing view of a job record (a ScanJob's attributes or a stored row)"""
+    view = {field: job[field] for field in ("id", "state", "created_at", "started_at", "finished_at")}
+    if job["state"] == "done":
+        view["result"] = job["result"]
+    elif job["state"] == "failed":
+        view["error"] = job["error"]
+    return view
+
+
+def holds_key(state, result):
+    """Whether a job answers resubmissions of its file: failed jobs and partial scans are redone"""
+    return state != "failed" and not (result or {}).get("partial")
+
+
+class ScanQueueFull(Exception):
+    def __init__(self, max_queued):
+        super().__init__(f"Scan queue is full ({max_queued} jobs waiting), try again shortly")
+        self.max_queued = max_queued
+
+
+class ScanJob:
+    def __init__(self, key, payload):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.payload = payload
+        self.state = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.finished = threading.Event()
+
+    def to_dict(self):
+        return public_job(vars(self))
+
+    async def wait_async(self, timeout):
+        """Wait (without blocking the event loop) until the job finishes; True if it did"""
+        deadline = time.monotonic() + timeout
+        while not self.finished.is_set():
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(WAIT_POLL_INTERVAL)
+        return True
+
+
+class StoredJob:
+    """A job another worker process owns, read from the ScanJobStore"""
+
+    def __init__(self, store, record):
+        self.store = store
+        self.record = record
+        self.id = record["id"]
+
+    def to_dict(self):
+        return public_job(self.record)
+
+    async def wait_async(self, timeout):
+        deadline = time.monotonic() + timeout
+        while self.record["state"] in UNFINISHED:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(WAIT_POLL_INTERVAL * 4)
+            self.record = await asyncio.to_thread(self.store.load, self.id) or self.record
+        return True
+
+
+class ScanJobStore:
+    def __init__(self, path, lease=60):
+        """
+        Scan job records in SQLite, shared by every worker process.
+
+        With several workers (serve.py) a job's status can be asked of any
+        of them, and a resubmitted file finds the job another worker took.
+        job_keys maps a content key to its current job, so claiming a key
+        is one write transaction.
+
+        The owning process refreshes heartbeat_at on its unfinished jobs;
+        one not refreshed for lease seconds (its worker died) reads as
+        failed and gives up its key.
+        """
+        self.path = os.path.abspath(path)
+        self.lease = lease
+        self.local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(STORE_SCHEMA)
+            # Files written before heartbeats were recorded
+            if "heartbeat_at" not in {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+
+    def _conn(self):
+        # Per thread, and never carried across a fork
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def _record(self, row):
+        record = dict(zip(JOB_FIELDS, row))
+        record["result"] = orjson.loads(record["result"]) if record["result"] else None
+        if self._abandoned(record):
+            record.update(state="failed", error=ABANDONED_ERROR, finished_at=None)
+        return record
+
+    def _abandoned(self, record):
+        heartbeat = record["heartbeat_at"] or record["created_at"]
+        return record["state"] in UNFINISHED and time.time() - heartbeat > self.lease
+
+    def claim(self, job, ttl):
+        """
+        Record job as the one for its key, unless a live job already holds
+        the key; returns that job's record, or None once job is recorded.
+
+        Failed or partial jobs, finished jobs older than ttl and unfinished
+        jobs whose heartbeat is older than the lease don't hold their key;
+        an abandoned job is marked failed so anyone polling it stops.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT {', '.join('j.' + field for field in JOB_FIELDS)} FROM job_keys k JOIN jobs j ON j.id = k.job_id "
+                "WHERE k.key = ?", (job.key,)
+            ).fetchone()
+            if row is not None:
+                record = self._record(row)
+                if record["state"] == "failed" and row[JOB_FIELDS.index("state")] in UNFINISHED:
+                    conn.execute("UPDATE jobs SET state = 'failed', error = ? WHERE id = ?", (ABANDONED_ERROR, record["id"]))
+                age = time.time() - (record["finished_at"] or record["created_at"])
+                if holds_key(record["state"], record["result"]) and age <= ttl:
+                    return record
+            conn.execute("INSERT INTO jobs (id, key, state, created_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)",
+                         (job.id, job.key, job.state, job.created_at, job.created_at))
+            conn.execute("INSERT OR REPLACE INTO job_keys VALUES (?, ?)", (job.key, job.id))
+        return None
+
+    def save(self, job):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, started_at = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                (job.state, job.started_at, job.finished_at,
+                 orjson.dumps(job.result) if job.result is not None else None, job.error, job.id)
+            )
+
+    def heartbeat(self, job_ids):
+        """Mark this process's unfinished jobs as still alive"""
+        placeholders = ",".join("?" * len(job_ids))
+        with self._conn() as conn:
+            conn.execute(f"UPDATE jobs SET heartbeat_at = ? WHERE id IN ({placeholders})", (time.time(), *job_ids))
+
+    def load(self, job_id):
+        row = self._conn().execute(f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._record(row) if row else None
+
+    def prune(self, ttl):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM jobs WHERE COALESCE(finished_at, created_at) < ?", (time.time() - ttl,))
+            conn.execute("DELETE FROM job_keys WHERE job_id NOT IN (SELECT id FROM jobs)")
+
+
+class ScanJobQueue:
+    def __init__(self, run, workers=None, max_queued=None, ttl=None, store_path=None, lease=None):
+        """
+        Background queue for menu scans.
+
+        submit() returns a job right away; a pool of worker threads runs
+        run(payload) for each job and keeps the result (or error) on it
+        for ttl seconds. Jobs are keyed by content: submitting the same key
+        while a job for it is queued, running or done returns that job
+        instead of scanning again; a failed job, or one whose scan came
+        back partial, is redone on resubmission.
+        Workers are started on first use (and again in a forked child,
+        where threads don't survive).
+
+        With store_path (or SCAN_JOB_STORE) job records also go to a
+        ScanJobStore, so status and deduplication work across worker
+        processes; each job still runs in the process it was submitted to,
+        which keeps its unfinished jobs' heartbeats fresh. A job whose
+        heartbeat is older than lease (SCAN_JOB_LEASE) seconds is treated
+        as failed, so a worker that dies doesn't pin its files for ttl.
+        """
+        self.run = run
+        self.workers = workers or int(os.getenv("SCAN_WORKERS", 8))
+        self.max_queued = max_queued or int(os.getenv("SCAN_QUEUE_MAX", 100))
+        self.ttl = ttl or float(os.getenv("SCAN_JOB_TTL", 3600))
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.jobs = {}
+        self.by_key = {}
+        self.pid = None
+        self.running = 0
+        self.lease = lease or float(os.getenv("SCAN_JOB_LEASE", 60))
+        store_path = store_path or os.getenv("SCAN_JOB_STORE")
+        self.store = ScanJobStore(store_path, self.lease) if store_path else None
+
+    def _ensure_workers(self):
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"scan-worker-{i}", daemon=True).start()
+        if self.store:
+            threading.Thread(target=self._heartbeat, name="scan-heartbeat", daemon=True).start()
+
+    def _heartbeat(self):
+        # A few beats per lease, so one slow write doesn't expire a live job
+        while True:
+            time.sleep(self.lease / 4)
+            with self.lock:
+                job_ids = [job.id for job in self.jobs.values() if job.state in UNFINISHED]
+            if not job_ids:
+                continue
+            try:
+                self.store.heartbeat(job_ids)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not refresh scan job heartbeats: {e}")
+
+    def _prune(self, now):
+        expired = [job for job in self.jobs.values() if job.finished_at and now - job.finished_at > self.ttl]
+        for job in expired:
+            del self.jobs[job.id]
+            if self.by_key.get(job.key) is job:
+                del self.by_key[job.key]
+
+    def submit(self, key, payload):
+        """
+        (job, created): a new queued job, or the existing one for key (created False).
+
+        Raises ScanQueueFull when max_queued jobs are already waiting.
+        With a store this does blocking SQLite I/O; call it off the event loop.
+        """
+        job = ScanJob(key, payload)
+        with self.lock:
+            self._prune(time.time())
+            existing = self.by_key.get(key)
+            if existing is not None and holds_key(existing.state, existing.result):
+                SCAN_JOBS.labels("deduplicated").inc()
+                return existing, False
+            if self.queue.qsize() >= self.max_queued:
+                SCAN_JOBS.labels("rejected").inc()
+                raise ScanQueueFull(self.max_queued)
+            if not self.store:
+                self._enqueue(job)
+        if self.store:
+            # Outside the lock: the claim may wait on other processes' writes,
+            # and the workers need the lock meanwhile. Two submits of one key
+            # here still dedup, since the store serializes their claims.
+            self.store.prune(self.ttl)
+            existing = self.store.claim(job, self.ttl)
+            if existing is not None:
+                SCAN_JOBS.labels("deduplicated").inc()
+                return StoredJob(self.store, existing), False
+            with self.lock:
+                self._enqueue(job)
+        SCAN_QUEUE_DEPTH.inc()
+        SCAN_JOBS.labels("queued").inc()
+        return job, True
+
+    def _enqueue(self, job):
+        self.jobs[job.id] = job
+        self.by_key[job.key] = job
+        self._ensure_workers()
+        self.queue.put(job)
+
+    def get(self, job_id):
+        """The job (or, with a store, another process's StoredJob), or None"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None and self.store:
+            record = self.store.load(job_id)
+            job = StoredJob(self.store, record) if record else None
+        return job
+
+    def _persist(self, job):
+        if not self.store:
+            return
+        try:
+            self.store.save(job)
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not record scan job {job.id[:12]}: {e}")
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            SCAN_QUEUE_DEPTH.dec()
+            job.started_at = time.time()
+            SCAN_JOB_WAIT.observe(job.started_at - job.created_at)
+            job.state = "running"
+            self._persist(job)
+            with self.lock:
+                self.running += 1
+            SCAN_JOBS_RUNNING.inc()
+            try:
+                job.result = self.run(job.payload)
+                job.state = "done"
+            except Exception as e:
+                print(f"❌ Scan job {job.id[:12]} failed: {e}")
+                job.error = str(e)
+                job.state = "failed"
+            finally:
+                job.finished_at = time.time()
+                job.payload = None
+                SCAN_JOB_DURATION.observe(job.finished_at - job.started_at)
+                SCAN_JOBS.labels(job.state).inc()
+                SCAN_JOBS_RUNNING.dec()
+                with self.lock:
+                    self.running -= 1
+                self._persist(job)
+                job.finished.set()
+
+    def stats(self):
+        with self.lock:
+            states = {}
+            for job in self.jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return {
+                "workers": self.workers,
+                "queued": self.queue.qsize(),
+                "running": self.running,
+                "max_queued": self.max_queued,
+                "jobs": states
+            }
@@ -0,0 +1,65 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Coalesce concurrent identical calls.
+
+        While a call for a key is running, other callers with the same key
+        wait for it and share its result (or exception) instead of making
+        their own upstream request. Nothing is kept once the call finishes;
+        this is deduplication of in-flight work, not a cache.
+        """
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.requests = 0
+        self.upstream_calls = 0
+        self.deduplicated = 0
+
+    def do(self, key, fn):
+        """Run fn() for key, or wait for the identical call already in flight"""
+        with self.lock:
+            self.requests += 1
+            call = self.calls.get(key)
+            if call is not None:
+                self.deduplicated += 1
+                leader = False
+            else:
+                call = _Call()
+                self.calls[key] = call
+                self.upstream_calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "upstream_calls": self.upstream_calls,
+                "deduplicated": self.deduplicated,
+                "in_flight": len(self.calls)
+            }
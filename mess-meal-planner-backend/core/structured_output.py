@@ -0,0 +1,263 @@
+import re
+import time
+
+import orjson
+from pydantic import BaseModel, ValidationError, field_validator
+
+from core.metrics import JSON_PARSE_DURATION, JSON_PARSE_FAILURES, JSON_PARSE_RESULTS
+
+MEAL_TYPES = ("Breakfast", "Lunch", "Snacks", "Dinner")
+FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+DANGLING_KEY = re.compile(r'(?:,\s*)?"(?:[^"\\]|\\.)*"\s*:\s*$')
+
+# Response schemas in the OpenAPI subset Gemini accepts for response_schema
+STRING_LIST = {"type": "array", "items": {"type": "string"}}
+MENU_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "menus": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "date": {"type": "string"},
+                    "day": {"type": "string"},
+                    "meals": {"type": "object", "properties": {meal: STRING_LIST for meal in MEAL_TYPES}}
+                },
+                "required": ["date", "meals"]
+            }
+        }
+    },
+    "required": ["menus"]
+}
+RECOMMENDATION_TEXTS = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {"description": {"type": "string"}, "reasoning": {"type": "string"}},
+        "required": ["description", "reasoning"]
+    }
+}
+RECOMMENDATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendations": RECOMMENDATION_TEXTS,
+        "alternatives": STRING_LIST,
+        "motivation": {"type": "string"}
+    },
+    "required": ["recommendations", "alternatives", "motivation"]
+}
+WEEK_PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "slots": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"key": {"type": "string"}, "recommendations": RECOMMENDATION_TEXTS},
+                "required": ["key", "recommendations"]
+            }
+        },
+        "motivation": {"type": "string"}
+    },
+    "required": ["slots", "motivation"]
+}
+
+
+def json_output(schema):
+    """generation_config asking Gemini for JSON that matches schema"""
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+
+class MenuEntry(BaseModel):
+    date: str = "unknown"
+    day: str | None = None
+    meals: dict[str, list[str]] = {}
+
+    @field_validator("date", mode="before")
+    @classmethod
+    def missing_date(cls, value):
+        return value or "unknown"
+
+    @classmethod
+    def salvage(cls, entry):
+        """The entry minus anything that isn't a food name (null, a number, a non-list meal)"""
+        if not isinstance(entry, dict):
+            return None
+        meals = entry.get("meals")
+        entry = {**entry, "meals": {
+            str(meal): [item.strip() for item in items if isinstance(item, str) and item.strip()]
+            for meal, items in (meals.items() if isinstance(meals, dict) else ()) if isinstance(items, list)
+        }}
+        try:
+            return cls.model_validate(entry)
+        except ValidationError:
+            return None
+
+
+class MenuScan(BaseModel):
+    menus: list[MenuEntry] = []
+
+    @field_validator("menus")
+    @classmethod
+    def drop_empty_entries(cls, menus):
+        return [entry for entry in menus if any(entry.meals.values())]
+
+    @classmethod
+    def salvage(cls, data):
+        """Keep the entries that validate on their own, so one odd item doesn't cost the whole week"""
+        entries = data.get("menus") if isinstance(data, dict) else None
+        if not isinstance(entries, list):
+            return None
+        menus = cls.drop_empty_entries([entry for entry in map(MenuEntry.salvage, entries) if entry])
+        return cls(menus=menus) if menus else None
+
+
+class RecommendationText(BaseModel):
+    description: str | None = None
+    reasoning: str | None = None
+
+
+class RecommendationReply(BaseModel):
+    recommendations: list[RecommendationText | None] = []
+    alternatives: list[str] = []
+    motivation: str | None = None
+
+    @classmethod
+    def salvage(cls, data):
+        """Field by field; a broken recommendation keeps its slot (None) so the rest stay aligned"""
+        if not isinstance(data, dict):
+            return None
+        recommendations = recommendation_texts(data.get("recommendations"))
+        alternatives = [item for item in data.get("alternatives") or [] if isinstance(item, str)]
+        motivation = data.get("motivation") if isinstance(data.get("motivation"), str) else None
+        return cls(recommendations=recommendations, alternatives=alternatives, motivation=motivation)
+
+
+def recommendation_texts(items):
+    """Validate recommendation texts one by one; a broken one keeps its slot as None"""
+    texts = []
+    for item in items if isinstance(items, list) else []:
+        try:
+            texts.append(RecommendationText.model_validate(item))
+        except ValidationError:
+            texts.append(None)
+    return texts
+
+
+class WeekPlanSlot(BaseModel):
+    key: str
+    recommendations: list[RecommendationText | None] = []
+
+
+class WeekPlanReply(BaseModel):
+    slots: list[WeekPlanSlot] = []
+    motivation: str | None = None
+
+    @classmethod
+    def salvage(cls, data):
+        """Keep every slot that has a key; their texts are validated one by one"""
+        if not isinstance(data, dict):
+            return None
+        slots = [
+            WeekPlanSlot(key=slot["key"], recommendations=recommendation_texts(slot.get("recommendations")))
+            for slot in data.get("slots") or []
+            if isinstance(slot, dict) and isinstance(slot.get("key"), str)
+        ]
+        motivation = data.get("motivation") if isinstance(data.get("motivation"), str) else None
+        return cls(slots=slots, motivation=motivation) if slots or motivation else None
+
+
+def repair_json(text):
+    """
+    Best-effort fix-up of a reply that isn't valid JSON as is.
+
+    Strips markdown fences and surrounding prose, takes the first
+    top-level object, removes trailing commas and closes a reply that was
+    cut off mid-way (partial string, dangling key, unclosed brackets).
+    Returns the candidate text, or None if there is no object at all.
+    """
+    fenced = FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    if start < 0:
+        return None
+
+    stack = []
+    in_string = escaped = False
+    string_start = end = None
+    for position in range(start, len(text)):
+        char = text[position]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            string_start = position
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                end = position + 1
+                break
+
+    if end is not None:
+        candidate = text[start:end]
+    else:
+        # A string cut off mid-way (half a food name) is dropped, not closed
+        candidate = text[start:string_start] if in_string else text[start:]
+        candidate = DANGLING_KEY.sub("", candidate.rstrip()).rstrip().rstrip(",")
+        candidate += "".join(reversed(stack))
+    return TRAILING_COMMA.sub(r"\1", candidate)
+
+
+def load_json(text):
+    """(data, repaired); data is None when even the repaired text doesn't parse"""
+    try:
+        return orjson.loads(text), False
+    except orjson.JSONDecodeError:
+        pass
+    candidate = repair_json(text)
+    if candidate is None:
+        return None, False
+    try:
+        return orjson.loads(candidate), True
+    except orjson.JSONDecodeError:
+        return None, False
+
+
+def parse_reply(text, model, source):
+    """
+    Parse a structured model reply into model (MenuScan, RecommendationReply, WeekPlanReply).
+
+    Returns (instance or None, outcome), outcome being "ok", "repaired"
+    (JSON needed fixing), "partial" (only some fields or entries
+    validated) or "failed". Outcomes and parse time are recorded per
+    source.
+    """
+    start = time.perf_counter()
+    result = None
+    data, repaired = load_json(text or "")
+    if data is None:
+        outcome = "failed"
+    else:
+        try:
+            result = model.model_validate(data)
+            outcome = "repaired" if repaired else "ok"
+        except ValidationError:
+            result = model.salvage(data)
+            outcome = "partial" if result is not None else "failed"
+
+    JSON_PARSE_DURATION.labels(source).observe(time.perf_counter() - start)
+    JSON_PARSE_RESULTS.labels(source, outcome).inc()
+    if outcome == "failed":
+        JSON_PARSE_FAILURES.labels(source).inc()
+    return result, outcome
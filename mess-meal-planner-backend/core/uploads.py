@@ -0,0 +1,49 @@
+import contextlib
+import hashlib
+import os
+import tempfile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes):
+        super().__init__(f"Upload exceeds the {max_bytes} byte limit")
+        self.max_bytes = max_bytes
+
+
+async def _chunks(upload, max_bytes, chunk_size):
+    """Yield the upload chunk by chunk, enforcing the size cap"""
+    size = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        yield chunk
+
+
+async def save_upload(upload, max_bytes=MAX_UPLOAD_BYTES, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Stream an upload into a uniquely named temp file that the caller owns.
+
+    Returns (path, sha256_hex); the caller removes the file when done with
+    it (a background job may outlive the request). On error nothing is
+    left behind.
+    """
+    suffix = os.path.splitext(upload.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(prefix="menu_upload_", suffix=suffix)
+    try:
+        digest = hashlib.sha256()
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in _chunks(upload, max_bytes, chunk_size):
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        raise
+    return path, digest.hexdigest()
@@ -1,18 +1,39 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+import contextlib
+import datetime
 import os
+import time
 from dotenv import load_dotenv
+from core.llm import LLMUnavailable
 from core.macro_calculator import MacroCalculator
+from core.metrics import MetricsMiddleware, render_metrics
+from core.menu_index import RANKINGS, entry_index, index_menus, ranked_items
 from core.menu_scanner import MenuScanner
+from core.menu_store import MenuStore, iso_date
 from core.nutrition_rag import NutritionRAG
+from core.responses import ORJSONResponse, dumps
+from core.profile_batch import read_profile_records, profile_columns, ndjson_results
+from core.scan_jobs import ScanJobQueue, ScanQueueFull
+from core.uploads import UploadTooLarge, save_upload
 from agents.meal_agent import MealPlanningAgent
 
 # Load environment variables
 load_dotenv()
 
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Warm-up is off by default so workers start serving immediately; turn
+    # it on when a slower boot is preferable to a slow first request
+    if os.getenv("WARM_UP_ON_STARTUP", "").lower() in ("1", "true", "yes"):
+        warm_up()
+    yield
+
 # Initialize FastAPI
-app = FastAPI(title="Mess Meal Planner API")
+app = FastAPI(title="Mess Meal Planner API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # CORS middleware - allow frontend to connect
 app.add_middleware(
@@ -22,16 +43,66 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Initialize components
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY not found in .env file")
 
+# Constructing these is cheap: the Gemini SDK, its models, PIL/PyMuPDF and
+# the nutrition table are loaded on first use (or by warm_up)
 macro_calc = MacroCalculator()
 menu_scanner = MenuScanner(GOOGLE_API_KEY)
 nutrition_rag = NutritionRAG(GOOGLE_API_KEY)
 meal_agent = MealPlanningAgent(GOOGLE_API_KEY)
+menu_store = MenuStore()
+
+def run_scan_job(payload):
+    """
+    Worker side of /scan-menu: scan (through the scan cache), add nutrition, store for the mess
+    """
+    file_path, content_digest, mess_id = payload
+    try:
+        menu_structure, cache_hit = menu_scanner.scan_menu_cached(file_path, content_digest)
+    finally:
+        os.remove(file_path)
+    if not menu_structure.get('menus'):
+        # Failing the job frees its key, so uploading the file again rescans it
+        raise ValueError("No menu could be read from this file")
+    # Rankings per day and meal are computed once here, not on every query
+    processed_menus = index_menus(nutrition_rag.aggregate_menus(menu_structure.get('menus', [])))
+    
+    result = {
+        "menus": processed_menus,
+        "count": len(processed_menus),
+        "cache_hit": cache_hit,
+        # Some PDF pages failed to scan; re-uploading the file scans it again
+        "partial": bool(menu_structure.get('partial'))
+    }
+    if mess_id:
+        # Stored per mess and date so other students fetch it instead of re-scanning
+        stored_dates, skipped = menu_store.save(mess_id, processed_menus)
+        result["stored"] = {"mess_id": mess_id, "dates": stored_dates, "skipped": skipped}
+    return result
+
+scan_jobs = ScanJobQueue(run_scan_job)
+SCAN_QUEUE_RETRY_AFTER = 5
+SCAN_WAIT_MAX = 60
+WEEK_PLAN_MAX_DAYS = int(os.getenv("WEEK_PLAN_MAX_DAYS", 14))
+
+def warm_up():
+    """
+    Load everything the first request would otherwise pay for
+    """
+    start = time.perf_counter()
+    nutrition_rag.search_food("dal")
+    nutrition_rag.fuzzy_matcher
+    menu_scanner.model
+    meal_agent.model
+    import pymupdf  # noqa: F401
+    from core.image_preprocess import ImagePreprocessor  # noqa: F401
+    print(f"✓ Warm-up finished in {(time.perf_counter() - start) * 1000:.0f}ms")
 
 # Request Models
 class UserProfile(BaseModel):
@@ -42,26 +113,172 @@ class UserProfile(BaseModel):
     activity_level: str = "moderate"
     workout_today: str = "rest"
 
+class FoodSearchBatchRequest(BaseModel):
+    foods: list[str]
+
+class MenuRef(BaseModel):
+    mess_id: str
+    meal: str  # e.g. "Lunch"
+    date: str | None = None  # YYYY-MM-DD, default today
+
 class MealRecommendationRequest(BaseModel):
     user_profile: UserProfile
-    menu_items: dict
+    menu_items: dict | None = None
+    menu_ref: MenuRef | None = None  # instead of menu_items: a meal of a stored menu
     current_intake: dict
     daily_target: dict
+    fast: bool = False  # skip Gemini, return optimizer results only
+
+class WeekPlanRequest(BaseModel):
+    user_profile: UserProfile
+    menus: list[dict] | None = None  # /scan-menu "menus" (meals may also be plain lists of item names)
+    mess_id: str | None = None  # instead of menus: the stored menus of this mess...
+    start: str | None = None  # ...from start (default today)
+    end: str | None = None  # ...to end (default start + 6 days)
+    daily_target: dict
+    meal_types: list[str] | None = None  # e.g. ["Lunch", "Dinner"]; default every meal
+    per_meal: int = Field(2, ge=1, le=5)  # combinations per meal
+    fast: bool = False
 
 # Response Models
 class HealthResponse(BaseModel):
     status: str
     timestamp: str
 
+def with_nutrition(menu_items):
+    """
+    Fill in macros from NutritionRAG for menu items sent without them
+    """
+    missing = [
+        name for name, value in menu_items.items()
+        if not isinstance(value, dict) or 'calories' not in value
+    ]
+    if not missing:
+        return menu_items
+    
+    _, nutrition, _ = nutrition_rag.resolve_batch(missing)
+    return {name: nutrition.get(name, value) for name, value in menu_items.items()}
+
+def with_week_nutrition(menus):
+    """
+    with_nutrition for a whole week of menu entries, resolving every missing item in one batch
+    """
+    entries = []
+    missing = []
+    for entry in menus:
+        meals = {}
+        for meal, items in (entry.get('meals') or {}).items():
+            if isinstance(items, list):
+                items = {name: {} for name in items if isinstance(name, str)}
+            if not isinstance(items, dict):
+                continue
+            meals[meal] = items
+            missing += [name for name, value in items.items() if not isinstance(value, dict) or 'calories' not in value]
+        entries.append({**entry, "meals": meals})
+    if not missing:
+        return entries
+    
+    _, nutrition, _ = nutrition_rag.resolve_batch(missing)
+    for entry in entries:
+        for meal, items in entry['meals'].items():
+            entry['meals'][meal] = {name: nutrition.get(name, value) for name, value in items.items()}
+    return entries
+
+def request_date(value, name="date"):
+    """
+    YYYY-MM-DD request parameter as an ISO string (today if missing), or 400
+    """
+    if value is None:
+        return datetime.date.today().isoformat()
+    date = iso_date(value)
+    if date is None:
+        raise HTTPException(status_code=400, detail=f"{name} must be YYYY-MM-DD, got {value!r}")
+    return date
+
+def stored_menu(mess_id, date):
+    """
+    A stored menu entry, or 404
+    """
+    entry = menu_store.get(mess_id, date)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No menu stored for mess '{mess_id}' on {date}")
+    return entry
+
+def request_menu_items(request):
+    """
+    (menu_items, menu_index) of a recommendation request: sent inline
+    (no index), or a meal of a stored menu with its precomputed index
+    """
+    ref = request.menu_ref
+    if ref is None:
+        if request.menu_items is None:
+            raise HTTPException(status_code=400, detail="Send menu_items or menu_ref")
+        return with_nutrition(request.menu_items), None
+    
+    date = request_date(ref.date)
+    entry = stored_menu(ref.mess_id, date)
+    items = entry.get('meals', {}).get(ref.meal)
+    if items is None:
+        raise HTTPException(status_code=404, detail=f"No {ref.meal} in the menu of mess '{ref.mess_id}' on {date}")
+    return items, entry_index(entry)['meals'].get(ref.meal)
+
+def request_week_menus(request):
+    """
+    Menus of a week plan request: sent inline, or a date range of the menu store
+    """
+    if request.mess_id is None:
+        if request.menus is None:
+            raise HTTPException(status_code=400, detail="Send menus or mess_id")
+        if len(request.menus) > WEEK_PLAN_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=f"At most {WEEK_PLAN_MAX_DAYS} days of menus per plan")
+        return with_week_nutrition(request.menus)
+    
+    start = request_date(request.start, "start")
+    end = request_date(request.end, "end") if request.end else (
+        datetime.date.fromisoformat(start) + datetime.timedelta(days=6)).isoformat()
+    days = (datetime.date.fromisoformat(end) - datetime.date.fromisoformat(start)).days + 1
+    if not 1 <= days <= WEEK_PLAN_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"start to end must cover 1 to {WEEK_PLAN_MAX_DAYS} days, got {days}")
+    menus = menu_store.range(request.mess_id, start, end)
+    if not menus:
+        raise HTTPException(status_code=404, detail=f"No menus stored for mess '{request.mess_id}' from {start} to {end}")
+    return menus
+
+def llm_unavailable(e):
+    """
+    503 with Retry-After for calls the LLM client gave up on (quota, overload)
+    """
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))})
+
+def sse_stream(events, started, name):
+    """
+    Format (event, data) pairs as server-sent events.
+    
+    Ends with a "done" event carrying time-to-first-byte and total
+    latency, measured from when the request was accepted.
+    """
+    first_event = None
+    try:
+        for event, data in events:
+            if first_event is None:
+                first_event = time.perf_counter() - started
+            yield f"event: {event}\ndata: {dumps(data)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {dumps(str(e))}\n\n"
+    
+    total = time.perf_counter() - started
+    ttfb = first_event if first_event is not None else total
+    print(f"⏱️ {name}: ttfb {ttfb * 1000:.0f} ms, total {total * 1000:.0f} ms")
+    yield f"event: done\ndata: {dumps({'ttfb_ms': round(ttfb * 1000, 1), 'total_ms': round(total * 1000, 1)})}\n\n"
+
 # API Endpoints
 
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    from datetime import datetime
     return {
         "status": "ok",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": datetime.datetime.now().isoformat(),
         "service": "Mess Meal Planner API"
     }
 
@@ -92,60 +309,102 @@ def setup_profile(profile: UserProfile):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/scan-menu")
-async def scan_menu(file: UploadFile = File(...)):
+@app.post("/setup-profiles/batch")
+async def setup_profiles_batch(request: Request):
+    """
+    Calculate TDEE and macro targets for many profiles in one pass.
+    
+    Body is CSV with a header row (Content-Type: text/csv) or JSON lines,
+    with the same fields as /setup-profile plus optional id and gender.
+    Results stream back as JSON lines; invalid rows are reported at the end.
+    """
+    body = await request.body()
+    
+    def compute():
+        records = read_profile_records(body, request.headers.get("content-type"))
+        columns, rows, errors = profile_columns(records)
+        results = macro_calc.calculate_batch(
+            columns["age"],
+            columns["height"],
+            columns["weight"],
+            columns["goal"],
+            columns["activity_level"],
+            columns["gender"]
+        )
+        return columns, rows, errors, results
+    
     try:
-        # Save file
-        file_path = f"temp_{file.filename}"
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        
-        # Scan menu
-        menu_structure = menu_scanner.scan_menu(file_path)
-        
-        # Process menus
-        processed_menus = []
-        for menu_entry in menu_structure.get('menus', []):
-            date = menu_entry.get('date', 'unknown')
-            day = menu_entry.get('day', 'Unknown')
-            meals = menu_entry.get('meals', {})
-            
-            # Get nutrition for each meal
-            meals_with_nutrition = {}
-            for meal_type, items in meals.items():
-                meals_with_nutrition[meal_type] = nutrition_rag.search_multiple_foods(items)
-            
-            processed_menus.append({
-                "date": date,
-                "day": day,
-                "meals": meals_with_nutrition,
-                "raw_items": meals
-            })
-        
-        # Clean up
+        columns, rows, errors, results = await run_in_threadpool(compute)
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(ndjson_results(columns, rows, errors, results), media_type="application/x-ndjson")
+
+@app.post("/scan-menu", status_code=202)
+async def scan_menu(file: UploadFile = File(...), mess_id: str | None = Form(None), wait: float = 0):
+    """
+    Queue a menu scan and return its job ID right away; poll /scan-jobs/{id} for the result.
+    
+    Re-sending the same file (for the same mess) returns the existing job.
+    With ?wait=N (at most SCAN_WAIT_MAX) the response holds for up to N
+    seconds and includes the result if the job finished by then.
+    """
+    if not 0 <= wait <= SCAN_WAIT_MAX:
+        raise HTTPException(status_code=400, detail=f"wait must be between 0 and {SCAN_WAIT_MAX} seconds")
+    try:
+        # Streamed to a temp file (size-capped) that the job removes when done
+        file_path, content_digest = await save_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    try:
+        # In a thread: with the shared job store (serve.py) submitting writes to SQLite
+        job, created = await run_in_threadpool(
+            scan_jobs.submit, f"{content_digest}:{mess_id or ''}", (file_path, content_digest, mess_id)
+        )
+    except ScanQueueFull as e:
         os.remove(file_path)
-        
-        return {
-            "status": "success",
-            "menus": processed_menus,
-            "count": len(processed_menus)
-        }
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(SCAN_QUEUE_RETRY_AFTER)})
+    if not created:
+        os.remove(file_path)
+    if wait > 0:
+        await job.wait_async(wait)
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "status": "success",
+        "job_id": job.id,
+        "deduplicated": not created,
+        "job": job.to_dict()
+    }
+
+@app.get("/scan-jobs/{job_id}")
+def get_scan_job(job_id: str):
+    """
+    State of a scan job (queued, running, done, failed); done jobs carry the processed menus
+    """
+    job = scan_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Scan job '{job_id}' not found (unknown or expired)")
+    
+    return {
+        "status": "success",
+        "job": job.to_dict()
+    }
 
 @app.post("/get-recommendations")
 def get_recommendations(request: MealRecommendationRequest):
     """
     Get AI-powered meal recommendations using Gemini
     """
+    menu_items, menu_index = request_menu_items(request)
     try:
         recommendations = meal_agent.analyze_menu_and_recommend(
-            request.menu_items,
+            menu_items,
             request.user_profile.dict(),
             request.current_intake,
-            request.daily_target
+            request.daily_target,
+            fast=request.fast,
+            menu_index=menu_index
         )
         
         return {
@@ -153,6 +412,34 @@ def get_recommendations(request: MealRecommendationRequest):
             "recommendations": recommendations
         }
     
+    except LLMUnavailable as e:
+        raise llm_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/plan-week")
+def plan_week(request: WeekPlanRequest):
+    """
+    Recommendations for every day and meal of a scanned menu, in one batched Gemini call (or a few)
+    """
+    menus = request_week_menus(request)
+    try:
+        plan = meal_agent.plan_week(
+            menus,
+            request.user_profile.dict(),
+            request.daily_target,
+            meal_types=request.meal_types,
+            per_meal=request.per_meal,
+            fast=request.fast
+        )
+        
+        return {
+            "status": "success",
+            **plan
+        }
+    
+    except LLMUnavailable as e:
+        raise llm_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -173,9 +460,41 @@ def get_guidance(request: MealRecommendationRequest):
             "guidance": guidance
         }
     
+    except LLMUnavailable as e:
+        raise llm_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/get-recommendations/stream")
+def get_recommendations_stream(request: MealRecommendationRequest):
+    """
+    Stream meal recommendations as server-sent events, one per recommendation
+    """
+    started = time.perf_counter()
+    menu_items, menu_index = request_menu_items(request)
+    events = meal_agent.stream_recommendations(
+        menu_items,
+        request.user_profile.dict(),
+        request.current_intake,
+        request.daily_target,
+        menu_index=menu_index
+    )
+    return StreamingResponse(sse_stream(events, started, "get-recommendations/stream"), media_type="text/event-stream")
+
+@app.post("/get-guidance/stream")
+def get_guidance_stream(request: MealRecommendationRequest):
+    """
+    Stream nutrition guidance text as server-sent events
+    """
+    started = time.perf_counter()
+    chunks = meal_agent.stream_nutrition_guidance(
+        request.user_profile.dict(),
+        request.daily_target,
+        request.current_intake
+    )
+    events = (("chunk", text) for text in chunks)
+    return StreamingResponse(sse_stream(events, started, "get-guidance/stream"), media_type="text/event-stream")
+
 @app.get("/workout-motivation/{workout_day}/{goal}")
 def get_motivation(workout_day: str, goal: str):
     """
@@ -189,32 +508,132 @@ def get_motivation(workout_day: str, goal: str):
             "motivation": motivation
         }
     
+    except LLMUnavailable as e:
+        raise llm_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/menus/{mess_id}/today")
+def get_today_menu(mess_id: str, date: str | None = None):
+    """
+    A mess's stored menu for today (or ?date=YYYY-MM-DD, for clients in another timezone)
+    """
+    entry = stored_menu(mess_id, request_date(date))
+    
+    return {
+        "status": "success",
+        "mess_id": mess_id,
+        "menu": entry
+    }
+
+@app.get("/menus/{mess_id}/ranked")
+def get_ranked_items(mess_id: str, by: str = "protein_density", meal: str | None = None,
+                     date: str | None = None, limit: int = 3):
+    """
+    Top items of a stored meal (or the whole day) by protein density or calories, from the scan-time index
+    """
+    if by not in RANKINGS:
+        raise HTTPException(status_code=400, detail=f"by must be one of {', '.join(RANKINGS)}")
+    date = request_date(date)
+    items = ranked_items(stored_menu(mess_id, date), by, meal, limit)
+    if items is None:
+        raise HTTPException(status_code=404, detail=f"No {meal} in the menu of mess '{mess_id}' on {date}")
+    
+    return {
+        "status": "success",
+        "mess_id": mess_id,
+        "date": date,
+        "meal": meal,
+        "by": by,
+        "items": items
+    }
+
+@app.get("/menus/{mess_id}")
+def get_menus(mess_id: str, start: str | None = None, end: str | None = None):
+    """
+    A mess's stored menus from start to end (inclusive, both optional), in date order
+    """
+    menus = menu_store.range(
+        mess_id,
+        request_date(start, "start") if start else None,
+        request_date(end, "end") if end else None
+    )
+    
+    return {
+        "status": "success",
+        "mess_id": mess_id,
+        "menus": menus,
+        "count": len(menus)
+    }
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics: endpoint latency, Gemini calls, parse failures, nutrition lookups
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/cache-stats")
+def cache_stats():
+    """
+    Response cache hit/miss counters, in-flight request coalescing and scan queue stats
+    """
+    caches = meal_agent.cache_stats()
+    caches["menu_scans"] = menu_scanner.scan_cache.stats()
+    caches["menu_store"] = menu_store.stats()
+    return {
+        "status": "success",
+        "caches": caches,
+        "coalescing": meal_agent.coalescing_stats(),
+        "scan_jobs": scan_jobs.stats()
+    }
+
 @app.get("/search-food/{food_name}")
 def search_food(food_name: str):
     """
     Search for a specific food in the database
     """
     try:
-        nutrition = nutrition_rag.search_food(food_name)
+        match = nutrition_rag.match_foods([food_name])[food_name]
+        nutrition = nutrition_rag.nutrition_for(food_name, match)
         
-        if nutrition:
+        if match["status"] != "unresolved":
             return {
                 "status": "success",
                 "found": True,
-                "nutrition": nutrition
+                "nutrition": nutrition,
+                "match": match
             }
         else:
             return {
                 "status": "success",
                 "found": False,
-                "message": f"Food '{food_name}' not found in database"
+                "message": f"Food '{food_name}' not found in database",
+                "nutrition": nutrition,
+                "suggestions": match["candidates"]
             }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/search-food")
+def search_food_batch(request: FoodSearchBatchRequest):
+    """
+    Search for many foods in one call
+    """
+    try:
+        names, nutrition, _ = nutrition_rag.resolve_batch(request.foods)
+        
+        return {
+            "status": "success",
+            "results": nutrition,
+            "count": len(names),
+            "unresolved": [name for name in names if nutrition[name].get("unresolved")]
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
     
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,101 @@
+"""
+Production entry point: gunicorn with uvicorn workers, the app preloaded in the parent.
+
+    python serve.py                                   # one worker per CPU on :8000
+    python serve.py --workers 4 --bind 0.0.0.0:8080
+
+`python main.py` stays the single-process dev server (with reload).
+
+The parent imports main and runs warm_up() (Gemini SDK and models,
+nutrition database and indexes, fuzzy matcher, PDF/image libraries)
+before forking, then freezes the heap, so workers share all of it
+copy-on-write instead of each loading their own. State that has to be
+the same in every worker goes to files next to the app:
+
+- LLM rate and concurrency limits are split across workers (LLM_PROCESSES,
+  the worker count unless set; use the total across hosts sharing a quota)
+- guidance/motivation caches use the SQLite backend (CACHE_BACKEND, CACHE_DIR)
+- scan job records go to SCAN_JOB_STORE; menus already live in the menu store
+- Prometheus samples go to PROMETHEUS_MULTIPROC_DIR, merged on /metrics
+
+Anything already set in the environment wins over these defaults.
+"""
+import argparse
+import gc
+import glob
+import os
+import tempfile
+
+from gunicorn.app.base import BaseApplication
+
+
+def cpu_count():
+    """CPUs this process may run on (the container's share, where the OS tells us)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def prepare_environment(workers):
+    """Point shared state at files; must run before main (and prometheus_client) is imported"""
+    os.environ.setdefault("LLM_PROCESSES", str(workers))
+    os.environ.setdefault("CACHE_BACKEND", "sqlite")
+    os.environ.setdefault("SCAN_JOB_STORE", "scan_jobs.db")
+    metrics_dir = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), f"mess_planner_metrics_{os.getpid()}")
+    )
+    os.makedirs(metrics_dir, exist_ok=True)
+    # Samples left by a previous run would be merged into this one's; the
+    # directory may be the operator's, so only prometheus_client's files go
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+class Server(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for name, value in self.options.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        # With preload_app this runs once, in the parent, before the workers fork
+        import main
+        main.warm_up()
+        # Keep the collector from touching (and so copying) the preloaded objects in every worker
+        gc.freeze()
+        return main.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with one worker process per CPU")
+    parser.add_argument("--bind", default=os.getenv("BIND", "0.0.0.0:8000"))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 0)) or None,
+                        help="worker processes (default: WEB_CONCURRENCY, else the CPU count)")
+    parser.add_argument("--timeout", type=int, default=120, help="seconds before a silent worker is restarted")
+    args = parser.parse_args()
+
+    workers = args.workers or cpu_count()
+    prepare_environment(workers)
+    print(f"✓ Serving on {args.bind} with {workers} worker(s)")
+    Server({
+        "bind": args.bind,
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "timeout": args.timeout,
+        "graceful_timeout": 30,
+        "keepalive": 5,
+        "child_exit": child_exit,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 // lib/api.js
 
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000"
+const SCAN_POLL_INTERVAL_MS = 1000
+const SCAN_TIMEOUT_MS = 10 * 60 * 1000
 
 export const api = {
   // Health check
@@ -35,10 +37,15 @@ export const api = {
   },
 
   // Scan menu image/PDF and get structured data with dates and meal types
-  scanMenu: async (file) => {
+  // With a messId the scanned menu is also stored for everyone in that mess.
+  // The scan runs as a background job; this polls it until it finishes.
+  scanMenu: async (file, messId) => {
     try {
       const formData = new FormData()
       formData.append("file", file)
+      if (messId) {
+        formData.append("mess_id", messId)
+      }
       
       const response = await fetch(`${API_BASE}/scan-menu`, {
         method: "POST",
@@ -50,7 +57,24 @@ export const api = {
         throw new Error(errorData.detail || `HTTP error! status: ${response.status}`)
       }
       
-      const data = await response.json()
+      let { job } = await response.json()
+      const deadline = Date.now() + SCAN_TIMEOUT_MS
+      while (job.state === "queued" || job.state === "running") {
+        if (Date.now() > deadline) {
+          throw new Error("Menu scan is taking too long, please try again")
+        }
+        await new Promise((resolve) => setTimeout(resolve, SCAN_POLL_INTERVAL_MS))
+        const jobResponse = await fetch(`${API_BASE}/scan-jobs/${job.id}`)
+        if (!jobResponse.ok) {
+          throw new Error(`HTTP error! status: ${jobResponse.status}`)
+        }
+        job = (await jobResponse.json()).job
+      }
+      if (job.state === "failed") {
+        throw new Error(job.error || "Menu scan failed")
+      }
+      
+      const data = { status: "success", ...job.result }
       console.log('API Response:', data) // Debug log
       return data
     } catch (error) {
@@ -59,6 +83,23 @@ export const api = {
     }
   },
 
+  // Stored menu of a mess for today (or a YYYY-MM-DD date)
+  getTodayMenu: async (messId, date) => {
+    try {
+      const query = date ? `?date=${encodeURIComponent(date)}` : ""
+      const response = await fetch(`${API_BASE}/menus/${encodeURIComponent(messId)}/today${query}`)
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+
+      return response.json()
+    } catch (error) {
+      console.error('Error fetching menu:', error)
+      throw error
+    }
+  },
+
   // Rest of your API functions...
   getRecommendations: async (userProfile, menuItems, currentIntake, dailyTarget) => {
     try {
@@ -84,6 +125,29 @@ export const api = {
     }
   },
 
+  planWeek: async (userProfile, menus, dailyTarget) => {
+    try {
+      const response = await fetch(`${API_BASE}/plan-week`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          user_profile: userProfile,
+          menus: menus,
+          daily_target: dailyTarget
+        })
+      })
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`)
+      }
+
+      return response.json()
+    } catch (error) {
+      console.error('Error planning week:', error)
+      throw error
+    }
+  },
+
   getGuidance: async (userProfile, dailyTarget, currentIntake) => {
     try {
       const response = await fetch(`${API_BASE}/get-guidance`, {